@@ -1,4 +1,6 @@
-from .memory import Memory
+from .memory import Memory, IndexingError
+from .sharding import ShardedMemory
+from .snapshot import ReadOnlyMemory
 from . import context
 
-__all__ = ["Memory", "context"]
+__all__ = ["Memory", "IndexingError", "ReadOnlyMemory", "ShardedMemory", "context"]
@@ -0,0 +1,249 @@
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from .config import IndexParams
+from .embeddings import normalize
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` largest scores along the last axis, best first."""
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def pairwise_scores(
+    queries: np.ndarray, vectors: np.ndarray, metric: str
+) -> np.ndarray:
+    if metric == "l2":
+        # Negated squared distance, so that larger is always better.
+        return (
+            2.0 * queries @ vectors.T
+            - np.sum(vectors * vectors, axis=-1)
+            - np.sum(queries * queries, axis=-1, keepdims=True)
+        )
+    return queries @ vectors.T
+
+
+def assign(
+    vectors: np.ndarray, centroids: np.ndarray, block_size: int = 65536
+) -> np.ndarray:
+    """Nearest centroid (by l2) of each vector, scored `block_size` rows at a time."""
+    assignments = np.zeros(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], block_size):
+        block = vectors[start : start + block_size]
+        assignments[start : start + len(block)] = np.argmax(
+            pairwise_scores(block, centroids, "l2"), axis=-1
+        )
+    return assignments
+
+
+def kmeans(
+    vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Plain Lloyd's k-means. Returns (centroids, assignments)."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    n_clusters = max(1, min(n_clusters, n))
+    centroids = vectors[rng.choice(n, size=n_clusters, replace=False)].copy()
+    assignments = np.zeros(n, dtype=np.int64)
+    for _ in range(n_iter):
+        assignments = assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed empty clusters from random points.
+        centroids[empty] = vectors[rng.integers(n, size=int(empty.sum()))]
+    return centroids, assignments
+
+
+def mmr(
+    candidates: np.ndarray,
+    relevance: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    groups: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Maximal marginal relevance: greedily pick `k` of `candidates`, each time taking
+    the one maximizing `lambda_mult * relevance - (1 - lambda_mult) * redundancy`,
+    where redundancy is its highest cosine similarity to anything already picked.
+    With `groups`, at most one candidate per group is picked. Returns positions
+    into `candidates` in selection order.
+    """
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    unit = normalize(candidates)
+    similarity = unit @ unit.T
+    redundancy = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected = []
+    while len(selected) < k and available.any():
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        if groups is not None:
+            available &= groups != groups[best]
+        redundancy = np.maximum(redundancy, similarity[best])
+    return np.asarray(selected, dtype=np.int64)
+
+
+class ExactIndex:
+    def __init__(self, vectors: np.ndarray, metric: str = "cosine"):
+        self.metric = metric
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.vectors = normalize(vectors) if metric == "cosine" else vectors
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def _prepare(self, queries: np.ndarray) -> np.ndarray:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        return normalize(queries) if self.metric == "cosine" else queries
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        subset: Optional[np.ndarray] = None,
+        **kwargs,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch search. Returns (ids, scores), each of shape (n_queries, <=k).
+        `subset` restricts the scan to the given row ids, e.g. rows matching a filter.
+        """
+        if len(self) == 0 or (subset is not None and len(subset) == 0):
+            empty = np.zeros((np.atleast_2d(queries).shape[0], 0))
+            return empty.astype(np.int64), empty
+        vectors = self.vectors if subset is None else self.vectors[subset]
+        scores = pairwise_scores(self._prepare(queries), vectors, self.metric)
+        ids = top_k(scores, k)
+        scores = np.take_along_axis(scores, ids, axis=-1)
+        return (ids if subset is None else subset[ids]), scores
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index: vectors are bucketed by k-means centroid and a query
+    only scans the `nprobe` closest buckets.
+
+    Passing the `centroids` of an earlier index skips training and only assigns
+    the vectors to them, which is how a grown index is rebuilt between retrains.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        metric: str = "cosine",
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        seed: int = 0,
+        centroids: Optional[np.ndarray] = None,
+    ):
+        super().__init__(vectors, metric)
+        self.nlist = nlist or max(1, int(np.sqrt(len(self))))
+        self.nprobe = nprobe
+        if len(self) and centroids is not None and len(centroids):
+            self.centroids = centroids
+            assignments = assign(self.vectors, centroids)
+        elif len(self):
+            self.centroids, assignments = kmeans(self.vectors, self.nlist, seed=seed)
+        else:
+            self.centroids, assignments = self.vectors, np.zeros(0, dtype=np.int64)
+        self.lists = [
+            np.flatnonzero(assignments == c) for c in range(len(self.centroids))
+        ]
+
+    @classmethod
+    def from_lists(
+        cls,
+        vectors: np.ndarray,
+        centroids: np.ndarray,
+        lists: List[np.ndarray],
+        metric: str = "cosine",
+        nprobe: int = 8,
+    ) -> "IVFIndex":
+        """
+        An index over already prepared vectors (unit length for cosine) and their
+        trained lists, e.g. memory-mapped from a snapshot. Nothing is copied.
+        """
+        index = cls.__new__(cls)
+        index.metric = metric
+        index.vectors = vectors
+        index.nlist = len(centroids)
+        index.nprobe = nprobe
+        index.centroids = centroids
+        index.lists = lists
+        return index
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        subset: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None,
+        **kwargs,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if subset is not None:
+            # Filtered searches scan only the matching rows, which is exact and cheap.
+            return super().search(queries, k, subset=subset)
+        queries = self._prepare(queries)
+        if len(self) == 0:
+            empty = np.zeros((queries.shape[0], 0))
+            return empty.astype(np.int64), empty
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probes = top_k(pairwise_scores(queries, self.centroids, self.metric), nprobe)
+
+        all_ids = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        all_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for qi, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[c] for c in probes[qi]])
+            if len(candidates) == 0:
+                continue
+            scores = pairwise_scores(
+                query[None, :], self.vectors[candidates], self.metric
+            )[0]
+            best = top_k(scores, k)
+            all_ids[qi, : len(best)] = candidates[best]
+            all_scores[qi, : len(best)] = scores[best]
+        return all_ids, all_scores
+
+
+def build_index(
+    vectors: np.ndarray, params: IndexParams, centroids: Optional[np.ndarray] = None
+) -> Union[ExactIndex, IVFIndex]:
+    if params.kind == "ivf":
+        return IVFIndex(
+            vectors,
+            metric=params.metric,
+            nlist=params.nlist,
+            nprobe=params.nprobe,
+            centroids=centroids,
+        )
+    return ExactIndex(vectors, metric=params.metric)
+
+
+def needs_training(trained_rows: int, rows: int, retrain_ratio: float) -> bool:
+    """Whether an IVF index trained on `trained_rows` vectors is due for new centroids."""
+    if trained_rows <= 0:
+        return True
+    return rows > trained_rows * retrain_ratio or rows * retrain_ratio < trained_rows
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Mean fraction of the exact top-k ids that the approximate search returned."""
+    hits = [
+        len(np.intersect1d(approx[approx >= 0], exact)) / max(len(exact), 1)
+        for approx, exact in zip(approx_ids, exact_ids)
+    ]
+    return float(np.mean(hits)) if hits else 0.0
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_SQLITE_MAX_PARAMS = 500
+
+
+def _pixeltable_home() -> str:
+    return os.environ.get(
+        "PIXELTABLE_HOME", os.path.join(os.path.expanduser("~"), ".pixeltable")
+    )
+
+
+def default_cache_dir() -> str:
+    """Files that can be deleted at any time; they are rebuilt on demand."""
+    if "PIXELMEMORY_CACHE_DIR" in os.environ:
+        return os.environ["PIXELMEMORY_CACHE_DIR"]
+    return os.path.join(_pixeltable_home(), "pixelmemory")
+
+
+def default_data_dir() -> str:
+    """Files that stored rows refer to; they must persist as long as the rows do."""
+    if "PIXELMEMORY_DATA_DIR" in os.environ:
+        return os.environ["PIXELMEMORY_DATA_DIR"]
+    return os.path.join(_pixeltable_home(), "pixelmemory_data")
+
+
+def content_hash(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class _SqliteCache:
+    """Process- and thread-safe key/value store backed by a single SQLite file."""
+
+    _schema: str = ""
+    # Statements that bring a file written by an older version up to `_schema`;
+    # each is allowed to fail because it was already applied.
+    _migrations: Tuple[str, ...] = ()
+    _indexes: Tuple[str, ...] = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self._schema)
+            for statement in self._migrations:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError:
+                    pass
+            for statement in self._indexes:
+                conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _evict(conn: sqlite3.Connection, table: str, max_entries: int) -> None:
+        """Drops the least recently `used` rows once `table` exceeds `max_entries`."""
+        (count,) = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        if count > max_entries:
+            # Evict down to 90% so that the next writes do not evict again.
+            conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} ORDER BY used, rowid LIMIT ?)",
+                (count - int(max_entries * 0.9),),
+            )
+
+
+def default_embedding_cache_entries() -> int:
+    return int(os.environ.get("PIXELMEMORY_EMBEDDING_CACHE_ENTRIES", 250_000))
+
+
+class EmbeddingCache(_SqliteCache):
+    """
+    Embeddings keyed by (model id, content hash), shared by every memory on the host.
+
+    At most `max_entries` embeddings are kept (`PIXELMEMORY_EMBEDDING_CACHE_ENTRIES`,
+    default 250,000); when a write goes over the limit, the least recently used
+    tenth is evicted.
+    """
+
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS embeddings ("
+        "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+        "used REAL NOT NULL DEFAULT 0, PRIMARY KEY (model, hash))"
+    )
+    _migrations = ("ALTER TABLE embeddings ADD COLUMN used REAL NOT NULL DEFAULT 0",)
+    _indexes = ("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)",)
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        super().__init__(path)
+        self.max_entries = (
+            max_entries if max_entries is not None else default_embedding_cache_entries()
+        )
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        conn = self._conn()
+        for i in range(0, len(hashes), _SQLITE_MAX_PARAMS):
+            batch = hashes[i : i + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model, *batch],
+            ):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            with conn:
+                conn.executemany(
+                    "UPDATE embeddings SET used = ? WHERE model = ? AND hash = ?",
+                    [(time.time(), model, key) for key in found],
+                )
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]) -> None:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, used) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (model, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in vectors.items()
+                ],
+            )
+            self._evict(conn, "embeddings", self.max_entries)
+
+
+def default_chunk_cache_entries() -> int:
+    return int(os.environ.get("PIXELMEMORY_CHUNK_CACHE_ENTRIES", 10_000))
+
+
+class ChunkCache(_SqliteCache):
+    """
+    Parsed and split document chunks keyed by (document bytes, splitter params).
+
+    At most `max_entries` documents are kept (`PIXELMEMORY_CHUNK_CACHE_ENTRIES`,
+    default 10,000); when a write goes over the limit, the least recently used
+    tenth is evicted.
+    """
+
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS chunks (key TEXT PRIMARY KEY, chunks TEXT NOT NULL, "
+        "used REAL NOT NULL DEFAULT 0)"
+    )
+    _migrations = ("ALTER TABLE chunks ADD COLUMN used REAL NOT NULL DEFAULT 0",)
+    _indexes = ("CREATE INDEX IF NOT EXISTS chunks_used ON chunks (used)",)
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        super().__init__(path)
+        self.max_entries = (
+            max_entries if max_entries is not None else default_chunk_cache_entries()
+        )
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        conn = self._conn()
+        row = conn.execute("SELECT chunks FROM chunks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE chunks SET used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, chunks: List[Dict[str, Any]]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chunks (key, chunks, used) VALUES (?, ?, ?)",
+                (key, json.dumps(chunks), time.time()),
+            )
+            self._evict(conn, "chunks", self.max_entries)
+
+
+_caches: Dict[str, _SqliteCache] = {}
+_cache_lock = threading.Lock()
+
+
+def _get_cache(cache_cls: type, file_name: str) -> Any:
+    with _cache_lock:
+        if file_name not in _caches:
+            _caches[file_name] = cache_cls(os.path.join(default_cache_dir(), file_name))
+        return _caches[file_name]
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    return _get_cache(EmbeddingCache, "embeddings.db")
+
+
+def get_chunk_cache() -> ChunkCache:
+    return _get_cache(ChunkCache, "chunks.db")
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def missing_keys(keys: List[str], found: Dict[str, object]) -> List[str]:
+    return [key for key in dict.fromkeys(keys) if key not in found]
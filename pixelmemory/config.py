@@ -1,4 +1,4 @@
-from typing import Literal, Optional
+from typing import Any, Callable, Dict, List, Literal, Optional, Union
 import pixeltable as pxt
 from dataclasses import dataclass, field
 
@@ -25,6 +25,56 @@ class AudioSplitterParams:
     min_chunk_duration_sec: float = 0.0
 
 
+@dataclass
+class ClipParams:
+    """
+    CPU execution settings for CLIP embedding. `num_threads` sets torch's intra-op
+    thread count when the first model is loaded; the setting is process-wide, and 0
+    keeps the default. `torch_int8` dynamically quantizes the model's linear layers,
+    which is typically 2-3x faster on CPU.
+    """
+
+    batch_size: int = 32
+    num_threads: int = 0
+    backend: Literal["torch", "torch_int8"] = "torch"
+
+
+@dataclass
+class ConsolidationParams:
+    """
+    Compaction of old rows into summaries. Rows older than `min_age_sec`, plus the
+    oldest rows beyond `max_hot_rows`, are grouped by the `group_by` column (e.g. a
+    session id) or, without one, by k-means topic clusters of the `text_column`
+    embeddings. Each group of at most `max_group_size` rows is replaced by one
+    summary row, and the originals move to the `<table>_archive` table.
+    """
+
+    text_column: str
+    min_age_sec: float = 7 * 24 * 3600
+    max_hot_rows: Optional[int] = None
+    group_by: Optional[str] = None
+    max_group_size: int = 50
+    min_group_size: int = 2
+    timestamp_column: Optional[str] = None
+    summarizer: Optional[Callable[[List[str]], str]] = None
+    summary_max_chars: int = 2000
+
+
+@dataclass
+class DedupParams:
+    """
+    Check new values of a column against its index before inserting them. A row
+    whose embedding is at least `threshold` similar to an existing (or earlier
+    inserted) row is dropped (`skip`), folded into that row by updating its other
+    columns (`merge`), or inserted with `<column>_duplicate_of` set to the matching
+    value (`link`). New rows are embedded and scored `batch_size` at a time.
+    """
+
+    threshold: float = 0.95
+    action: Literal["skip", "merge", "link"] = "skip"
+    batch_size: int = 256
+
+
 @dataclass
 class DocumentSplitterParams:
     separators: str = "token_limit"
@@ -42,11 +92,152 @@ class FrameIteratorParams:
     num_frames: Optional[int] = None
 
 
+@dataclass
+class ImagePreprocessParams:
+    """
+    Resize and re-encode images once before they are described or CLIP-embedded.
+    Large screenshots cost far more in request size and vision tokens than the
+    detail they add. The stored copy is the encoded file itself, so it keeps
+    `format` and `quality`.
+    """
+
+    max_edge: Optional[int] = 1024
+    format: Literal["JPEG", "PNG", "WEBP"] = "JPEG"
+    quality: int = 85
+
+
+@dataclass
+class IndexParams:
+    """
+    Vector index used for a context's embeddings.
+
+    `hnsw` is Pixeltable's pgvector index. `exact` skips index construction and
+    brute-forces stored embeddings in process, which is fastest for small memories.
+    `ivf` buckets stored embeddings into `nlist` k-means lists (default sqrt(n))
+    and scans the `nprobe` closest lists per query. After writes, rows are assigned
+    to the existing centroids; k-means is only re-run once the index has grown or
+    shrunk by `retrain_ratio` since it was last trained.
+    """
+
+    kind: Literal["exact", "hnsw", "ivf"] = "hnsw"
+    metric: Literal["cosine", "ip", "l2"] = "cosine"
+    nlist: Optional[int] = None
+    nprobe: int = 8
+    retrain_ratio: float = 2.0
+
+
+@dataclass
+class IngestParams:
+    """
+    Asynchronous ingest: `Memory.add` writes rows to a durable SQLite queue at
+    `path` and returns; `max_workers` threads insert them into the table (running
+    every computed column) in the background. When a job's batch fails, its rows are
+    inserted one at a time, and failed rows are retried up to `max_retries` times
+    with exponential backoff; `Memory.ingest_status` reports each row's outcome and
+    `Memory.retry_ingest` requeues rows that failed for good. A worker holds a job
+    for `lease_sec` at a time and renews it while the insert runs; a job whose
+    lease expires (its process died) is claimed again.
+    """
+
+    path: Optional[str] = None
+    max_workers: int = 2
+    max_retries: int = 3
+    retry_backoff_sec: float = 1.0
+    lease_sec: float = 60.0
+
+
+@dataclass
+class LocalInferenceParams:
+    """
+    Settings for the local providers. `batch_size` is the number of images per
+    captioning forward pass, or of speech segments per faster-whisper decode (1
+    transcribes each file sequentially); `num_workers` files are transcribed at once.
+    `cpu_threads` is given to faster-whisper's model and, for captioning, sets torch's
+    process-wide thread count when the first model is loaded (0 keeps the default).
+    """
+
+    batch_size: int = 8
+    num_workers: int = 2
+    cpu_threads: int = 0
+    device: str = "cpu"
+    compute_type: str = "int8"
+
+
+@dataclass
+class RateLimitParams:
+    """
+    Process-wide ceiling for calls to a remote provider. Requests over the limit wait
+    for capacity rather than failing with 429s, and identical in-flight requests are
+    sent once when `coalesce` is set.
+    """
+
+    requests_per_min: Optional[float] = None
+    tokens_per_min: Optional[float] = None
+    coalesce: bool = True
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Expire rows older than `ttl_sec`, and/or keep only the newest
+    `max_rows_per_key` rows for each value of `key_column`. The oldest rows are
+    deleted by row id, up to `batch_size` rows per delete, which Pixeltable cascades
+    to the chunk, frame and sentence views in bulk.
+    """
+
+    ttl_sec: Optional[float] = None
+    max_rows_per_key: Optional[int] = None
+    key_column: Optional[str] = None
+    timestamp_column: Optional[str] = None
+    batch_size: int = 10_000
+
+
 @dataclass
 class StringSplitterParams:
     separators: str = "sentence"
 
 
+@dataclass
+class VADParams:
+    """
+    Voice-activity-aware audio chunking. The recording's noise floor is the
+    `noise_percentile`-th percentile of its frame levels, and frames at least
+    `threshold_db` above it (and above `min_level_db` dBFS) are speech. Chunks end on
+    pauses, never exceed `max_chunk_sec`, and silences longer than `max_silence_sec`
+    are left out entirely. Audio in which no speech is found is split into fixed
+    `max_chunk_sec` windows.
+    """
+
+    max_chunk_sec: float = 30.0
+    threshold_db: float = 12.0
+    noise_percentile: float = 10.0
+    min_level_db: float = -70.0
+    min_speech_sec: float = 0.25
+    min_silence_sec: float = 0.5
+    max_silence_sec: float = 2.0
+    speech_pad_sec: float = 0.2
+    frame_ms: int = 30
+
+
+@dataclass
+class VideoDecodeParams:
+    """
+    Decode each video once, extracting audio and sampled frames in the same pass, with
+    videos spread over a pool of `max_workers` processes (default: one per core).
+
+    Every sampled frame is written to disk, so frames are taken at `default_fps`
+    unless the video's `frame_params` set `fps` or `num_frames`. Decoded files are
+    kept under `PIXELMEMORY_DATA_DIR` (default `$PIXELTABLE_HOME/pixelmemory_data`),
+    not the cache directory, since the stored rows refer to them; a row's decoded
+    files are deleted along with the row.
+    """
+
+    max_workers: Optional[int] = None
+    audio_sample_rate: int = 16000
+    frame_quality: int = 90
+    default_fps: float = 1.0
+
+
 @dataclass
 class WhisperParams:
     language: Optional[str] = None
@@ -70,3 +261,10 @@ class FrameView:
 class IndexedColumn:
     original_col: str
     indexed_col: str
+    table: Optional[pxt.Table] = None
+    index_name: Optional[str] = None
+    embed_model: Optional[Union[str, pxt.Function]] = None
+    modality: Literal["text", "image"] = "text"
+    index_params: IndexParams = field(default_factory=IndexParams)
+    embedding_col: Optional[str] = None
+    embed_kwargs: Dict[str, Any] = field(default_factory=dict)
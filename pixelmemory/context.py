@@ -3,9 +3,17 @@ import pixeltable as pxt
 from dataclasses import dataclass, field
 from .config import (
     AudioSplitterParams,
+    ClipParams,
+    DedupParams,
     DocumentSplitterParams,
     FrameIteratorParams,
+    ImagePreprocessParams,
+    IndexParams,
+    LocalInferenceParams,
+    RateLimitParams,
     StringSplitterParams,
+    VADParams,
+    VideoDecodeParams,
     WhisperParams,
 )
 
@@ -16,6 +24,8 @@ class Context:
     embed: bool = True
     embed_model: Optional[Union[str, pxt.Function]] = "all-mpnet-base-v2"
     index_name: Optional[str] = None
+    index_params: IndexParams = field(default_factory=IndexParams)
+    rate_limits: Dict[str, RateLimitParams] = field(default_factory=dict)
 
 
 @dataclass
@@ -25,6 +35,8 @@ class Audio(Context):
     chunk_params: AudioSplitterParams = field(
         default_factory=lambda: AudioSplitterParams(chunk_duration_sec=30.0)
     )
+    vad: Optional[VADParams] = None
+    local_params: LocalInferenceParams = field(default_factory=LocalInferenceParams)
     _pxt_type: pxt.Audio = pxt.Audio
 
 
@@ -33,17 +45,22 @@ class Document(Context):
     chunk_params: DocumentSplitterParams = field(
         default_factory=lambda: DocumentSplitterParams(limit=300)
     )
+    incremental_embedding: bool = False
+    cache_chunks: bool = True
     _pxt_type: pxt.Document = pxt.Document
 
 
 @dataclass
 class Image(Context):
-    provider: Literal["openai", "anthropic"] = "openai"
-    model: str = "gpt-4o-mini"
+    provider: Literal["openai", "anthropic", "local"] = "openai"
+    model: Optional[str] = None  # Default: DEFAULT_VISION_MODELS[provider].
     prompt: str = "Describe this image in detail, including colors, objects, scene, and any text visible."
     llm_kwargs: Dict[str, Any] = field(default_factory=dict)
     use_clip: bool = False
     clip_model: str = "openai/clip-vit-base-patch32"
+    clip_params: ClipParams = field(default_factory=ClipParams)
+    preprocess: Optional[ImagePreprocessParams] = None
+    local_params: LocalInferenceParams = field(default_factory=LocalInferenceParams)
     _pxt_type: pxt.Image = pxt.Image
 
 
@@ -51,21 +68,27 @@ class Image(Context):
 class Text(Context):
     use_chunking: bool = False
     chunk_params: StringSplitterParams = field(default_factory=StringSplitterParams)
+    dedup: Optional[DedupParams] = None
     _pxt_type: pxt.String = pxt.String
 
 
 @dataclass
 class Video(Context):
-    frame_params: FrameIteratorParams = field(default_factteaory=FrameIteratorParams)
+    frame_params: FrameIteratorParams = field(default_factory=FrameIteratorParams)
+    decode_params: Optional[VideoDecodeParams] = None
     transcription_model: str = "whisper-1"
     transcription_kwargs: WhisperParams = field(default_factory=WhisperParams)
     audio_chunk_params: AudioSplitterParams = field(
         default_factory=lambda: AudioSplitterParams(chunk_duration_sec=30.0)
     )
-    provider: Literal["openai", "anthropic"] = "openai"
-    model: str = "gpt-4o-mini"
+    audio_vad: Optional[VADParams] = None
+    provider: Literal["openai", "anthropic", "local"] = "openai"
+    model: Optional[str] = None  # Default: DEFAULT_VISION_MODELS[provider].
     prompt: str = "Describe this image in detail, including colors, objects, scene, and any text visible."
     llm_kwargs: Dict[str, Any] = field(default_factory=dict)
     use_clip: bool = False
     clip_model: str = "openai/clip-vit-base-patch32"
+    clip_params: ClipParams = field(default_factory=ClipParams)
+    preprocess: Optional[ImagePreprocessParams] = None
+    local_params: LocalInferenceParams = field(default_factory=LocalInferenceParams)
     _pxt_type: pxt.Video = pxt.Video
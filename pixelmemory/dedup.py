@@ -0,0 +1,262 @@
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pixeltable as pxt
+
+from .config import DedupParams, IndexedColumn
+from .embeddings import normalize
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DedupReport:
+    skipped: int = 0
+    merged: int = 0
+    linked: int = 0
+
+
+def duplicate_of_column(col_name: str) -> str:
+    return f"{col_name}_duplicate_of"
+
+
+def dedup_index(memory_instance: "Memory", col_name: str) -> IndexedColumn:
+    """The index on the column itself (not on its chunks), which dedup scores against."""
+    for indexed in memory_instance.resources.indexed_columns:
+        if indexed.table is memory_instance.table and indexed.indexed_col == col_name:
+            if not isinstance(indexed.embed_model, str):
+                raise ValueError(
+                    "dedup requires a sentence-transformers model id as `embed_model`."
+                )
+            return indexed
+    raise ValueError(f"dedup requires an embedding index on column '{col_name}'.")
+
+
+def setup_dedup(memory_instance: "Memory") -> Dict[str, DedupParams]:
+    columns = {}
+    for col in memory_instance.context:
+        params = getattr(col, "dedup", None)
+        if params is None:
+            continue
+        dedup_index(memory_instance, col.id)
+        if params.action == "link":
+            memory_instance.table.add_column(
+                **{duplicate_of_column(col.id): Optional[pxt.String]},
+                if_exists="ignore",
+            )
+        columns[col.id] = params
+    return columns
+
+
+class DedupSet:
+    """
+    Unit vectors and values of the stored rows of one dedup column. Rows added by
+    an insert are appended in place (into a buffer that doubles as it fills), so
+    dedup does not re-read the whole column after every insert.
+    """
+
+    def __init__(self, vectors: np.ndarray, values: List[Any]):
+        self._vectors = normalize(np.asarray(vectors, dtype=np.float32))
+        self._size = len(values)
+        self.values = values
+
+    def nearest(self, unit: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Position and cosine similarity of each query's nearest stored row."""
+        if self._size == 0:
+            return np.full(len(unit), -1), np.full(len(unit), -np.inf)
+        scores = unit @ self._vectors[: self._size].T
+        best = np.argmax(scores, axis=-1)
+        return best, scores[np.arange(len(unit)), best]
+
+    def extend(self, unit: np.ndarray, values: List[Any]) -> None:
+        size = self._size + len(values)
+        if self._size == 0:
+            self._vectors = np.empty((size, unit.shape[1]), dtype=np.float32)
+        elif size > len(self._vectors):
+            capacity = max(size, 2 * len(self._vectors))
+            grown = np.empty((capacity, unit.shape[1]), dtype=np.float32)
+            grown[: self._size] = self._vectors[: self._size]
+            self._vectors = grown
+        self._vectors[self._size : size] = unit
+        self.values.extend(values)
+        self._size = size
+
+
+def load_dedup_set(
+    memory_instance: "Memory", indexed: IndexedColumn, tenant: Optional[str] = None
+) -> Tuple[DedupSet, int]:
+    """The column's `DedupSet` and the table version it is current at."""
+    from .search import embedding_expr, tenant_expr
+
+    key = (indexed.indexed_col, tenant)
+    version = memory_instance._table_version()
+    dedup_set = memory_instance._dedup_cache.get(key, version)
+    if dedup_set is None:
+        table = indexed.table
+        query = table
+        if tenant is not None:
+            query = table.where(tenant_expr(memory_instance, table, tenant))
+        rows = list(
+            query.select(
+                pxm_embedding=embedding_expr(indexed),
+                pxm_value=getattr(table, indexed.indexed_col),
+            ).collect()
+        )
+        vectors = (
+            np.stack([row["pxm_embedding"] for row in rows])
+            if rows
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        dedup_set = DedupSet(vectors, [row["pxm_value"] for row in rows])
+        memory_instance._dedup_cache.put(key, dedup_set, version)
+    return dedup_set, version
+
+
+class DedupBatch:
+    """
+    The rows one insert adds to each dedup column, appended to the cached
+    `DedupSet`s by `commit` once the insert has been written. A set is only kept
+    if the table advanced by exactly the writes made here (merges and the insert
+    itself); any other write makes it stale, and it is reloaded on the next insert.
+    """
+
+    def __init__(self, memory_instance: "Memory"):
+        self.memory = memory_instance
+        self.writes = 0
+        self._pending: List[tuple] = []
+
+    def add(
+        self,
+        key: Tuple,
+        dedup_set: DedupSet,
+        version: int,
+        writes_before: int,
+        unit: List[np.ndarray],
+        values: List[Any],
+    ) -> None:
+        """`writes_before` is `self.writes` as of loading `dedup_set` at `version`."""
+        self._pending.append((key, dedup_set, version, writes_before, unit, values))
+
+    def commit(self, rows: List[Dict[str, Any]]) -> None:
+        """`rows` are the rows that were inserted (none if nothing was)."""
+        current = self.memory._table_version()
+        writes = self.writes + (1 if rows else 0)
+        for key, dedup_set, version, writes_before, unit, values in self._pending:
+            if current != version + writes - writes_before:
+                continue
+            col_name = key[0]
+            # Rows kept for this column may still have been dropped by a later one.
+            inserted = Counter(row.get(col_name) for row in rows)
+            keep = []
+            for i, value in enumerate(values):
+                if inserted[value] > 0:
+                    inserted[value] -= 1
+                    keep.append(i)
+            if keep:
+                dedup_set.extend(
+                    np.stack([unit[i] for i in keep]), [values[i] for i in keep]
+                )
+            self.memory._dedup_cache.put(key, dedup_set, current)
+
+
+def dedup_rows(
+    memory_instance: "Memory",
+    rows: List[Dict[str, Any]],
+    tenant: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], DedupBatch]:
+    """
+    Apply every column's `DedupParams` to `rows` and return the rows that should
+    still be inserted, with the `DedupBatch` to commit after inserting them.
+    Merges into existing rows are written here.
+    """
+    from .search import query_vectors, tenant_expr
+
+    batch_state = DedupBatch(memory_instance)
+    for col_name, params in memory_instance._dedup_columns.items():
+        indexed = dedup_index(memory_instance, col_name)
+        report = DedupReport()
+        existing, version = load_dedup_set(memory_instance, indexed, tenant)
+        writes_before = batch_state.writes
+        kept: List[Dict[str, Any]] = []
+        # Unit vectors of rows accepted earlier in this insert, so that duplicates
+        # within one batch are caught too.
+        kept_vectors = np.zeros((0, 0), dtype=np.float32)
+        kept_positions: List[int] = []
+        new_vectors: List[np.ndarray] = []
+        new_values: List[Any] = []
+
+        for start in range(0, len(rows), params.batch_size):
+            batch = rows[start : start + params.batch_size]
+            candidates = [row for row in batch if row.get(col_name)]
+            kept.extend(row for row in batch if not row.get(col_name))
+            if not candidates:
+                continue
+            vectors = query_vectors(indexed, [row[col_name] for row in candidates])
+            unit = normalize(vectors)
+            ids, scores = existing.nearest(unit)
+
+            for i, row in enumerate(candidates):
+                target: Optional[Dict[str, Any]] = None
+                target_is_new = False
+                if ids[i] >= 0 and scores[i] >= params.threshold:
+                    target = {col_name: existing.values[ids[i]]}
+                if target is None and kept_positions:
+                    similarities = kept_vectors @ unit[i]
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= params.threshold:
+                        target, target_is_new = kept[kept_positions[best]], True
+
+                if target is None:
+                    kept_positions.append(len(kept))
+                    kept.append(dict(row))
+                    kept_vectors = (
+                        unit[i : i + 1]
+                        if not kept_vectors.size
+                        else np.vstack([kept_vectors, unit[i : i + 1]])
+                    )
+                    new_vectors.append(unit[i])
+                    new_values.append(row[col_name])
+                elif params.action == "skip":
+                    report.skipped += 1
+                elif params.action == "merge":
+                    updates = {
+                        col: value
+                        for col, value in row.items()
+                        if col != col_name and value is not None
+                    }
+                    if target_is_new:
+                        target.update(updates)
+                    elif updates:
+                        table = memory_instance.table
+                        predicate = getattr(table, col_name) == target[col_name]
+                        if tenant is not None:
+                            predicate &= tenant_expr(memory_instance, table, tenant)
+                        memory_instance.update(updates, where=predicate)
+                        batch_state.writes += 1
+                    report.merged += 1
+                else:
+                    kept.append(
+                        {**row, duplicate_of_column(col_name): target[col_name]}
+                    )
+                    new_vectors.append(unit[i])
+                    new_values.append(row[col_name])
+                    report.linked += 1
+
+        if report.skipped or report.merged or report.linked:
+            logger.info("Dedup on '%s': %s", col_name, report)
+        batch_state.add(
+            (col_name, tenant),
+            existing,
+            version,
+            writes_before,
+            new_vectors,
+            new_values,
+        )
+        rows = kept
+    return rows, batch_state
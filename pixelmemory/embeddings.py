@@ -0,0 +1,49 @@
+import threading
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+
+def get_sentence_transformer(model_id: str):
+    with _models_lock:
+        model = _models.get(model_id)
+        if model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise ImportError(
+                    "Please install the sentence-transformers package. pip install sentence-transformers."
+                )
+            model = SentenceTransformer(model_id)
+            _models[model_id] = model
+        return model
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def encode(model: Any, texts: Union[str, List[str]]) -> np.ndarray:
+    """
+    Encode text into unit-length float32 vectors outside of a Pixeltable query.
+
+    Only sentence-transformers model ids can be run eagerly; Pixeltable functions
+    are only evaluated inside computed columns and similarity queries.
+    """
+    if not isinstance(model, str):
+        raise ValueError(
+            "Eager query encoding requires a sentence-transformers model id as `embed_model`."
+        )
+    single = isinstance(texts, str)
+    batch = [texts] if single else list(texts)
+    vectors = get_sentence_transformer(model).encode(
+        batch, convert_to_numpy=True, show_progress_bar=False
+    )
+    vectors = normalize(vectors)
+    return vectors[0] if single else vectors
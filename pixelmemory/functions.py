@@ -0,0 +1,148 @@
+import base64
+import io
+import os
+import uuid
+from typing import List, Optional, Tuple
+
+import PIL.Image
+import pixeltable as pxt
+import pixeltable.type_system as ts
+from pixeltable.func import Batch
+
+from .cache import content_hash, get_embedding_cache, missing_keys
+from .embeddings import get_sentence_transformer
+
+
+@pxt.udf
+def new_row_id() -> str:
+    return uuid.uuid4().hex
+
+
+@pxt.udf(batch_size=64)
+def cached_sentence_embedding(
+    sentence: Batch[str], *, model_id: str
+) -> Batch[pxt.Array[(None,), pxt.Float]]:
+    """
+    Sentence-transformers embedding that is only computed for text it has not seen.
+
+    Embeddings are stored in the host-wide embedding cache under the SHA-256 of the
+    text, so re-chunking an edited document only embeds the chunks that changed.
+    """
+    cache = get_embedding_cache()
+    hashes = [content_hash(s) for s in sentence]
+    found = cache.get_many(model_id, hashes)
+    missing = missing_keys(hashes, found)
+    if missing:
+        text_by_hash = dict(zip(hashes, sentence))
+        vectors = get_sentence_transformer(model_id).encode(
+            [text_by_hash[h] for h in missing],
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        computed = dict(zip(missing, vectors))
+        cache.put_many(model_id, computed)
+        found.update(computed)
+    return [found[h] for h in hashes]
+
+
+@cached_sentence_embedding.conditional_return_type
+def _(model_id: str) -> ts.ArrayType:
+    model = get_sentence_transformer(model_id)
+    get_dimension = getattr(model, "get_embedding_dimension", None) or getattr(
+        model, "get_sentence_embedding_dimension"
+    )
+    return ts.ArrayType((get_dimension(),), dtype=ts.FloatType(), nullable=False)
+
+
+_encodings: dict = {}
+
+
+def get_encoding(name: str):
+    if name not in _encodings:
+        try:
+            import tiktoken
+        except ImportError:
+            raise ImportError(
+                "Please install the tiktoken package. pip install tiktoken."
+            )
+        _encodings[name] = tiktoken.get_encoding(name)
+    return _encodings[name]
+
+
+def count_tokens(texts: List[str], encoding: str = "cl100k_base") -> List[int]:
+    return [
+        len(tokens) for tokens in get_encoding(encoding).encode_ordinary_batch(texts)
+    ]
+
+
+@pxt.udf(batch_size=256)
+def token_count(text: Batch[str], *, encoding: str = "cl100k_base") -> Batch[int]:
+    """Token count under the tiktoken `encoding` that `DocumentSplitter` uses."""
+    return count_tokens(text, encoding)
+
+
+# Formats every vision provider accepts as-is; anything else is sent as PNG.
+_WIRE_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+
+
+def image_format(image: PIL.Image.Image) -> str:
+    return image.format if image.format in _WIRE_FORMATS else "PNG"
+
+
+def encoded_bytes(image: PIL.Image.Image) -> Optional[bytes]:
+    """
+    The image's bytes as already encoded, i.e. the unmodified file it was loaded
+    from (such as the file `preprocess_image` wrote). None if it has to be encoded.
+    """
+    path = getattr(image, "filename", None)
+    if path and image.format in _WIRE_FORMATS and os.path.isfile(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return None
+
+
+def encode_image(image: PIL.Image.Image) -> Tuple[str, str]:
+    """
+    Return (media type, base64 data), keeping the image's own format when known.
+    Already encoded bytes are sent as they are, so a preprocessed JPEG keeps its
+    quality rather than being compressed a second time.
+    """
+    fmt = image_format(image)
+    data = encoded_bytes(image)
+    if data is not None:
+        return f"image/{fmt.lower()}", base64.b64encode(data).decode("ascii")
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return f"image/{fmt.lower()}", base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@pxt.udf
+def preprocess_image(
+    image: PIL.Image.Image,
+    *,
+    max_edge: Optional[int] = None,
+    format: str = "JPEG",
+    quality: int = 85,
+) -> pxt.Image:
+    """
+    Downscale `image` so its longest edge is at most `max_edge` and re-encode it as
+    `format` at `quality`.
+
+    The encoded file is returned rather than a PIL image: Pixeltable moves files
+    from its temp directory into the media store as they are, whereas it would save
+    a PIL image again as JPEG (or WebP) at its default quality. So the stored
+    column, and what providers receive, keep exactly `format` and `quality`.
+    """
+    from pixeltable.env import Env
+
+    if max_edge is not None and max(image.size) > max_edge:
+        image = image.copy()
+        image.thumbnail((max_edge, max_edge), PIL.Image.Resampling.LANCZOS)
+    if format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    path = Env.get().tmp_dir / f"{uuid.uuid4().hex}.{format.lower()}"
+    with open(path, "wb") as f:
+        image.save(f, format=format, quality=quality)
+    return str(path)
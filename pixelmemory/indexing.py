@@ -1,8 +1,7 @@
 import pixeltable as pxt
-from typing import Any, Optional
-import pixeltable as pxt
+from typing import Any, Dict, Optional
 import dataclasses
-from .memory import Memory
+from .memory import Memory, DEFAULT_EMBED_MODEL
 from .context import (
     Image,
     Audio,
@@ -13,7 +12,10 @@ from .context import (
 from .config import (
     ChunkView,
     FrameView,
+    IndexedColumn,
+    IndexParams,
 )
+from .ratelimit import configure_limiter
 from .vision import (
     get_vision_function,
     prepare_vision_args,
@@ -21,14 +23,74 @@ from .vision import (
 )
 
 
+def add_index(
+    memory_instance: Memory,
+    original_col: str,
+    target_obj: pxt.Table,
+    indexed_col: str,
+    index_name: str,
+    embedding: pxt.Function,
+    embed_model_id: Any,
+    index_params: IndexParams,
+    modality: str = "text",
+    if_exists: str = "ignore",
+    embed_kwargs: Optional[Dict[str, Any]] = None,
+) -> None:
+    embedding_col = None
+    if index_params.kind == "hnsw":
+        with memory_instance._ddl_lock:
+            target_obj.add_embedding_index(
+                column=indexed_col,
+                idx_name=index_name,
+                embedding=embedding,
+                metric=index_params.metric,
+                if_exists=if_exists,
+            )
+    else:
+        # Exact and IVF search run in process over stored embeddings, so no
+        # pgvector index is built.
+        embedding_col = f"{indexed_col}_embedding"
+        with memory_instance._ddl_lock:
+            target_obj.add_computed_column(
+                **{embedding_col: embedding(getattr(target_obj, indexed_col))},
+                if_exists=if_exists,
+            )
+
+    memory_instance.resources.indexed_columns.append(
+        IndexedColumn(
+            original_col=original_col,
+            indexed_col=indexed_col,
+            table=target_obj,
+            index_name=index_name,
+            embed_model=embed_model_id,
+            modality=modality,
+            index_params=index_params,
+            embedding_col=embedding_col,
+            embed_kwargs=embed_kwargs or {},
+        )
+    )
+
+
 def setup_column_indexing(
     memory_instance: Memory,
     col_name: str,
     col_type: Any,
     col_settings: Optional[Any] = None,
 ) -> None:
-    embed_model = memory_instance._get_embed_model(col_settings.text_embedding_model)
-    index_name = col_settings.index_name or "similarity"
+    for provider, params in col_settings.rate_limits.items():
+        configure_limiter(provider, params)
+
+    if getattr(col_settings, "incremental_embedding", False):
+        from .functions import cached_sentence_embedding
+
+        if not isinstance(col_settings.embed_model, str):
+            raise ValueError(
+                "incremental_embedding requires a sentence-transformers model id as `embed_model`."
+            )
+        embed_model = cached_sentence_embedding.using(model_id=col_settings.embed_model)
+    else:
+        embed_model = memory_instance._get_embed_model(col_settings.embed_model)
+    index_name = col_settings.index_name or f"{col_name}_similarity"
 
     if col_type == pxt.Image:
         setup_image_indexing(
@@ -58,44 +120,95 @@ def setup_column_indexing(
 
 
 def setup_vision_indexing(
+    memory_instance: Memory,
+    original_col: str,
     target_obj: pxt.Table,
     img_col_name: str,
     embed_model: pxt.Function,
     index_name: str,
     col_settings: Image,
 ) -> None:
+    # Vision calls and CLIP both read the preprocessed copy, which is stored once.
+    source_col_name = img_col_name
+    if col_settings.preprocess is not None:
+        from .functions import preprocess_image
+
+        source_col_name = f"{img_col_name}_preprocessed"
+        with memory_instance._ddl_lock:
+            target_obj.add_computed_column(
+                **{
+                    source_col_name: preprocess_image(
+                        getattr(target_obj, img_col_name),
+                        **dataclasses.asdict(col_settings.preprocess),
+                    )
+                },
+                if_exists="ignore",
+            )
+
     vision_func = get_vision_function(col_settings.provider)
     vision_args = prepare_vision_args(
         col_settings.provider,
         col_settings.model,
         col_settings.prompt,
         col_settings.llm_kwargs,
-        img_col_name,
+        source_col_name,
         target_obj,
+        col_settings.local_params,
     )
 
-    description_col_name = create_vision_computed_column(
-        col_settings.provider, img_col_name, vision_func, vision_args, target_obj
-    )
+    with memory_instance._ddl_lock:
+        description_col_name = create_vision_computed_column(
+            col_settings.provider,
+            img_col_name,
+            vision_func,
+            vision_args,
+            target_obj,
+        )
 
-    target_obj.add_embedding_index(
-        column=description_col_name,
-        idx_name=index_name,
-        embedding=embed_model,
-        if_exists="ignore",
+    add_index(
+        memory_instance,
+        original_col,
+        target_obj,
+        description_col_name,
+        index_name,
+        embed_model,
+        col_settings.embed_model or DEFAULT_EMBED_MODEL,
+        col_settings.index_params,
     )
 
     if col_settings.use_clip:
-        from pixeltable.functions.huggingface import clip
+        from .local import clip_embed
 
-        target_obj.add_embedding_index(
-            column=img_col_name,
-            idx_name=f"{index_name}_clip",
-            embedding=clip.using(model_id=col_settings.clip_model),
-            if_exists="ignore",
+        clip_kwargs = dataclasses.asdict(col_settings.clip_params)
+        add_index(
+            memory_instance,
+            original_col,
+            target_obj,
+            source_col_name,
+            f"{index_name}_clip",
+            clip_embed.using(model_id=col_settings.clip_model, **clip_kwargs),
+            col_settings.clip_model,
+            col_settings.index_params,
+            modality="image",
+            embed_kwargs=clip_kwargs,
         )
 
 
+def add_chunk_stats(view: pxt.Table, encoding: str = "cl100k_base") -> None:
+    """
+    Store each chunk's token and character count, so prompt packing never
+    re-tokenizes it and `Memory.stats` can report the chunk length distribution.
+    Text chunk views get their character offsets from `SentenceSplitter`;
+    sentence views carry time offsets instead.
+    """
+    from .functions import token_count
+
+    view.add_computed_column(
+        token_count=token_count(view.text, encoding=encoding), if_exists="ignore"
+    )
+    view.add_computed_column(char_count=view.text.len(), if_exists="ignore")
+
+
 def setup_document_indexing(
     memory_instance: Memory,
     col_name: str,
@@ -104,29 +217,42 @@ def setup_document_indexing(
     col_settings: Document,
 ) -> None:
     from pixeltable.iterators import DocumentSplitter
+    from .iterators import CachedDocumentSplitter
+
+    splitter = CachedDocumentSplitter if col_settings.cache_chunks else DocumentSplitter
 
     chunk_view_name = f"{memory_instance.table_name}_{col_name}_chunks"
     chunk_view_path = f"{memory_instance.namespace}.{chunk_view_name}"
 
     document_source = getattr(memory_instance.table, col_name)
 
-    chunk_view = pxt.create_view(
-        chunk_view_path,
-        memory_instance.table,
-        iterator=DocumentSplitter.create(
-            document=document_source, **dataclasses.asdict(col_settings.chunk_params)
-        ),
-        if_exists="replace_force",
-    )
-    if not chunk_view:
-        chunk_view = pxt.get_table(chunk_view_path)
+    with memory_instance._ddl_lock:
+        chunk_view = pxt.create_view(
+            chunk_view_path,
+            memory_instance.table,
+            iterator=splitter.create(
+                document=document_source, **dataclasses.asdict(col_settings.chunk_params)
+            ),
+            if_exists="replace_force",
+        )
+        if not chunk_view:
+            chunk_view = pxt.get_table(chunk_view_path)
 
     memory_instance.resources.chunk_views.append(
         ChunkView(name=col_name, table=chunk_view)
     )
+    with memory_instance._ddl_lock:
+        add_chunk_stats(chunk_view, col_settings.chunk_params.tiktoken_encoding)
 
-    chunk_view.add_embedding_index(
-        column="text", idx_name=index_name, embedding=embed_model, if_exists="ignore"
+    add_index(
+        memory_instance,
+        col_name,
+        chunk_view,
+        "text",
+        index_name,
+        embed_model,
+        col_settings.embed_model or DEFAULT_EMBED_MODEL,
+        col_settings.index_params,
     )
 
 
@@ -138,6 +264,8 @@ def setup_image_indexing(
     col_settings: Image,
 ) -> None:
     setup_vision_indexing(
+        memory_instance,
+        col_name,
         memory_instance.table,
         col_name,
         embed_model,
@@ -154,14 +282,11 @@ def setup_audio_indexing(
     col_settings: Audio,
     audio_col: Optional[pxt.Column] = None,
 ) -> None:
-    from pixeltable.iterators import AudioSplitter, StringSplitter
-    from pixeltable.functions.openai import transcriptions
+    from pixeltable.iterators import AudioSplitter
+    from .iterators import TranscriptSentenceSplitter
+    from .transcription import get_transcription_function, prepare_transcription_args
 
-    transcription_kwargs = {
-        k: v
-        for k, v in dataclasses.asdict(col_settings.transcription_kwargs).items()
-        if v is not None
-    }
+    transcriptions = get_transcription_function(col_settings.transcription_model)
 
     audio_chunk_view_name = f"{memory_instance.table_name}_{col_name}_audio_chunks"
     audio_chunk_view_path = f"{memory_instance.namespace}.{audio_chunk_view_name}"
@@ -170,50 +295,74 @@ def setup_audio_indexing(
         audio_col if audio_col is not None else getattr(memory_instance.table, col_name)
     )
 
-    audio_chunk_view = pxt.create_view(
-        audio_chunk_view_path,
-        memory_instance.table,
-        iterator=AudioSplitter.create(
+    if col_settings.vad is not None:
+        from .iterators import VADAudioSplitter
+
+        audio_iterator = VADAudioSplitter.create(
+            audio=audio_source, **dataclasses.asdict(col_settings.vad)
+        )
+    else:
+        audio_iterator = AudioSplitter.create(
             audio=audio_source, **dataclasses.asdict(col_settings.chunk_params)
-        ),
-        if_exists="replace_force",
-    )
-    if not audio_chunk_view:
-        audio_chunk_view = pxt.get_table(audio_chunk_view_path)
+        )
+
+    with memory_instance._ddl_lock:
+        audio_chunk_view = pxt.create_view(
+            audio_chunk_view_path,
+            memory_instance.table,
+            iterator=audio_iterator,
+            if_exists="replace_force",
+        )
+        if not audio_chunk_view:
+            audio_chunk_view = pxt.get_table(audio_chunk_view_path)
 
     transcription_col_name = f"{col_name}_transcription"
-    whisper_args = {
-        "audio": audio_chunk_view.audio_chunk,
-        "model": col_settings.transcription_model,
-        **transcription_kwargs,
-    }
-
-    audio_chunk_view.add_computed_column(
-        **{transcription_col_name: transcriptions(**whisper_args)}, if_exists="ignore"
+    whisper_args = prepare_transcription_args(
+        col_settings.transcription_model,
+        col_settings.transcription_kwargs,
+        col_settings.local_params,
+        audio_chunk_view.audio_chunk,
     )
 
+    with memory_instance._ddl_lock:
+        audio_chunk_view.add_computed_column(
+            **{transcription_col_name: transcriptions(**whisper_args)}, if_exists="ignore"
+        )
+
     sentence_view_name = f"{memory_instance.table_name}_{col_name}_sentence_chunks"
     sentence_view_path = f"{memory_instance.namespace}.{sentence_view_name}"
 
-    transcription_text_col = getattr(audio_chunk_view, transcription_col_name).text
-
-    sentence_chunk_view = pxt.create_view(
-        sentence_view_path,
-        audio_chunk_view,
-        iterator=StringSplitter.create(
-            text=transcription_text_col, separators="sentence"
-        ),
-        if_exists="replace_force",
-    )
-    if not sentence_chunk_view:
-        sentence_chunk_view = pxt.get_table(sentence_view_path)
+    # Sentences carry their offsets into the source audio, from the transcription's
+    # segment times plus the chunk's start.
+    with memory_instance._ddl_lock:
+        sentence_chunk_view = pxt.create_view(
+            sentence_view_path,
+            audio_chunk_view,
+            iterator=TranscriptSentenceSplitter.create(
+                transcription=getattr(audio_chunk_view, transcription_col_name),
+                start_sec=audio_chunk_view.start_time_sec,
+                end_sec=audio_chunk_view.end_time_sec,
+            ),
+            if_exists="replace_force",
+        )
+        if not sentence_chunk_view:
+            sentence_chunk_view = pxt.get_table(sentence_view_path)
 
     memory_instance.resources.chunk_views.append(
         ChunkView(name=col_name, table=sentence_chunk_view)
     )
+    with memory_instance._ddl_lock:
+        add_chunk_stats(sentence_chunk_view)
 
-    sentence_chunk_view.add_embedding_index(
-        column="text", idx_name=index_name, embedding=embed_model, if_exists="ignore"
+    add_index(
+        memory_instance,
+        col_name,
+        sentence_chunk_view,
+        "text",
+        index_name,
+        embed_model,
+        col_settings.embed_model or DEFAULT_EMBED_MODEL,
+        col_settings.index_params,
     )
 
 
@@ -227,17 +376,60 @@ def setup_video_indexing(
     from pixeltable.functions.video import extract_audio
     from pixeltable.iterators import FrameIterator
 
+    table = memory_instance.table
+    video_col = getattr(table, col_name)
+    decode_params = col_settings.decode_params
+    if decode_params is not None:
+        from .iterators import DecodedFrameIterator
+        from .search import ROW_ID_COLUMN
+        from .video import decode_video, decoded_audio, decoded_root
+
+        fps = col_settings.frame_params.fps
+        num_frames = col_settings.frame_params.num_frames
+        if fps is None and num_frames is None:
+            fps = decode_params.default_fps
+        decoded_col_name = f"{col_name}_decoded"
+        with memory_instance._ddl_lock:
+            table.add_computed_column(
+                **{
+                    decoded_col_name: decode_video(
+                        video_col,
+                        getattr(table, ROW_ID_COLUMN),
+                        root=decoded_root(
+                            memory_instance.namespace, memory_instance.table_name
+                        ),
+                        fps=fps,
+                        num_frames=num_frames,
+                        max_workers=decode_params.max_workers,
+                        sample_rate=decode_params.audio_sample_rate,
+                        quality=decode_params.frame_quality,
+                    )
+                },
+                if_exists="ignore",
+            )
+        decoded_col = getattr(table, decoded_col_name)
+        audio_expr = decoded_audio(decoded_col)
+        frame_iterator = DecodedFrameIterator.create(decoded=decoded_col)
+    else:
+        audio_expr = extract_audio(video_col)
+        frame_iterator = FrameIterator.create(
+            video=video_col, **dataclasses.asdict(col_settings.frame_params)
+        )
+
     audio_col_name = f"{col_name}_audio"
-    memory_instance.table.add_computed_column(
-        **{audio_col_name: extract_audio(getattr(memory_instance.table, col_name))},
-        if_exists="ignore",
-    )
+    with memory_instance._ddl_lock:
+        table.add_computed_column(**{audio_col_name: audio_expr}, if_exists="ignore")
     audio_col = getattr(memory_instance.table, audio_col_name)
     audio_col_settings = Audio(
-        name=col_name,
+        id=col_name,
+        embed_model=col_settings.embed_model,
+        index_params=col_settings.index_params,
+        rate_limits=col_settings.rate_limits,
         chunk_params=col_settings.audio_chunk_params,
+        vad=col_settings.audio_vad,
         transcription_model=col_settings.transcription_model,
         transcription_kwargs=col_settings.transcription_kwargs,
+        local_params=col_settings.local_params,
     )
     setup_audio_indexing(
         memory_instance,
@@ -251,36 +443,44 @@ def setup_video_indexing(
     frame_view_name = f"{memory_instance.table_name}_{col_name}_frames"
     frame_view_path = f"{memory_instance.namespace}.{frame_view_name}"
 
-    frame_view = pxt.create_view(
-        frame_view_path,
-        memory_instance.table,
-        iterator=FrameIterator.create(
-            video=getattr(memory_instance.table, col_name),
-            **dataclasses.asdict(col_settings.frame_params),
-        ),
-        if_exists="ignore",
-    )
-    if not frame_view:
-        frame_view = pxt.get_table(frame_view_path)
+    with memory_instance._ddl_lock:
+        frame_view = pxt.create_view(
+            frame_view_path,
+            memory_instance.table,
+            iterator=frame_iterator,
+            if_exists="ignore",
+        )
+        if not frame_view:
+            frame_view = pxt.get_table(frame_view_path)
     memory_instance.resources.frame_views.append(
         FrameView(name=col_name, table=frame_view)
     )
 
     image_col_settings = Image(
-        name="frame",
+        id="frame",
+        embed_model=col_settings.embed_model,
+        index_params=col_settings.index_params,
+        rate_limits=col_settings.rate_limits,
         provider=col_settings.provider,
         model=col_settings.model,
         prompt=col_settings.prompt,
         llm_kwargs=col_settings.llm_kwargs,
         use_clip=col_settings.use_clip,
         clip_model=col_settings.clip_model,
+        clip_params=col_settings.clip_params,
+        preprocess=col_settings.preprocess,
+        local_params=col_settings.local_params,
     )
 
+    # Frame descriptions get their own name, so that `search` can tell them
+    # apart from the transcript index of the same column.
     setup_vision_indexing(
+        memory_instance,
+        col_name,
         frame_view,
         "frame",
         embed_model,
-        index_name,
+        f"{index_name}_frames",
         image_col_settings,
     )
 
@@ -293,45 +493,61 @@ def setup_string_indexing(
     col_settings: Text,
 ) -> None:
     if col_settings.use_chunking:
-        from pixeltable.iterators import StringSplitter
+        from .iterators import SentenceSplitter
 
         chunk_view_name = f"{memory_instance.table_name}_{col_name}_chunks"
         chunk_view_path = f"{memory_instance.namespace}.{chunk_view_name}"
 
         text_source = getattr(memory_instance.table, col_name)
 
-        chunk_view = pxt.create_view(
-            chunk_view_path,
-            memory_instance.table,
-            iterator=StringSplitter.create(
-                text=text_source, **dataclasses.asdict(col_settings.chunk_params)
-            ),
-            if_exists="replace_force",
-        )
-        if not chunk_view:
-            chunk_view = pxt.get_table(chunk_view_path)
+        with memory_instance._ddl_lock:
+            chunk_view = pxt.create_view(
+                chunk_view_path,
+                memory_instance.table,
+                iterator=SentenceSplitter.create(
+                    text=text_source, **dataclasses.asdict(col_settings.chunk_params)
+                ),
+                if_exists="replace_force",
+            )
+            if not chunk_view:
+                chunk_view = pxt.get_table(chunk_view_path)
 
         memory_instance.resources.chunk_views.append(
             ChunkView(name=col_name, table=chunk_view)
         )
+        with memory_instance._ddl_lock:
+            add_chunk_stats(chunk_view)
 
-        chunk_view.add_embedding_index(
-            column="text",
-            idx_name=index_name,
-            embedding=embed_model,
-            if_exists="ignore",
+        add_index(
+            memory_instance,
+            col_name,
+            chunk_view,
+            "text",
+            index_name,
+            embed_model,
+            col_settings.embed_model or DEFAULT_EMBED_MODEL,
+            col_settings.index_params,
         )
 
-        memory_instance.table.add_embedding_index(
-            column=col_name,
-            idx_name=f"{index_name}_direct",
-            embedding=embed_model,
-            if_exists="ignore",
+        add_index(
+            memory_instance,
+            col_name,
+            memory_instance.table,
+            col_name,
+            f"{index_name}_direct",
+            embed_model,
+            col_settings.embed_model or DEFAULT_EMBED_MODEL,
+            col_settings.index_params,
         )
     else:
-        memory_instance.table.add_embedding_index(
-            column=col_name,
-            idx_name=index_name,
-            embedding=embed_model,
+        add_index(
+            memory_instance,
+            col_name,
+            memory_instance.table,
+            col_name,
+            index_name,
+            embed_model,
+            col_settings.embed_model or DEFAULT_EMBED_MODEL,
+            col_settings.index_params,
             if_exists="replace_force",
         )
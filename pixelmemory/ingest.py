@@ -0,0 +1,425 @@
+import logging
+import os
+import pickle
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .cache import _SqliteCache, default_cache_dir
+from .config import IngestParams
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class IngestRowStatus:
+    index: int
+    status: str
+    error: Optional[str]
+
+
+@dataclass
+class IngestStatus:
+    """
+    A job's status, with the status of each of its rows in submission order. A job
+    is done once every row is; it has failed if any row failed permanently.
+    """
+
+    job_id: int
+    status: str
+    num_rows: int
+    attempts: int
+    error: Optional[str]
+    rows: List[IngestRowStatus] = field(default_factory=list)
+
+
+class IngestStore(_SqliteCache):
+    """Write-ahead log of submitted rows; a job stays here until it is indexed."""
+
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, rows BLOB NOT NULL, "
+        "num_rows INTEGER NOT NULL, status TEXT NOT NULL, "
+        "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+        "next_attempt_at REAL NOT NULL, updated_at REAL NOT NULL, "
+        "owner TEXT, lease_expires_at REAL)"
+    )
+    # Outcome of each row attempted on its own, after its job's batch insert failed.
+    _migrations = (
+        "CREATE TABLE IF NOT EXISTS job_rows ("
+        "job_id INTEGER NOT NULL, idx INTEGER NOT NULL, status TEXT NOT NULL, "
+        "error TEXT, PRIMARY KEY (job_id, idx))",
+    )
+
+    def append(self, rows: List[Dict[str, Any]]) -> int:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (rows, num_rows, status, next_attempt_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (pickle.dumps(rows), len(rows), PENDING, now, now),
+            )
+        return cursor.lastrowid
+
+    def claim(self, owner: str, lease_sec: float) -> Optional[tuple]:
+        """
+        Lease the oldest due job to `owner` for `lease_sec` and return (id, rows,
+        attempts). Running jobs whose lease expired, because the process holding
+        them died, are due again.
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers never
+            # claim the same job.
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, rows, attempts, status FROM jobs "
+                "WHERE (status = ? AND next_attempt_at <= ?) "
+                "OR (status = ? AND lease_expires_at < ?) ORDER BY id LIMIT 1",
+                (PENDING, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[3] == RUNNING:
+                logger.warning("Reclaiming ingest job %d; its lease expired", row[0])
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (RUNNING, owner, now + lease_sec, now, row[0]),
+            )
+        return row[0], pickle.loads(row[1]), row[2]
+
+    def heartbeat(self, job_ids: Iterable[int], owner: str, lease_sec: float) -> None:
+        """Extend the leases `owner` still holds on `job_ids`."""
+        conn = self._conn()
+        with conn:
+            expires_at = time.time() + lease_sec
+            conn.executemany(
+                "UPDATE jobs SET lease_expires_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                [(expires_at, job_id, owner, RUNNING) for job_id in job_ids],
+            )
+
+    def row_states(self, job_id: int) -> Dict[int, Tuple[str, Optional[str]]]:
+        return {
+            idx: (status, error)
+            for idx, status, error in self._conn().execute(
+                "SELECT idx, status, error FROM job_rows WHERE job_id = ?", (job_id,)
+            )
+        }
+
+    def complete(
+        self,
+        job_id: int,
+        errors: Dict[int, Optional[str]],
+        retry_at: Optional[float],
+    ) -> None:
+        """
+        Record an attempt at the rows in `errors` (None for rows that were inserted)
+        and derive the job's status from all of its rows. Failed rows are pending
+        again at `retry_at`, or failed for good without one.
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            tracked = conn.execute(
+                "SELECT 1 FROM job_rows WHERE job_id = ? LIMIT 1", (job_id,)
+            ).fetchone()
+            # Rows are tracked one by one only once some row of the job has failed.
+            if tracked or any(error is not None for error in errors.values()):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO job_rows (job_id, idx, status, error) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            job_id,
+                            idx,
+                            DONE if error is None else PENDING if retry_at else FAILED,
+                            error,
+                        )
+                        for idx, error in errors.items()
+                    ],
+                )
+            counts = dict(
+                conn.execute(
+                    "SELECT status, COUNT(*) FROM job_rows "
+                    "WHERE job_id = ? AND status != ? GROUP BY status",
+                    (job_id, DONE),
+                ).fetchall()
+            )
+            if not counts:
+                # Indexed rows live in the table now; only the status is kept.
+                conn.execute(
+                    "UPDATE jobs SET status = ?, rows = ?, error = NULL, owner = NULL, "
+                    "updated_at = ? WHERE id = ?",
+                    (DONE, b"", now, job_id),
+                )
+                return
+            (num_rows,) = conn.execute(
+                "SELECT num_rows FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            (first_error,) = conn.execute(
+                "SELECT error FROM job_rows WHERE job_id = ? AND status != ? "
+                "ORDER BY idx LIMIT 1",
+                (job_id, DONE),
+            ).fetchone()
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, error = ?, "
+                "next_attempt_at = ?, owner = NULL, updated_at = ? WHERE id = ?",
+                (
+                    PENDING if counts.get(PENDING) else FAILED,
+                    f"{sum(counts.values())} of {num_rows} rows failed: {first_error}",
+                    retry_at or now,
+                    now,
+                    job_id,
+                ),
+            )
+
+    def retry(self, job_id: int, rows: Optional[Iterable[int]] = None) -> int:
+        """
+        Queue the permanently failed rows of `job_id` (or just `rows` of them) for
+        another attempt with a fresh retry budget; returns how many were queued.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            failed = [
+                idx
+                for (idx,) in conn.execute(
+                    "SELECT idx FROM job_rows WHERE job_id = ? AND status = ?",
+                    (job_id, FAILED),
+                )
+            ]
+            if rows is not None:
+                wanted = set(rows)
+                failed = [idx for idx in failed if idx in wanted]
+            if not failed:
+                return 0
+            conn.executemany(
+                "UPDATE job_rows SET status = ? WHERE job_id = ? AND idx = ?",
+                [(PENDING, job_id, idx) for idx in failed],
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, next_attempt_at = ?, "
+                "updated_at = ? WHERE id = ? AND status = ?",
+                (PENDING, time.time(), time.time(), job_id, FAILED),
+            )
+        return len(failed)
+
+    def status(self, job_id: int) -> Optional[IngestStatus]:
+        row = (
+            self._conn()
+            .execute(
+                "SELECT id, status, num_rows, attempts, error FROM jobs WHERE id = ?",
+                (job_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        job = IngestStatus(*row)
+        states = self.row_states(job_id) if job.status != DONE else {}
+        for idx in range(job.num_rows):
+            status, error = states.get(idx, (job.status, None))
+            if status == PENDING and job.status == RUNNING:
+                status = RUNNING
+            job.rows.append(IngestRowStatus(idx, status, error))
+        return job
+
+    def outstanding(self, job_ids: Optional[Iterable[int]] = None) -> int:
+        conn = self._conn()
+        if job_ids is None:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, RUNNING)
+            ).fetchone()[0]
+        job_ids = list(job_ids)
+        count = 0
+        for i in range(0, len(job_ids), 500):
+            batch = job_ids[i : i + 500]
+            placeholders = ",".join("?" * len(batch))
+            count += conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN (?, ?) AND id IN ({placeholders})",
+                [PENDING, RUNNING, *batch],
+            ).fetchone()[0]
+        return count
+
+
+class IngestQueue:
+    """
+    Accepts rows for a `Memory` immediately and inserts them in the background.
+
+    `submit` only appends the rows to the SQLite log and returns a job id; the
+    worker threads run the actual `Memory.insert`, which is where transcription,
+    vision, chunking and embedding happen. A job's rows are inserted as one batch;
+    if that fails, each row is inserted on its own, and only the rows that failed
+    are retried, with exponential backoff. A running job is leased to its worker and the lease is
+    renewed while the insert runs, so a job interrupted by a crash is picked up
+    again once its lease expires, by this or any other process sharing the store,
+    and the index is eventually consistent with what was submitted.
+    """
+
+    def __init__(self, memory_instance: "Memory", params: IngestParams):
+        self.memory = memory_instance
+        self.params = params
+        path = params.path or os.path.join(
+            default_cache_dir(),
+            "ingest",
+            f"{memory_instance.namespace}.{memory_instance.table_name}.db",
+        )
+        self.store = IngestStore(path)
+        # Leases taken by this queue; other processes sharing the store only
+        # reclaim a job once its lease has run out.
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._active: Set[int] = set()
+        self._active_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(
+                target=self._run,
+                name=f"pixelmemory-ingest-{memory_instance.table_name}-{i}",
+                daemon=True,
+            )
+            for i in range(params.max_workers)
+        ]
+        self._threads.append(
+            threading.Thread(
+                target=self._heartbeat,
+                name=f"pixelmemory-ingest-{memory_instance.table_name}-heartbeat",
+                daemon=True,
+            )
+        )
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            raise ValueError("At least one row must be provided.")
+        job_id = self.store.append(rows)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def status(self, job_id: int) -> Optional[IngestStatus]:
+        return self.store.status(job_id)
+
+    def retry(self, job_id: int, rows: Optional[Iterable[int]] = None) -> int:
+        queued = self.store.retry(job_id, rows)
+        if queued:
+            with self._wakeup:
+                self._wakeup.notify()
+        return queued
+
+    def wait_until_indexed(
+        self,
+        job_ids: Optional[Iterable[int]] = None,
+        timeout: Optional[float] = None,
+        poll_sec: float = 0.1,
+    ) -> bool:
+        """
+        Block until the given jobs (default: every submitted job) are done or have
+        permanently failed. Returns False if `timeout` expires first.
+        """
+        job_ids = list(job_ids) if job_ids is not None else None
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.store.outstanding(job_ids):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_sec)
+        return True
+
+    def _heartbeat(self) -> None:
+        # Renew well before expiry, so a slow insert never loses its lease.
+        while not self._stop.wait(self.params.lease_sec / 3):
+            with self._active_lock:
+                job_ids = list(self._active)
+            if job_ids:
+                self.store.heartbeat(job_ids, self.owner, self.params.lease_sec)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job = self.store.claim(self.owner, self.params.lease_sec)
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=self.params.retry_backoff_sec)
+                continue
+            job_id, rows, attempts = job
+            with self._active_lock:
+                self._active.add(job_id)
+            try:
+                # Rows already inserted, or failed for good, are not attempted again.
+                states = self.store.row_states(job_id)
+                todo = [
+                    idx
+                    for idx in range(len(rows))
+                    if states.get(idx, (PENDING, None))[0] == PENDING
+                ]
+                errors = self._insert(rows, todo)
+                # `attempts` counts earlier failures; the first try is not a retry.
+                retry_at = None
+                failed = [idx for idx, error in errors.items() if error is not None]
+                if failed:
+                    if attempts < self.params.max_retries:
+                        retry_at = time.time() + self.params.retry_backoff_sec * (
+                            2**attempts
+                        )
+                    logger.warning(
+                        "Ingest job %d: %d of %d rows failed (attempt %d): %s",
+                        job_id,
+                        len(failed),
+                        len(todo),
+                        attempts + 1,
+                        errors[failed[0]],
+                    )
+                self.store.complete(job_id, errors, retry_at)
+            finally:
+                with self._active_lock:
+                    self._active.discard(job_id)
+
+    def _insert(
+        self, rows: List[Dict[str, Any]], todo: List[int]
+    ) -> Dict[int, Optional[str]]:
+        """
+        Insert `rows[i]` for each i in `todo` and return each one's error, or None.
+        The rows go in one batch; only if that fails is each row inserted on its
+        own, so that one bad row does not hold back the others.
+        """
+        if not todo:
+            return {}
+        try:
+            self.memory.insert([rows[idx] for idx in todo])
+            return dict.fromkeys(todo)
+        except Exception as e:
+            if len(todo) == 1:
+                return {todo[0]: f"{type(e).__name__}: {e}"}
+        errors: Dict[int, Optional[str]] = {}
+        for idx in todo:
+            try:
+                self.memory.insert([rows[idx]])
+                errors[idx] = None
+            except Exception as e:
+                errors[idx] = f"{type(e).__name__}: {e}"
+        return errors
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the workers; jobs not yet claimed stay queued for the next start."""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,479 @@
+import json
+import uuid
+import wave
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pixeltable as pxt
+import pixeltable.type_system as ts
+from pixeltable.env import Env
+from pixeltable.iterators import ComponentIterator, DocumentSplitter
+
+from .cache import content_hash, file_hash, get_chunk_cache
+from .config import VADParams
+
+
+class CachedDocumentSplitter(ComponentIterator):
+    """
+    `DocumentSplitter` whose output is cached by (document bytes, splitter params).
+
+    Ingesting a document that was already split with the same parameters, into
+    this or any other memory on the host, skips parsing and tokenization.
+    """
+
+    def __init__(self, document: str, **kwargs: Any):
+        key = content_hash(
+            json.dumps(
+                [file_hash(document), kwargs, pxt.__version__],
+                sort_keys=True,
+                default=str,
+            )
+        )
+        cache = get_chunk_cache()
+        chunks = cache.get(key)
+        if chunks is None:
+            splitter = DocumentSplitter(document, **kwargs)
+            try:
+                chunks = list(splitter)
+            finally:
+                splitter.close()
+            cache.put(key, chunks)
+        self._chunks: List[Dict[str, Any]] = chunks
+        self._pos = 0
+
+    @classmethod
+    def input_schema(cls) -> Dict[str, Any]:
+        return DocumentSplitter.input_schema()
+
+    @classmethod
+    def output_schema(
+        cls, *args: Any, **kwargs: Any
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        return DocumentSplitter.output_schema(*args, **kwargs)
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._pos >= len(self._chunks):
+            raise StopIteration
+        chunk = self._chunks[self._pos]
+        self._pos += 1
+        return chunk
+
+    def close(self) -> None:
+        pass
+
+    def set_pos(self, pos: int) -> None:
+        self._pos = pos
+
+
+def _spacy_nlp() -> Any:
+    try:
+        from pixeltable.utils.spacy import get_spacy_model
+    except ImportError:
+        # Pixeltable < 0.5 loads the model on its environment.
+        return Env.get().spacy_nlp
+    return get_spacy_model("en_core_web_sm")
+
+
+class SentenceSplitter(ComponentIterator):
+    """
+    Splits a string into sentences like Pixeltable's `StringSplitter`, and also
+    outputs each sentence's `char_offset` into the string. Offsets come from the
+    sentence spans themselves, so a sentence that repeats gets its own position.
+    """
+
+    def __init__(self, text: str, separators: str = "sentence"):
+        if separators != "sentence":
+            raise ValueError(
+                f"Unsupported separators: {separators}. Only 'sentence' is supported."
+            )
+        self._sentences = [
+            {"text": sentence.text, "char_offset": sentence.start_char}
+            for sentence in _spacy_nlp()(text or "").sents
+        ]
+        self._pos = 0
+
+    @classmethod
+    def input_schema(cls) -> Dict[str, ts.ColumnType]:
+        return {"text": ts.StringType(), "separators": ts.StringType()}
+
+    @classmethod
+    def output_schema(
+        cls, *args: Any, **kwargs: Any
+    ) -> Tuple[Dict[str, ts.ColumnType], List[str]]:
+        return {"text": ts.StringType(), "char_offset": ts.IntType()}, []
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._pos >= len(self._sentences):
+            raise StopIteration
+        sentence = self._sentences[self._pos]
+        self._pos += 1
+        return sentence
+
+    def close(self) -> None:
+        pass
+
+    def set_pos(self, pos: int) -> None:
+        self._pos = pos
+
+
+VAD_SAMPLE_RATE = 16000
+
+
+def _decode_mono(path: str, rate: int = VAD_SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """Decode the first audio stream of `path` as mono float32 blocks at `rate` Hz."""
+    import av
+
+    with av.open(path) as container:
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=rate)
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                yield out.to_ndarray().reshape(-1)
+        for out in resampler.resample(None):
+            yield out.to_ndarray().reshape(-1)
+
+
+def _frame_levels(path: str, frame_len: int) -> np.ndarray:
+    """Per-frame level in dBFS, computed in a streaming pass over the decoded audio."""
+    levels: List[np.ndarray] = []
+    leftover = np.zeros(0, dtype=np.float32)
+    for block in _decode_mono(path):
+        block = np.concatenate([leftover, block])
+        n = len(block) // frame_len
+        if n:
+            frames = block[: n * frame_len].reshape(n, frame_len)
+            levels.append(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        leftover = block[n * frame_len :]
+    if len(leftover):
+        levels.append(np.array([np.mean(leftover.astype(np.float64) ** 2)]))
+    if not levels:
+        return np.zeros(0)
+    return 10.0 * np.log10(np.concatenate(levels) + 1e-12)
+
+
+def _runs(mask: np.ndarray) -> List[List[int]]:
+    """[start, end) frame ranges where `mask` is true."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return [
+        [int(s), int(e)]
+        for s, e in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+    ]
+
+
+def speech_chunks(levels: np.ndarray, params: VADParams) -> List[Tuple[int, int]]:
+    """Group speech frames into [start, end) frame ranges no longer than `max_chunk_sec`."""
+    frame_sec = params.frame_ms / 1000.0
+
+    def to_frames(sec: float) -> int:
+        return int(round(sec / frame_sec))
+
+    max_len = max(1, to_frames(params.max_chunk_sec))
+    if len(levels) == 0:
+        return []
+
+    # Speech is judged against the recording's own noise floor, so quiet or
+    # normalized recordings and noisy rooms are treated alike.
+    noise_floor = float(np.percentile(levels, params.noise_percentile))
+    threshold = max(noise_floor + params.threshold_db, params.min_level_db)
+
+    regions: List[List[int]] = []
+    for start, end in _runs(levels > threshold):
+        if regions and start - regions[-1][1] < to_frames(params.min_silence_sec):
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    pad = to_frames(params.speech_pad_sec)
+    regions = [
+        [max(0, s - pad), min(len(levels), e + pad)]
+        for s, e in regions
+        if e - s >= to_frames(params.min_speech_sec)
+    ]
+
+    if not regions:
+        # No speech stands out (silence, music, or speech throughout): keep the
+        # audio in fixed windows rather than dropping it.
+        return [
+            (start, min(start + max_len, len(levels)))
+            for start in range(0, len(levels), max_len)
+        ]
+
+    chunks: List[List[int]] = []
+    for start, end in regions:
+        if (
+            chunks
+            and start - chunks[-1][1] <= to_frames(params.max_silence_sec)
+            and end - chunks[-1][0] <= max_len
+        ):
+            chunks[-1][1] = max(chunks[-1][1], end)
+        elif chunks and start < chunks[-1][1]:
+            # Padding overlaps the previous chunk but the merge would be too long.
+            chunks.append([chunks[-1][1], end])
+        else:
+            chunks.append([start, end])
+
+    # A single stretch of speech longer than the limit is cut at its quietest frame
+    # in the second half of each window.
+    result: List[Tuple[int, int]] = []
+    for start, end in chunks:
+        while end - start > max_len:
+            lo = start + max_len // 2
+            cut = lo + int(np.argmin(levels[lo : start + max_len]))
+            cut = max(cut, start + 1)
+            result.append((start, cut))
+            start = cut
+        result.append((start, end))
+    return result
+
+
+class VADAudioSplitter(ComponentIterator):
+    """
+    Splits audio on speech boundaries instead of fixed windows.
+
+    Chunks never cut through speech unless a single utterance exceeds `max_chunk_sec`,
+    and silence-only stretches are dropped (see `VADParams`). `start_time_sec` / `end_time_sec` refer to
+    the original recording, so chunks can be played back in place.
+    """
+
+    def __init__(
+        self,
+        audio: pxt.Audio,
+        *,
+        max_chunk_sec: float = 30.0,
+        threshold_db: float = 12.0,
+        noise_percentile: float = 10.0,
+        min_level_db: float = -70.0,
+        min_speech_sec: float = 0.25,
+        min_silence_sec: float = 0.5,
+        max_silence_sec: float = 2.0,
+        speech_pad_sec: float = 0.2,
+        frame_ms: int = 30,
+    ):
+        params = VADParams(
+            max_chunk_sec=max_chunk_sec,
+            threshold_db=threshold_db,
+            noise_percentile=noise_percentile,
+            min_level_db=min_level_db,
+            min_speech_sec=min_speech_sec,
+            min_silence_sec=min_silence_sec,
+            max_silence_sec=max_silence_sec,
+            speech_pad_sec=speech_pad_sec,
+            frame_ms=frame_ms,
+        )
+        self._audio = audio
+        frame_len = VAD_SAMPLE_RATE * frame_ms // 1000
+        self._bounds = [
+            (start * frame_len, end * frame_len)
+            for start, end in speech_chunks(_frame_levels(audio, frame_len), params)
+        ]
+        self._pos = 0
+        self._chunks: Optional[Iterator[Dict[str, Any]]] = None
+
+    @classmethod
+    def input_schema(cls) -> Dict[str, ts.ColumnType]:
+        return {
+            "audio": ts.AudioType(nullable=False),
+            "max_chunk_sec": ts.FloatType(),
+            "threshold_db": ts.FloatType(),
+            "noise_percentile": ts.FloatType(),
+            "min_level_db": ts.FloatType(),
+            "min_speech_sec": ts.FloatType(),
+            "min_silence_sec": ts.FloatType(),
+            "max_silence_sec": ts.FloatType(),
+            "speech_pad_sec": ts.FloatType(),
+            "frame_ms": ts.IntType(),
+        }
+
+    @classmethod
+    def output_schema(
+        cls, *args: Any, **kwargs: Any
+    ) -> Tuple[Dict[str, ts.ColumnType], List[str]]:
+        return {
+            "start_time_sec": ts.FloatType(),
+            "end_time_sec": ts.FloatType(),
+            "audio_chunk": ts.AudioType(nullable=True),
+        }, []
+
+    def _write_chunk(self, index: int, parts: List[np.ndarray]) -> Dict[str, Any]:
+        start, end = self._bounds[index]
+        samples = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        path = Env.get().tmp_dir / f"{uuid.uuid4()}.wav"
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(VAD_SAMPLE_RATE)
+            f.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+        return {
+            "start_time_sec": start / VAD_SAMPLE_RATE,
+            "end_time_sec": (start + len(samples)) / VAD_SAMPLE_RATE,
+            "audio_chunk": str(path),
+        }
+
+    def _iter_chunks(self, first: int) -> Iterator[Dict[str, Any]]:
+        # Second decoding pass: slice each chunk's samples out of the stream in order.
+        index, parts, offset = first, [], 0
+        for block in _decode_mono(self._audio):
+            block_start, offset = offset, offset + len(block)
+            while index < len(self._bounds):
+                start, end = self._bounds[index]
+                if start >= offset:
+                    break
+                lo, hi = max(start, block_start), min(end, offset)
+                if hi > lo:
+                    parts.append(block[lo - block_start : hi - block_start])
+                if end > offset:
+                    break
+                yield self._write_chunk(index, parts)
+                index, parts = index + 1, []
+        while index < len(self._bounds):
+            yield self._write_chunk(index, parts)
+            index, parts = index + 1, []
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._pos >= len(self._bounds):
+            raise StopIteration
+        if self._chunks is None:
+            self._chunks = self._iter_chunks(self._pos)
+        self._pos += 1
+        return next(self._chunks)
+
+    def close(self) -> None:
+        if self._chunks is not None:
+            self._chunks.close()
+            self._chunks = None
+
+    def set_pos(self, pos: int) -> None:
+        self.close()
+        self._pos = pos
+
+
+class DecodedFrameIterator(ComponentIterator):
+    """Iterates over the frames extracted by `video.decode_video`, without decoding again."""
+
+    def __init__(self, decoded: pxt.Json):
+        self._frames: List[Dict[str, Any]] = (decoded or {}).get("frames", [])
+        self._pos = 0
+
+    @classmethod
+    def input_schema(cls) -> Dict[str, ts.ColumnType]:
+        return {"decoded": ts.JsonType(nullable=True)}
+
+    @classmethod
+    def output_schema(
+        cls, *args: Any, **kwargs: Any
+    ) -> Tuple[Dict[str, ts.ColumnType], List[str]]:
+        return {
+            "frame_idx": ts.IntType(),
+            "pos_msec": ts.FloatType(),
+            "pos_frame": ts.IntType(),
+            "frame": ts.ImageType(),
+        }, ["frame"]
+
+    def __next__(self) -> Dict[str, Any]:
+        import PIL.Image
+
+        if self._pos >= len(self._frames):
+            raise StopIteration
+        info = self._frames[self._pos]
+        self._pos += 1
+        frame = PIL.Image.open(info["path"])
+        frame.load()
+        return {
+            "frame_idx": info["frame_idx"],
+            "pos_msec": info["pos_msec"],
+            "pos_frame": info["pos_frame"],
+            "frame": frame,
+        }
+
+    def close(self) -> None:
+        pass
+
+    def set_pos(self, pos: int) -> None:
+        self._pos = pos
+
+
+class TranscriptSentenceSplitter(ComponentIterator):
+    """
+    Splits a transcription into sentences that carry their time span in the source
+    audio.
+
+    Times come from the transcription's segments (Whisper `verbose_json` output),
+    interpolated by character position within a segment and shifted by the audio
+    chunk's `start_sec`. Without segments, positions are interpolated across
+    [`start_sec`, `end_sec`].
+    """
+
+    def __init__(
+        self,
+        transcription: pxt.Json,
+        start_sec: float = 0.0,
+        end_sec: Optional[float] = None,
+    ):
+        transcription = transcription or {}
+        segments = transcription.get("segments") or []
+        if not segments:
+            text = (transcription.get("text") or "").strip()
+            duration = (end_sec - start_sec) if end_sec is not None else 0.0
+            segments = [{"start": 0.0, "end": duration, "text": text}]
+
+        # Concatenate segment texts, remembering which span of characters each covers.
+        text, spans = "", []
+        for segment in segments:
+            seg_text = (segment.get("text") or "").strip()
+            if not seg_text:
+                continue
+            if text:
+                text += " "
+            spans.append(
+                (len(text), len(text) + len(seg_text), segment["start"], segment["end"])
+            )
+            text += seg_text
+
+        def time_at(pos: int) -> float:
+            for char_start, char_end, t_start, t_end in spans:
+                if pos <= char_end:
+                    frac = (pos - char_start) / max(1, char_end - char_start)
+                    return start_sec + t_start + max(0.0, frac) * (t_end - t_start)
+            return start_sec + (spans[-1][3] if spans else 0.0)
+
+        # spaCy sentence spans, as in `SentenceSplitter`, so abbreviations and
+        # decimals do not end a sentence; each span's characters give its times.
+        self._sentences: List[Dict[str, Any]] = [
+            {
+                "text": sentence.text,
+                "sentence_start_sec": time_at(sentence.start_char),
+                "sentence_end_sec": time_at(sentence.end_char),
+            }
+            for sentence in (_spacy_nlp()(text).sents if text else [])
+            if sentence.text.strip()
+        ]
+        self._pos = 0
+
+    @classmethod
+    def input_schema(cls) -> Dict[str, ts.ColumnType]:
+        return {
+            "transcription": ts.JsonType(nullable=True),
+            "start_sec": ts.FloatType(),
+            "end_sec": ts.FloatType(nullable=True),
+        }
+
+    @classmethod
+    def output_schema(
+        cls, *args: Any, **kwargs: Any
+    ) -> Tuple[Dict[str, ts.ColumnType], List[str]]:
+        return {
+            "text": ts.StringType(),
+            "sentence_start_sec": ts.FloatType(),
+            "sentence_end_sec": ts.FloatType(),
+        }, []
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._pos >= len(self._sentences):
+            raise StopIteration
+        sentence = self._sentences[self._pos]
+        self._pos += 1
+        return sentence
+
+    def close(self) -> None:
+        pass
+
+    def set_pos(self, pos: int) -> None:
+        self._pos = pos
@@ -0,0 +1,273 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import PIL.Image
+import pixeltable as pxt
+import pixeltable.type_system as ts
+from pixeltable.func import Batch
+
+_models: Dict[Tuple, Any] = {}
+_models_lock = threading.Lock()
+# torch's intra-op thread count, set once for the process; see `_set_torch_threads`.
+_torch_threads: Optional[int] = None
+
+
+def _set_torch_threads(num_threads: int) -> None:
+    """
+    Apply `num_threads` to torch the first time a model asking for it is loaded.
+    The setting is process-wide, so later loads keep it. Call with `_models_lock`.
+    """
+    global _torch_threads
+    if num_threads > 0 and _torch_threads is None:
+        import torch
+
+        torch.set_num_threads(num_threads)
+        _torch_threads = num_threads
+
+
+def _whisper_model(
+    model: str, device: str, compute_type: str, cpu_threads: int, num_workers: int
+):
+    key = ("whisper", model, device, compute_type, cpu_threads, num_workers)
+    with _models_lock:
+        if key not in _models:
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                raise ImportError(
+                    "Please install the faster-whisper package. pip install faster-whisper."
+                )
+            _models[key] = WhisperModel(
+                model,
+                device=device,
+                compute_type=compute_type,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers,
+            )
+        return _models[key]
+
+
+def _batched_whisper(whisper: Any):
+    key = ("batched_whisper", id(whisper))
+    with _models_lock:
+        if key not in _models:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+            except ImportError:
+                raise ImportError(
+                    "Batched local transcription needs faster-whisper 1.1 or later. "
+                    "pip install -U faster-whisper."
+                )
+            _models[key] = BatchedInferencePipeline(model=whisper)
+        return _models[key]
+
+
+def _caption_pipeline(model: str, device: str, num_threads: int):
+    key = ("caption", model, device)
+    with _models_lock:
+        if key not in _models:
+            try:
+                import torch
+                from transformers import pipeline
+            except ImportError:
+                raise ImportError(
+                    "Please install the transformers and torch packages. pip install transformers torch."
+                )
+            _set_torch_threads(num_threads)
+            _models[key] = pipeline("image-to-text", model=model, device=device)
+        return _models[key]
+
+
+@pxt.udf(batch_size=16)
+def local_transcriptions(
+    audio: Batch[pxt.Audio],
+    *,
+    model: str,
+    language: Optional[str] = None,
+    prompt: Optional[str] = None,
+    temperature: Optional[float] = None,
+    batch_size: int = 8,
+    num_workers: int = 2,
+    cpu_threads: int = 0,
+    device: str = "cpu",
+    compute_type: str = "int8",
+) -> Batch[pxt.Json]:
+    """
+    Transcribe audio on the local CPU with faster-whisper.
+
+    Each batch is spread over `num_workers` threads sharing one model, and the result
+    has the same `text`/`segments` shape as OpenAI's verbose transcription output.
+    With `batch_size` > 1, the speech segments of each file are decoded
+    `batch_size` at a time by faster-whisper's batched pipeline.
+    """
+    whisper = _whisper_model(model, device, compute_type, cpu_threads, num_workers)
+    options: Dict[str, Any] = {"language": language, "initial_prompt": prompt}
+    if temperature is not None:
+        options["temperature"] = temperature
+    if batch_size > 1:
+        whisper = _batched_whisper(whisper)
+        options["batch_size"] = batch_size
+
+    def transcribe(path: Optional[str]) -> Optional[Dict[str, Any]]:
+        if path is None:
+            return None
+        segments, info = whisper.transcribe(path, **options)
+        segments = [
+            {"id": s.id, "start": s.start, "end": s.end, "text": s.text}
+            for s in segments
+        ]
+        return {
+            "text": "".join(s["text"] for s in segments).strip(),
+            "language": info.language,
+            "duration": info.duration,
+            "segments": segments,
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        return list(executor.map(transcribe, audio))
+
+
+@pxt.udf(batch_size=16)
+def local_caption(
+    image: Batch[PIL.Image.Image],
+    *,
+    model: str,
+    batch_size: int = 8,
+    num_threads: int = 0,
+    device: str = "cpu",
+    max_new_tokens: int = 60,
+) -> Batch[str]:
+    """Caption images on the local CPU with a Hugging Face image-to-text model."""
+    captioner = _caption_pipeline(model, device, num_threads)
+    outputs = captioner(
+        [img.convert("RGB") for img in image],
+        batch_size=batch_size,
+        generate_kwargs={"max_new_tokens": max_new_tokens},
+    )
+    return [output[0]["generated_text"].strip() for output in outputs]
+
+
+def _clip_model(model_id: str, backend: str, num_threads: int = 0):
+    key = ("clip", model_id, backend)
+    with _models_lock:
+        if key not in _models:
+            _set_torch_threads(num_threads)
+            try:
+                import torch
+                from transformers import CLIPModel, CLIPProcessor
+            except ImportError:
+                raise ImportError(
+                    "Please install the transformers and torch packages. pip install transformers torch."
+                )
+            model = CLIPModel.from_pretrained(model_id).eval()
+            if backend == "torch_int8":
+                model = torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            elif backend != "torch":
+                raise ValueError(f"Unsupported CLIP backend: {backend}")
+            _models[key] = (model, CLIPProcessor.from_pretrained(model_id))
+        return _models[key]
+
+
+def _projected(output: Any):
+    # transformers 5 returns a model output whose pooler_output holds the projection.
+    return getattr(output, "pooler_output", output)
+
+
+def clip_embed_images(
+    images: List[PIL.Image.Image],
+    model_id: str,
+    batch_size: int = 32,
+    num_threads: int = 0,
+    backend: str = "torch",
+) -> List[np.ndarray]:
+    import torch
+
+    model, processor = _clip_model(model_id, backend, num_threads)
+    results: List[np.ndarray] = []
+    with torch.inference_mode():
+        for i in range(0, len(images), batch_size):
+            batch = [img.convert("RGB") for img in images[i : i + batch_size]]
+            inputs = processor(images=batch, return_tensors="pt")
+            features = _projected(model.get_image_features(**inputs))
+            results.extend(features.float().numpy())
+    return results
+
+
+_text_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+_TEXT_CACHE_SIZE = 4096
+
+
+def clip_embed_texts(
+    texts: List[str],
+    model_id: str,
+    batch_size: int = 32,
+    num_threads: int = 0,
+    backend: str = "torch",
+) -> List[np.ndarray]:
+    """Text side of CLIP, with an LRU cache since the same queries recur at search time."""
+    import torch
+
+    keys = [(model_id, backend, text) for text in texts]
+    with _models_lock:
+        found = {key: _text_cache[key] for key in keys if key in _text_cache}
+        for key in found:
+            _text_cache.move_to_end(key)
+    missing = list(dict.fromkeys(key for key in keys if key not in found))
+    if missing:
+        model, processor = _clip_model(model_id, backend, num_threads)
+        with torch.inference_mode():
+            for i in range(0, len(missing), batch_size):
+                batch = missing[i : i + batch_size]
+                inputs = processor(
+                    text=[key[2] for key in batch],
+                    return_tensors="pt",
+                    padding=True,
+                    truncation=True,
+                )
+                features = _projected(model.get_text_features(**inputs))
+                features = features.float().numpy()
+                found.update(zip(batch, features))
+        with _models_lock:
+            for key in missing:
+                _text_cache[key] = found[key]
+            while len(_text_cache) > _TEXT_CACHE_SIZE:
+                _text_cache.popitem(last=False)
+    return [found[key] for key in keys]
+
+
+@pxt.udf(batch_size=256)
+def clip_embed(
+    text: Batch[str],
+    *,
+    model_id: str,
+    batch_size: int = 32,
+    num_threads: int = 0,
+    backend: str = "torch",
+) -> Batch[pxt.Array[(None,), pxt.Float]]:
+    """CLIP embedding with CPU controls; see `ClipParams`."""
+    return clip_embed_texts(text, model_id, batch_size, num_threads, backend)
+
+
+@clip_embed.overload
+def _(
+    image: Batch[PIL.Image.Image],
+    *,
+    model_id: str,
+    batch_size: int = 32,
+    num_threads: int = 0,
+    backend: str = "torch",
+) -> Batch[pxt.Array[(None,), pxt.Float]]:
+    return clip_embed_images(image, model_id, batch_size, num_threads, backend)
+
+
+@clip_embed.conditional_return_type
+def _(model_id: str) -> ts.ArrayType:
+    from transformers import CLIPConfig
+
+    config = CLIPConfig.from_pretrained(model_id)
+    return ts.ArrayType((config.projection_dim,), dtype=ts.FloatType(), nullable=False)
@@ -0,0 +1,395 @@
+import logging
+import math
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+import pixeltable as pxt
+
+from .ann import kmeans
+from .config import ConsolidationParams, RetentionPolicy
+from .embeddings import normalize
+from .search import ROW_ID_COLUMN
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+logger = logging.getLogger(__name__)
+
+CONSOLIDATION_KEY_COLUMN = "consolidation_key"
+ARCHIVED_AT_COLUMN = "archived_at"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class ConsolidationReport:
+    groups: int = 0
+    summary_rows: int = 0
+    archived_rows: int = 0
+
+
+def extractive_summary(texts: List[str], max_chars: int = 2000) -> str:
+    """Lead sentence of each text, de-duplicated, in order."""
+    leads = []
+    for text in texts:
+        lead = _SENTENCE_END.split((text or "").strip(), maxsplit=1)[0]
+        if lead and lead not in leads:
+            leads.append(lead)
+    return " ".join(leads)[:max_chars]
+
+
+def timestamp_column(memory_instance: "Memory", column: Optional[str]) -> str:
+    column = column or memory_instance.created_at_column
+    if column is None:
+        raise ValueError(
+            "Age-based maintenance needs a timestamp column; create the Memory with "
+            "`created_at_column=...` or pass `timestamp_column`."
+        )
+    return column
+
+
+def archive_table(memory_instance: "Memory", ts_col: str) -> pxt.Table:
+    schema = dict(memory_instance.schema)
+    schema[ts_col] = Optional[pxt.Timestamp]
+    schema[CONSOLIDATION_KEY_COLUMN] = Optional[pxt.String]
+    schema[ARCHIVED_AT_COLUMN] = pxt.Timestamp
+    archive = pxt.create_table(
+        f"{memory_instance.namespace}.{memory_instance.table_name}_archive",
+        schema=schema,
+        if_exists="ignore",
+    )
+    if memory_instance.tenant_key is not None:
+        # Archives created before the memory was partitioned lack the column.
+        archive.add_column(
+            **{memory_instance.tenant_key: Optional[pxt.String]}, if_exists="ignore"
+        )
+    return archive
+
+
+def oldest_row_ids(table: pxt.Table, ts_col: str, predicate: Any, n: int) -> List[str]:
+    """
+    Row ids of the `n` oldest rows matching `predicate`. Rows stamped by one insert
+    share a timestamp, so ties are broken by row id rather than taken together.
+    """
+    row_id = getattr(table, ROW_ID_COLUMN)
+    rows = (
+        table.where(predicate)
+        .order_by(getattr(table, ts_col), row_id)
+        .select(rid=row_id)
+        .limit(n)
+        .collect()
+    )
+    return [row["rid"] for row in rows]
+
+
+def _consolidation_candidates(
+    table: pxt.Table, ts_col: str, min_age_sec: float, max_hot_rows: Optional[int]
+) -> Any:
+    """
+    Unconsolidated rows older than `min_age_sec`, plus the oldest rows beyond
+    `max_hot_rows`. Those are picked by row id, so rows sharing the boundary
+    timestamp stay hot.
+    """
+    ts = getattr(table, ts_col)
+    live = (getattr(table, CONSOLIDATION_KEY_COLUMN) == None) & (ts != None)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=min_age_sec)
+    candidates = ts <= cutoff
+    if max_hot_rows is not None:
+        excess = table.where(live).count() - max_hot_rows
+        if excess > 0:
+            row_ids = oldest_row_ids(table, ts_col, live, excess)
+            candidates = candidates | getattr(table, ROW_ID_COLUMN).isin(row_ids)
+    return live & candidates
+
+
+def _topic_embedding(memory_instance: "Memory", params: ConsolidationParams) -> Any:
+    from .search import embedding_expr, resolve_index
+
+    indexed = resolve_index(memory_instance, column=params.text_column)
+    if indexed.table is not memory_instance.table:
+        raise ValueError(
+            f"Topic grouping needs an index on '{params.text_column}' in the main "
+            "table; pass `group_by` instead."
+        )
+    return embedding_expr(indexed)
+
+
+def _topic_groups(
+    vectors: np.ndarray, max_group_size: int, min_group_size: int
+) -> List[List[int]]:
+    """
+    k-means topic clusters, split evenly into groups of at most `max_group_size`.
+    Clusters smaller than `min_group_size` are left unconsolidated, as in the
+    group_by path.
+    """
+    n_clusters = math.ceil(len(vectors) / max_group_size)
+    _, assignments = kmeans(normalize(vectors), n_clusters)
+    groups = []
+    for c in range(n_clusters):
+        members = np.flatnonzero(assignments == c)
+        if len(members) < min_group_size:
+            continue
+        parts = math.ceil(len(members) / max_group_size)
+        groups.extend(list(part) for part in np.array_split(members, parts))
+    return groups
+
+
+def _group_filter(
+    table: pxt.Table, group_col: Any, tenant_key: Optional[str], keep: List[tuple]
+) -> Any:
+    """Predicate matching the kept (tenant, group) pairs."""
+    by_tenant: Dict[Any, List[Any]] = {}
+    for tenant, group in keep:
+        by_tenant.setdefault(tenant, []).append(group)
+    if tenant_key is None:
+        return group_col.isin(by_tenant[None])
+    tenant_col = getattr(table, tenant_key)
+    expr = None
+    for tenant, groups in by_tenant.items():
+        tenant_match = (tenant_col == None) if tenant is None else (tenant_col == tenant)
+        condition = tenant_match & group_col.isin(groups)
+        expr = condition if expr is None else expr | condition
+    return expr
+
+
+def consolidate(
+    memory_instance: "Memory", params: ConsolidationParams
+) -> ConsolidationReport:
+    if memory_instance.schema.get(params.text_column) != pxt.String:
+        raise ValueError(f"'{params.text_column}' is not a text column.")
+    ts_col = timestamp_column(memory_instance, params.timestamp_column)
+    table = memory_instance.table
+    table.add_column(
+        **{CONSOLIDATION_KEY_COLUMN: Optional[pxt.String]}, if_exists="ignore"
+    )
+    key_col = getattr(table, CONSOLIDATION_KEY_COLUMN)
+
+    # Summary rows carry a key and are never consolidated again.
+    predicate = _consolidation_candidates(
+        table, ts_col, params.min_age_sec, params.max_hot_rows
+    )
+    row_id = getattr(table, ROW_ID_COLUMN)
+    # Rows of different tenants are never summarized together; each summary and
+    # archived row keeps its tenant.
+    tenant_key = memory_instance.tenant_key
+    column_names = [*memory_instance.schema, ts_col]
+    if tenant_key is not None:
+        column_names.append(tenant_key)
+    columns = {col: getattr(table, col) for col in column_names}
+
+    def tenant_of(row: Dict[str, Any]) -> Any:
+        return row[tenant_key] if tenant_key is not None else None
+
+    if params.group_by is not None:
+        group_col = getattr(table, params.group_by)
+        selected = {"g": group_col}
+        if tenant_key is not None:
+            selected["t"] = getattr(table, tenant_key)
+        counts: Dict[Any, int] = {}
+        for row in table.where(predicate).select(**selected).collect():
+            if row["g"] is not None:
+                group_key = (row.get("t"), row["g"])
+                counts[group_key] = counts.get(group_key, 0) + 1
+        keep = [g for g, n in counts.items() if n >= params.min_group_size]
+        if not keep:
+            return ConsolidationReport()
+        predicate = predicate & _group_filter(table, group_col, tenant_key, keep)
+        rows = list(
+            table.where(predicate)
+            .order_by(group_col, getattr(table, ts_col))
+            .select(pxm_row_id=row_id, **columns)
+            .collect()
+        )
+        row_ids = [row.pop("pxm_row_id") for row in rows]
+        by_group: Dict[Any, List[int]] = {}
+        for i, row in enumerate(rows):
+            by_group.setdefault((tenant_of(row), row[params.group_by]), []).append(i)
+        groups = [
+            members[j : j + params.max_group_size]
+            for members in by_group.values()
+            for j in range(0, len(members), params.max_group_size)
+        ]
+    else:
+        embedding = _topic_embedding(memory_instance, params)
+        rows = list(
+            table.where(predicate)
+            .select(pxm_embedding=embedding, pxm_row_id=row_id, **columns)
+            .collect()
+        )
+        if not rows:
+            return ConsolidationReport()
+        vectors = np.stack([row.pop("pxm_embedding") for row in rows])
+        row_ids = [row.pop("pxm_row_id") for row in rows]
+        by_tenant: Dict[Any, List[int]] = {}
+        for i, row in enumerate(rows):
+            by_tenant.setdefault(tenant_of(row), []).append(i)
+        groups = [
+            [members[j] for j in group]
+            for members in by_tenant.values()
+            for group in _topic_groups(
+                vectors[members], params.max_group_size, params.min_group_size
+            )
+        ]
+        if not groups:
+            return ConsolidationReport()
+
+    summarize = params.summarizer or (
+        lambda texts: extractive_summary(texts, params.summary_max_chars)
+    )
+    archived_at = datetime.now(timezone.utc)
+    summary_rows, archive_rows = [], []
+    for members in groups:
+        if not members:
+            continue
+        key = uuid.uuid4().hex
+        group_rows = [rows[i] for i in members]
+        summary = {
+            params.text_column: summarize(
+                [row[params.text_column] for row in group_rows]
+            ),
+            ts_col: max(row[ts_col] for row in group_rows),
+            CONSOLIDATION_KEY_COLUMN: key,
+        }
+        if params.group_by is not None:
+            summary[params.group_by] = group_rows[0][params.group_by]
+        if tenant_key is not None:
+            summary[tenant_key] = group_rows[0][tenant_key]
+        summary_rows.append(summary)
+        archive_rows.extend(
+            {**row, CONSOLIDATION_KEY_COLUMN: key, ARCHIVED_AT_COLUMN: archived_at}
+            for row in group_rows
+        )
+
+    # Archive first and delete last, so a failure part-way never loses source rows.
+    # Summaries bypass dedup, which could drop one whose sources are deleted, and
+    # only the rows that were summarized are deleted, not rows written since.
+    archive_table(memory_instance, ts_col).insert(archive_rows)
+    memory_instance._insert_rows((summary_rows,), {})
+    memory_instance.delete(
+        where=row_id.isin([row_ids[i] for members in groups for i in members])
+    )
+    return ConsolidationReport(
+        groups=len(summary_rows),
+        summary_rows=len(summary_rows),
+        archived_rows=len(archive_rows),
+    )
+
+
+@dataclass
+class RetentionReport:
+    rows_deleted: int = 0
+    view_rows_deleted: Dict[str, int] = field(default_factory=dict)
+    batches: int = 0
+
+
+def _dependent_tables(memory_instance: "Memory") -> Dict[str, pxt.Table]:
+    resources = memory_instance.resources
+    tables = [view.table for view in resources.chunk_views + resources.frame_views]
+    tables += [indexed.table for indexed in resources.indexed_columns]
+    return {
+        table.get_metadata()["path"]: table
+        for table in tables
+        if table is not None and table is not memory_instance.table
+    }
+
+
+def _delete_oldest(
+    memory_instance: "Memory", ts_col: str, predicate: Any, n: int, batch_size: int
+) -> int:
+    """Delete the `n` oldest rows matching `predicate`, `batch_size` rows per delete."""
+    table = memory_instance.table
+    row_id = getattr(table, ROW_ID_COLUMN)
+    batches = 0
+    while n > 0:
+        row_ids = oldest_row_ids(table, ts_col, predicate, min(n, batch_size))
+        if not row_ids:
+            break
+        memory_instance.delete(where=row_id.isin(row_ids))
+        n -= len(row_ids)
+        batches += 1
+    return batches
+
+
+def apply_retention(
+    memory_instance: "Memory", policy: RetentionPolicy
+) -> RetentionReport:
+    ts_col = timestamp_column(memory_instance, policy.timestamp_column)
+    table = memory_instance.table
+    ts = getattr(table, ts_col)
+    views = _dependent_tables(memory_instance)
+    rows_before = table.count()
+    view_rows_before = {path: view.count() for path, view in views.items()}
+
+    batches = 0
+    if policy.ttl_sec is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=policy.ttl_sec)
+        expired = ts < cutoff
+        batches += _delete_oldest(
+            memory_instance,
+            ts_col,
+            expired,
+            table.where(expired).count(),
+            policy.batch_size,
+        )
+
+    if policy.max_rows_per_key is not None:
+        if policy.key_column is None:
+            raise ValueError("max_rows_per_key requires `key_column`.")
+        key = getattr(table, policy.key_column)
+        counts: Dict[Any, int] = {}
+        for row in table.where(ts != None).select(k=key).collect():
+            counts[row["k"]] = counts.get(row["k"], 0) + 1
+        for value, count in counts.items():
+            if count <= policy.max_rows_per_key:
+                continue
+            matches = (key == None) if value is None else (key == value)
+            batches += _delete_oldest(
+                memory_instance,
+                ts_col,
+                matches & (ts != None),
+                count - policy.max_rows_per_key,
+                policy.batch_size,
+            )
+
+    return RetentionReport(
+        rows_deleted=rows_before - table.count(),
+        view_rows_deleted={
+            path: view_rows_before[path] - view.count() for path, view in views.items()
+        },
+        batches=batches,
+    )
+
+
+class MaintenanceJob:
+    """Runs `task()` every `interval_sec` seconds on a daemon thread until stopped."""
+
+    def __init__(self, name: str, task, interval_sec: float):
+        self.interval_sec = interval_sec
+        self.last_result: Any = None
+        self.last_error: Optional[BaseException] = None
+        self._task = task
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> "MaintenanceJob":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.last_result = self._task()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                logger.exception("%s failed", self._thread.name)
+            self._stop.wait(self.interval_sec)
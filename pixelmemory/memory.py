@@ -1,4 +1,17 @@
-from typing import Dict, Any, Literal, List, Union, Optional, TYPE_CHECKING
+from typing import (
+    Dict,
+    Any,
+    Callable,
+    Literal,
+    List,
+    Tuple,
+    Union,
+    Optional,
+    TYPE_CHECKING,
+)
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from dataclasses import dataclass, make_dataclass, asdict
 import pixeltable as pxt
 from .config import (
@@ -10,9 +23,17 @@ from .context import Context
 
 if TYPE_CHECKING:
     from dataclasses import dataclass as _dataclass_base
+    from .config import ConsolidationParams, IngestParams, RetentionPolicy
+    from .ingest import IngestQueue, IngestStatus
+    from .maintenance import ConsolidationReport, MaintenanceJob, RetentionReport
+    from .packing import PackedContext
+    from .search import LRUCache
+    from .tenant import TenantMemory
 else:
     _dataclass_base = object
 
+DEFAULT_EMBED_MODEL = "intfloat/e5-large-v2"
+
 
 @dataclass
 class MemoryResources:
@@ -22,6 +43,15 @@ class MemoryResources:
     indexed_columns: List[IndexedColumn]
 
 
+class IndexingError(Exception):
+    """Raised when index setup fails for one or more columns."""
+
+    def __init__(self, errors: Dict[str, BaseException]):
+        self.errors = errors
+        details = "; ".join(f"{col}: {err!r}" for col, err in errors.items())
+        super().__init__(f"Index setup failed for {len(errors)} column(s): {details}")
+
+
 class Memory:
     def __init__(
         self,
@@ -29,18 +59,29 @@ class Memory:
         namespace: str = "default_memory",
         table_name: str = "memory",
         if_exists: Literal["ignore", "error", "replace_force"] = "ignore",
+        max_index_workers: int = 4,
+        created_at_column: Optional[str] = None,
+        retention: Optional["RetentionPolicy"] = None,
+        tenant_key: Optional[str] = None,
+        ingest: Optional["IngestParams"] = None,
+        result_cache_size: int = 256,
+        vector_cache_size: int = 64,
         **kwargs,
     ):
         self.namespace = namespace
         self.table_name = table_name
         self.context = context
         self.if_exists = if_exists
+        self.max_index_workers = max_index_workers
+        self.created_at_column = created_at_column
+        self.retention = retention
+        self.tenant_key = tenant_key
 
         self.schema: Dict[str, pxt.ColumnType] = {
             col.id: col._pxt_type for col in self.context
         }
         self.columns_to_embed: Dict[str, Context] = {
-            col.id: col for col in self.context if col.text_embedding
+            col.id: col for col in self.context if col.embed
         }
 
         table_path = f"{self.namespace}.{self.table_name}"
@@ -51,23 +92,90 @@ class Memory:
             table_path, schema=self.schema, if_exists=self.if_exists, **kwargs
         )
 
+        # Video decoded to disk (`VideoDecodeParams`) is removed with its rows.
+        self._decodes_video = any(
+            getattr(col, "decode_params", None) is not None for col in self.context
+        )
+        if self._decodes_video and self.if_exists == "replace_force":
+            import shutil
+            from .video import decoded_root
+
+            shutil.rmtree(decoded_root(namespace, table_name), ignore_errors=True)
+
+        if self.tenant_key is not None:
+            # All tenants share the table, views and indexes; rows are partitioned by
+            # this column.
+            self.table.add_column(
+                **{self.tenant_key: Optional[pxt.String]}, if_exists="ignore"
+            )
+
+        from .functions import new_row_id
+        from .search import ROW_ID_COLUMN
+
+        # Stable id of each row. Views inherit it, so chunks, sentences and frames
+        # can be grouped by the row they were split from, even when two rows hold
+        # the same document.
+        self.table.add_computed_column(
+            **{ROW_ID_COLUMN: new_row_id()}, if_exists="ignore"
+        )
+
+        if self.created_at_column is not None:
+            # Insert time, stamped by `insert`; used for age-based maintenance.
+            self.table.add_column(
+                **{self.created_at_column: Optional[pxt.Timestamp]}, if_exists="ignore"
+            )
+
         self.resources = MemoryResources(
             main_table=self.table, chunk_views=[], frame_views=[], indexed_columns=[]
         )
+        from .search import LRUCache
+
+        # In-process caches (stored vectors and IVF lists) are reused only while
+        # their tenant's stamp is unchanged; see `_cache_stamp`. Bounded, since a
+        # partitioned memory caches vectors per tenant.
+        self._stamp_lock = threading.Lock()
+        self._known_version: Optional[int] = None
+        self._epoch = 0
+        self._generations: Dict[Optional[str], int] = {}
+        self._vector_cache = LRUCache(max(1, vector_cache_size))
+        # Trained IVF centroids survive writes; see `IndexParams.retrain_ratio`.
+        self._ivf_centroids = LRUCache(max(1, vector_cache_size))
+        # Search results for repeated queries, invalidated like the vector cache.
+        self._result_cache: Optional["LRUCache"] = None
+        if result_cache_size > 0:
+            self._result_cache = LRUCache(result_cache_size)
 
+        # Pixeltable catalog changes (views, computed columns, indexes) are made one
+        # at a time, even when several columns are indexed concurrently.
+        self._ddl_lock = threading.RLock()
         if self.columns_to_embed:
             self.setup_indexing()
 
+        from .dedup import setup_dedup
+
+        self._dedup_columns = setup_dedup(self)
+        # Stored vectors of dedup columns, appended to by each insert; see `DedupSet`.
+        self._dedup_cache = LRUCache(max(1, vector_cache_size))
+        # Dedup and the insert it guards run as one step, so that concurrent
+        # inserts (e.g. ingest workers) see each other's rows as duplicates.
+        self._dedup_lock = threading.Lock()
+
         self.Entry = make_dataclass(
             "MemoryEntry",
             [(col.id, Any) for col in self.context],
             bases=(_dataclass_base,),
         )
 
+        self.ingest_queue: Optional["IngestQueue"] = None
+        if ingest is not None:
+            from .ingest import IngestQueue
+
+            self.ingest_queue = IngestQueue(self, ingest)
+
     def _get_embed_model(
         self, override_model: Optional[Union[str, pxt.Function]] = None
     ) -> pxt.Function:
-        model = override_model or "intfloat/e5-large-v2"
+        model = override_model or DEFAULT_EMBED_MODEL
         if isinstance(model, str):
             from pixeltable.functions.huggingface import sentence_transformer
 
@@ -75,19 +183,60 @@ class Memory:
         return model
 
     def setup_indexing(self, columns_to_index: Optional[List[str]] = None) -> None:
+        """
+        Create the views and indexes for each column, preparing independent columns
+        concurrently on up to `max_index_workers` threads.
+
+        Catalog changes are serialized, since Pixeltable does not support concurrent
+        DDL on one table; the threads overlap only the work in between, such as
+        resolving each column's embedding, vision and transcription functions.
+        Pixeltable computes new columns and indexes over existing rows inside the DDL
+        call, so that backfill also runs one column at a time.
+
+        Raises:
+            IndexingError: If any column failed. All columns are attempted first and
+                the failures are reported in column order.
+        """
         from .indexing import setup_column_indexing
 
         columns_to_index = columns_to_index or list(self.columns_to_embed.keys())
+        columns_to_index = [col for col in columns_to_index if col in self.schema]
         if not columns_to_index:
             return
-        for col_name in columns_to_index:
-            if col_name not in self.schema:
-                continue
-            col_type = self.schema[col_name]
-            col_settings = self.columns_to_embed.get(col_name)
-            setup_column_indexing(self, col_name, col_type, col_settings)
 
-    def add(self, *rows: "Memory.Entry") -> None:
+        workers = max(1, min(self.max_index_workers, len(columns_to_index)))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="pixelmemory-index"
+        ) as executor:
+            futures = {
+                col_name: executor.submit(
+                    setup_column_indexing,
+                    self,
+                    col_name,
+                    self.schema[col_name],
+                    self.columns_to_embed.get(col_name),
+                )
+                for col_name in columns_to_index
+            }
+        errors = {
+            col_name: future.exception()
+            for col_name, future in futures.items()
+            if future.exception() is not None
+        }
+
+        # Workers register views and indexes in completion order; restore column order
+        # so resources do not depend on scheduling.
+        order = {col_name: i for i, col_name in enumerate(self.schema)}
+        self.resources.chunk_views.sort(key=lambda view: order.get(view.name, -1))
+        self.resources.frame_views.sort(key=lambda view: order.get(view.name, -1))
+        self.resources.indexed_columns.sort(
+            key=lambda indexed: order.get(indexed.original_col, -1)
+        )
+
+        if errors:
+            raise IndexingError(errors) from next(iter(errors.values()))
+
+    def add(self, *rows: "Memory.Entry") -> Optional[int]:
         """
         Add one or more rows to the memory table.
 
@@ -97,6 +246,9 @@ class Memory:
         Args:
             *rows: One or more instances of the dynamically generated Memory.Entry dataclass.
 
+        With `ingest` set, the rows are queued and indexed in the background; the
+        returned job id can be passed to `ingest_status` or `wait_until_indexed`.
+
         Raises:
             ValueError: If no rows are provided.
 
@@ -113,7 +265,469 @@ class Memory:
         if not rows:
             raise ValueError("At least one row must be provided.")
         row_dicts = [asdict(row) for row in rows]
-        self.table.insert(row_dicts)
+        if self.ingest_queue is not None:
+            return self.ingest_queue.submit(row_dicts)
+        self.insert(row_dicts)
+        return None
+
+    def ingest_status(self, job_id: int) -> Optional["IngestStatus"]:
+        """Status of an ingest job and of each of its rows; None for unknown jobs."""
+        if self.ingest_queue is None:
+            raise ValueError("Memory was created without `ingest`.")
+        return self.ingest_queue.status(job_id)
+
+    def retry_ingest(self, job_id: int, rows: Optional[List[int]] = None) -> int:
+        """
+        Queue the rows of `job_id` that failed permanently (all of them, or the given
+        row indexes) for another round of attempts. Rows that were indexed are not
+        inserted again. Returns the number of rows queued.
+        """
+        if self.ingest_queue is None:
+            raise ValueError("Memory was created without `ingest`.")
+        return self.ingest_queue.retry(job_id, rows)
+
+    def wait_until_indexed(
+        self, job_ids: Optional[List[int]] = None, timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Block until queued rows (the given jobs, or all of them) are indexed or have
+        permanently failed. Returns False on timeout. A no-op without `ingest`.
+        """
+        if self.ingest_queue is None:
+            return True
+        return self.ingest_queue.wait_until_indexed(job_ids, timeout=timeout)
+
+    def close(self) -> None:
+        """
+        Stop the ingest workers, waiting for the jobs they are running. Queued jobs
+        stay in the ingest store and are picked up by the next `Memory` opened on it.
+        """
+        if self.ingest_queue is not None:
+            self.ingest_queue.close()
+
+    def __enter__(self) -> "Memory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _table_version(self) -> int:
+        """
+        Pixeltable's version of the table, which every write advances, whether made
+        through this instance, another one, another process or the table itself.
+        """
+        return self.table.get_metadata()["version"]
+
+    def _cache_stamp(self, tenant: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Stamp under which search state for `tenant` (None: unpartitioned) is cached;
+        read it before computing the state. A write through this instance advances
+        the stamps of its tenant and of unpartitioned state, or every stamp if it
+        was not tenant-scoped. Any other write, seen as an unexpected change of
+        `_table_version`, also advances every stamp.
+        """
+        version = self._table_version()
+        with self._stamp_lock:
+            if version != self._known_version:
+                self._known_version = version
+                self._epoch += 1
+            return self._epoch, self._generations.get(tenant, 0)
+
+    def _write(self, write: Callable[[], Any], tenant: Optional[str] = None) -> Any:
+        version = self._table_version()
+        try:
+            return write()
+        finally:
+            self._advance_stamps(version, tenant)
+
+    def _advance_stamps(self, version: int, tenant: Optional[str] = None) -> None:
+        new_version = self._table_version()
+        with self._stamp_lock:
+            if (
+                tenant is not None
+                and new_version == version + 1
+                and self._known_version in (version, new_version)
+            ):
+                # Only this write happened: other tenants' entries stay current.
+                self._known_version = new_version
+                for key in (tenant, None):
+                    self._generations[key] = self._generations.get(key, 0) + 1
+            else:
+                self._known_version = new_version
+                self._epoch += 1
+        # Stale entries would be refused by their stamp anyway; free them now.
+        for cache in (self._vector_cache, self._result_cache):
+            if cache is not None:
+                cache.invalidate(tenant)
+
+    def _stamp_rows(self, args: tuple, kwargs: Dict[str, Any]) -> tuple:
+        now = datetime.now(timezone.utc)
+        if args and isinstance(args[0], list):
+            rows = [{self.created_at_column: now, **row} for row in args[0]]
+            return (rows,) + args[1:]
+        if not args and any(col in kwargs for col in self.schema):
+            kwargs.setdefault(self.created_at_column, now)
+        return args
+
+    def insert(self, *args, **kwargs) -> Any:
+        return self._insert(args, kwargs)
+
+    def _insert(
+        self, args: tuple, kwargs: Dict[str, Any], tenant: Optional[str] = None
+    ) -> Any:
+        if self._dedup_columns:
+            if args and isinstance(args[0], list):
+                rows = args[0]
+            elif not args and any(col in kwargs for col in self.schema):
+                # Single row passed as keyword arguments.
+                rows = [kwargs]
+                args, kwargs = (), {}
+            else:
+                rows = None
+            if rows is not None:
+                return self._insert_deduped(rows, args[1:], kwargs, tenant)
+        return self._insert_rows(args, kwargs, tenant)
+
+    def _insert_deduped(
+        self,
+        rows: List[Dict[str, Any]],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        tenant: Optional[str] = None,
+    ) -> Any:
+        from .dedup import dedup_rows
+
+        with self._dedup_lock:
+            rows, batch = dedup_rows(self, rows, tenant)
+            if not rows:
+                batch.commit([])
+                return None
+            result = self._insert_rows((rows,) + args, kwargs, tenant)
+            batch.commit(rows)
+            return result
+
+    def _insert_rows(
+        self, args: tuple, kwargs: Dict[str, Any], tenant: Optional[str] = None
+    ) -> Any:
+        if self.created_at_column is not None:
+            args = self._stamp_rows(args, kwargs)
+        return self._write(lambda: self.table.insert(*args, **kwargs), tenant)
+
+    def update(self, *args, **kwargs) -> Any:
+        return self._write(lambda: self.table.update(*args, **kwargs))
+
+    def batch_update(self, *args, **kwargs) -> Any:
+        return self._write(lambda: self.table.batch_update(*args, **kwargs))
+
+    def delete(self, *args, **kwargs) -> Any:
+        return self._delete(args, kwargs)
+
+    def _delete(
+        self, args: tuple, kwargs: Dict[str, Any], tenant: Optional[str] = None
+    ) -> Any:
+        if not self._decodes_video:
+            return self._write(lambda: self.table.delete(*args, **kwargs), tenant)
+
+        from .search import ROW_ID_COLUMN
+        from .video import decoded_root, remove_decoded
+
+        # Decoded video files belong to their row; collect the rows first, since
+        # the delete cascades to the frame views that read those files.
+        where = kwargs.get("where", args[0] if args else None)
+        query = self.table if where is None else self.table.where(where)
+        row_ids = [
+            row["rid"]
+            for row in query.select(rid=getattr(self.table, ROW_ID_COLUMN)).collect()
+        ]
+        result = self._write(lambda: self.table.delete(*args, **kwargs), tenant)
+        remove_decoded(decoded_root(self.namespace, self.table_name), row_ids)
+        return result
+
+    def tenant(self, tenant_id: str) -> "TenantMemory":
+        """
+        Return a handle scoped to one tenant of a partitioned memory (`tenant_key`).
+        Creating it is free: the tenant shares this memory's table, views and indexes.
+        """
+        from .tenant import TenantMemory
+
+        if self.tenant_key is None:
+            raise ValueError("Memory was created without a `tenant_key`.")
+        return TenantMemory(self, tenant_id)
+
+    def search(
+        self,
+        query: Any,
+        k: int = 10,
+        column: Optional[str] = None,
+        index_name: Optional[str] = None,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+        time_range: Optional[Tuple[float, float]] = None,
+        tenant: Optional[str] = None,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None,
+        collapse_source: bool = False,
+        expand_neighbors: int = 0,
+        return_parent: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the `k` rows most similar to `query` from one of the memory's indexes.
+
+        How the search runs depends on the context's `IndexParams.kind`: `hnsw` uses
+        Pixeltable's pgvector index, `exact` and `ivf` search stored embeddings in
+        process. The per-call knobs trade latency for recall.
+
+        Args:
+            query: Query text (or image, for image indexes), or a query embedding for
+                in-process search.
+            k: Number of results to return.
+            column: Indexed column to search. Required when several columns are indexed.
+            index_name: Index to use when a column has more than one.
+            exact: Brute-force the stored embeddings instead of using the ANN index.
+            nprobe: Number of IVF lists to scan; higher is slower but more accurate.
+            where: Equality filters on metadata columns, e.g. `{"video_id": "abc"}`.
+            time_range: `(t0, t1)` in seconds; for audio and video indexes, only
+                sentences overlapping the window are considered.
+            tenant: Restrict the search to one tenant of a partitioned memory.
+            mmr_lambda: Re-rank the `fetch_k` nearest rows with maximal marginal
+                relevance; 1.0 is pure relevance, lower values favor diversity.
+            fetch_k: Candidates considered by `mmr_lambda` / `collapse_source`
+                (default `max(4 * k, 20)`).
+            collapse_source: Return at most one chunk per base row.
+            expand_neighbors: Add `context` to each chunk result: the chunk with this
+                many neighboring chunks on each side, joined in document order.
+            return_parent: Add `parent` to each chunk result: all chunks of its base
+                row joined. Both are resolved from one cached lookup of the view.
+
+        Returns:
+            One dict per result with the indexed column, the scalar metadata columns
+            and a `similarity` score, best first.
+        """
+        from .search import search
+
+        return search(
+            self,
+            query,
+            k=k,
+            column=column,
+            index_name=index_name,
+            exact=exact,
+            nprobe=nprobe,
+            where=where,
+            time_range=time_range,
+            tenant=tenant,
+            mmr_lambda=mmr_lambda,
+            fetch_k=fetch_k,
+            collapse_source=collapse_source,
+            expand_neighbors=expand_neighbors,
+            return_parent=return_parent,
+        )
+
+    def search_many(
+        self,
+        queries: List[Any],
+        k: int = 10,
+        column: Optional[str] = None,
+        index_name: Optional[str] = None,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+        time_range: Optional[Tuple[float, float]] = None,
+        tenant: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several queries against one index and return a top-`k` list per query.
+
+        On exact and IVF indexes (and tenant-scoped searches) the queries are
+        embedded in one encoder batch and scored with a single scan, so a handful
+        of sub-questions costs about as much as one `search`. HNSW indexes are
+        probed once per query. Takes the same arguments as `search`.
+        """
+        from .search import search_many
+
+        return search_many(
+            self,
+            queries,
+            k=k,
+            column=column,
+            index_name=index_name,
+            exact=exact,
+            nprobe=nprobe,
+            where=where,
+            time_range=time_range,
+            tenant=tenant,
+        )
+
+    def build_context(
+        self,
+        query: Any,
+        token_budget: int,
+        tokenizer: Optional[Union[str, Callable[[str], int]]] = None,
+        column: Optional[str] = None,
+        index_name: Optional[str] = None,
+        fetch_k: int = 50,
+        separator: str = "\n\n",
+        **search_kwargs,
+    ) -> "PackedContext":
+        """
+        Retrieve for `query` and pack the best chunks into at most `token_budget`
+        tokens, ready to paste into a prompt.
+
+        Args:
+            query: Query text (or vector).
+            token_budget: Maximum tokens of the packed text, separators included.
+            tokenizer: A tiktoken encoding name, or a function returning a token
+                count. Defaults to the encoding the chunks were split with, whose
+                counts are stored at ingest and not recomputed.
+            fetch_k: Number of candidates retrieved before packing.
+            separator: Placed between packed chunks.
+            **search_kwargs: Passed to `search`, e.g. `where`, `tenant` or
+                `mmr_lambda`.
+
+        Returns:
+            A `PackedContext` with the packed `text`, its `tokens` and the chosen
+            result `rows`, most relevant first.
+        """
+        from .packing import build_context
+
+        return build_context(
+            self,
+            query,
+            token_budget,
+            tokenizer=tokenizer,
+            column=column,
+            index_name=index_name,
+            fetch_k=fetch_k,
+            separator=separator,
+            **search_kwargs,
+        )
+
+    def search_images(
+        self,
+        query: Any,
+        k: int = 10,
+        column: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        tenant: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the `k` images or video frames closest to `query` (text or a PIL image)
+        across every CLIP index in the memory, merged by similarity. Indexes built
+        with different `clip_model`s cannot be merged; pass `column` to pick one.
+
+        Requires `use_clip=True` on the Image/Video contexts; no vision-model
+        description is involved. Each result carries a `column` key naming the
+        context it came from, and frames include `pos_msec`.
+        """
+        from .search import search_images
+
+        return search_images(
+            self,
+            query,
+            k=k,
+            column=column,
+            where=where,
+            exact=exact,
+            nprobe=nprobe,
+            tenant=tenant,
+        )
+
+    def within(
+        self,
+        column: str,
+        t0: float,
+        t1: float,
+        where: Optional[Dict[str, Any]] = None,
+        tenant: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the transcript sentences of an audio or video column that overlap
+        [t0, t1] seconds, in time order. Combine with `where` to select one recording,
+        e.g. `memory.within("video", 60, 120, where={"video_id": "abc"})`.
+        """
+        from .search import within
+
+        return within(self, column, t0, t1, where=where, tenant=tenant)
+
+    def consolidate(self, params: "ConsolidationParams") -> "ConsolidationReport":
+        """
+        Replace old rows with summary rows and move the originals to the
+        `<table_name>_archive` table. See `ConsolidationParams` for how rows are
+        selected and grouped.
+        """
+        from .maintenance import consolidate
+
+        return consolidate(self, params)
+
+    def start_consolidation(
+        self, params: "ConsolidationParams", interval_sec: float = 3600.0
+    ) -> "MaintenanceJob":
+        """Run `consolidate(params)` every `interval_sec` on a background thread."""
+        from .maintenance import MaintenanceJob
+
+        return MaintenanceJob(
+            f"pixelmemory-consolidate-{self.table_name}",
+            lambda: self.consolidate(params),
+            interval_sec,
+        ).start()
+
+    def apply_retention(
+        self, policy: Optional["RetentionPolicy"] = None
+    ) -> "RetentionReport":
+        """
+        Delete rows expired under `policy` (default: the Memory's `retention`) and
+        report how many rows were removed from the table and from each view.
+        """
+        from .maintenance import apply_retention
+
+        policy = policy or self.retention
+        if policy is None:
+            raise ValueError("No retention policy configured.")
+        return apply_retention(self, policy)
+
+    def start_retention(
+        self, policy: Optional["RetentionPolicy"] = None, interval_sec: float = 3600.0
+    ) -> "MaintenanceJob":
+        """Run `apply_retention(policy)` every `interval_sec` on a background thread."""
+        from .maintenance import MaintenanceJob
+
+        return MaintenanceJob(
+            f"pixelmemory-retention-{self.table_name}",
+            lambda: self.apply_retention(policy),
+            interval_sec,
+        ).start()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Row count of the table and, for each chunked column, the number of chunks
+        and the distribution (min, mean, p50, p95, max, total) of their token and
+        character counts, plus sentence durations for audio and video. Useful for
+        tuning `DocumentSplitterParams` and `StringSplitterParams` from data.
+        """
+        from .stats import memory_stats
+
+        return memory_stats(self)
+
+    def snapshot(self, path: str) -> str:
+        """
+        Write an immutable, memory-mapped snapshot of every embedding index.
+
+        The bundle holds the embeddings, indexed text and scalar metadata columns of
+        each index and is opened with `ReadOnlyMemory` by retrieval replicas that never
+        write. The snapshot is built in a staging directory and renamed into place.
+
+        Args:
+            path: Directory to create. It must not already exist.
+
+        Returns:
+            The absolute path of the snapshot directory.
+        """
+        from .snapshot import write_snapshot
+
+        return write_snapshot(self, path)
 
     def __getattr__(self, name: str) -> Any:
         if hasattr(self.resources.main_table, name):
@@ -0,0 +1,122 @@
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+from .config import IndexedColumn
+from .functions import count_tokens
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def index_encoding(memory_instance: "Memory", indexed: IndexedColumn) -> str:
+    """The tiktoken encoding the index's chunks were split (and counted) with."""
+    for col in memory_instance.context:
+        if col.id == indexed.original_col:
+            chunk_params = getattr(col, "chunk_params", None)
+            return getattr(chunk_params, "tiktoken_encoding", DEFAULT_ENCODING)
+    return DEFAULT_ENCODING
+
+
+def _normalized(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def build_context(
+    memory_instance: "Memory",
+    query: Any,
+    token_budget: int,
+    tokenizer: Optional[Union[str, Callable[[str], int]]] = None,
+    column: Optional[str] = None,
+    index_name: Optional[str] = None,
+    fetch_k: int = 50,
+    separator: str = "\n\n",
+    **search_kwargs,
+) -> PackedContext:
+    """
+    Retrieve `fetch_k` candidates, drop duplicate texts, and greedily pack the ones
+    with the highest relevance per token until `token_budget` is spent. Relevance
+    is `1 / (1 + rank)` in the search order, since raw scores are not comparable
+    across metrics (l2 scores are distances, or negated ones). Chunk token counts
+    stored at ingest are used when `tokenizer` matches the encoding the chunks
+    were counted with; otherwise chunks are counted here.
+    """
+    from .search import TOKEN_COUNT_COLUMN, resolve_index, search
+
+    indexed = resolve_index(memory_instance, column, index_name)
+    encoding = index_encoding(memory_instance, indexed)
+    if tokenizer is None:
+        tokenizer = encoding
+    if isinstance(tokenizer, str):
+        encoding_name = tokenizer
+
+        def count(texts: List[str]) -> List[int]:
+            return count_tokens(texts, encoding_name)
+
+    else:
+        tokenizer_fn = tokenizer
+
+        def count(texts: List[str]) -> List[int]:
+            return [tokenizer_fn(text) for text in texts]
+
+    rows = search(
+        memory_instance,
+        query,
+        k=fetch_k,
+        column=indexed.original_col,
+        index_name=indexed.index_name,
+        **search_kwargs,
+    )
+
+    seen = set()
+    candidates = []
+    for row in rows:
+        text = row.get(indexed.indexed_col)
+        if not isinstance(text, str) or not text.strip():
+            continue
+        key = _normalized(text)
+        if key in seen:
+            continue
+        seen.add(key)
+        candidates.append(row)
+
+    use_stored = tokenizer == encoding and all(
+        row.get(TOKEN_COUNT_COLUMN) is not None for row in candidates
+    )
+    if use_stored:
+        tokens = [row[TOKEN_COUNT_COLUMN] for row in candidates]
+    else:
+        tokens = count([row[indexed.indexed_col] for row in candidates])
+    separator_tokens = count([separator])[0] if separator else 0
+
+    # Candidates are in search order, best first.
+    order = sorted(
+        range(len(candidates)),
+        key=lambda i: 1.0 / (1 + i) / max(tokens[i], 1),
+        reverse=True,
+    )
+    picked: List[int] = []
+    used = 0
+    for i in order:
+        cost = tokens[i] + (separator_tokens if picked else 0)
+        if used + cost > token_budget:
+            continue
+        picked.append(i)
+        used += cost
+    # Most relevant first in the prompt.
+    picked.sort()
+    packed = [candidates[i] for i in picked]
+    return PackedContext(
+        text=separator.join(row[indexed.indexed_col] for row in packed),
+        tokens=used,
+        rows=packed,
+    )
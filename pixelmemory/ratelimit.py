@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .config import RateLimitParams
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously at `rate_per_min` up to one minute of
+    capacity. Reservations may overdraw the bucket; the caller is told how long to
+    wait, so concurrent callers queue up behind each other instead of retrying.
+    """
+
+    def __init__(self, rate_per_min: float):
+        self.capacity = float(rate_per_min)
+        self.rate_per_sec = rate_per_min / 60.0
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.available = min(
+                self.capacity,
+                self.available + (now - self.updated_at) * self.rate_per_sec,
+            )
+            self.updated_at = now
+            self.available -= amount
+            if self.available >= 0:
+                return 0.0
+            return -self.available / self.rate_per_sec
+
+    def refund(self, amount: float) -> None:
+        with self._lock:
+            self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimiter:
+    def __init__(self, params: RateLimitParams):
+        self.params = params
+        self.requests = (
+            TokenBucket(params.requests_per_min) if params.requests_per_min else None
+        )
+        self.tokens = (
+            TokenBucket(params.tokens_per_min) if params.tokens_per_min else None
+        )
+
+    def reserve(self, tokens: int = 0) -> float:
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        return delay
+
+    def acquire(self, tokens: int = 0) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket once the provider reports actual usage."""
+        if self.tokens is None or actual_tokens is None:
+            return
+        if actual_tokens > estimated_tokens:
+            self.tokens.reserve(actual_tokens - estimated_tokens)
+        else:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+
+class RequestCoalescer:
+    """Runs at most one in-flight request per key; concurrent duplicates share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await call()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_coalescers: Dict[str, RequestCoalescer] = {}
+_registry_lock = threading.Lock()
+
+
+def configure_limiter(provider: str, params: RateLimitParams) -> RateLimiter:
+    """
+    Set the process-wide limit for a provider. Every `Memory` in the process shares
+    it; reconfiguring with different params replaces the previous limiter.
+    """
+    with _registry_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None or limiter.params != params:
+            limiter = RateLimiter(params)
+            _limiters[provider] = limiter
+        return limiter
+
+
+def get_limiter(provider: str) -> Optional[RateLimiter]:
+    with _registry_lock:
+        return _limiters.get(provider)
+
+
+def get_coalescer(provider: str) -> RequestCoalescer:
+    with _registry_lock:
+        if provider not in _coalescers:
+            _coalescers[provider] = RequestCoalescer()
+        return _coalescers[provider]
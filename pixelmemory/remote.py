@@ -0,0 +1,203 @@
+"""
+Rate-limited, coalescing versions of the remote model calls used during indexing.
+
+Each call first reserves capacity from the process-wide limiter for its provider
+(see `ratelimit.configure_limiter`), and identical in-flight requests are sent only
+once. Responses with status 429 or 5xx are retried with exponential backoff,
+honouring the provider's `Retry-After` header, whether or not a limiter is set. The provider SDKs read `OPENAI_BASE_URL` / `ANTHROPIC_BASE_URL`, so the calls
+can be pointed at a local mock server.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import weakref
+from typing import Any, Dict, Optional
+
+import PIL.Image
+import pixeltable as pxt
+
+from .functions import encode_image
+from .ratelimit import get_coalescer, get_limiter
+
+# Rough per-image token cost used before the provider reports actual usage.
+_IMAGE_TOKEN_ESTIMATE = 1000
+
+_MAX_RETRIES = 6
+_BACKOFF_BASE_SEC = 1.0
+_BACKOFF_MAX_SEC = 60.0
+
+_clients: Dict[str, "weakref.WeakKeyDictionary"] = {
+    "openai": weakref.WeakKeyDictionary(),
+    "anthropic": weakref.WeakKeyDictionary(),
+}
+
+
+def _client(provider: str):
+    # SDK clients hold connection pools bound to the event loop they were created on.
+    loop = asyncio.get_running_loop()
+    clients = _clients[provider]
+    if loop not in clients:
+        if provider == "openai":
+            import openai
+
+            # Retries happen in `_limited_call`, so that each attempt is rate limited.
+            clients[loop] = openai.AsyncOpenAI(max_retries=0)
+        else:
+            import anthropic
+
+            clients[loop] = anthropic.AsyncAnthropic(max_retries=0)
+    return clients[loop]
+
+
+def request_key(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            digest.update(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def estimate_tokens(prompt: str, max_tokens: Optional[int]) -> int:
+    return len(prompt) // 4 + _IMAGE_TOKEN_ESTIMATE + (max_tokens or 300)
+
+
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying after `error`, or None if it is not retryable."""
+    status = getattr(error, "status_code", None)
+    if status is None or (status != 429 and status < 500):
+        return None
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), _BACKOFF_MAX_SEC)
+    except (TypeError, ValueError):
+        backoff = min(_BACKOFF_BASE_SEC * 2**attempt, _BACKOFF_MAX_SEC)
+        return backoff * random.uniform(0.5, 1.0)
+
+
+async def _limited_call(provider: str, key: str, tokens: int, call) -> Any:
+    limiter = get_limiter(provider)
+
+    async def run():
+        for attempt in range(_MAX_RETRIES + 1):
+            if limiter is not None:
+                await limiter.acquire_async(tokens)
+            try:
+                result, used_tokens = await call()
+            except Exception as error:
+                if limiter is not None:
+                    # A failed request used no tokens; give back the estimate.
+                    limiter.record_usage(tokens, 0)
+                delay = retry_delay(error, attempt)
+                if delay is None or attempt == _MAX_RETRIES:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if limiter is not None:
+                limiter.record_usage(tokens, used_tokens)
+            return result
+
+    if limiter is None or not limiter.params.coalesce:
+        return await run()
+    return await get_coalescer(provider).run(key, run)
+
+
+@pxt.udf
+async def openai_transcriptions(
+    audio: pxt.Audio, *, model: str, model_kwargs: Optional[dict] = None
+) -> pxt.Json:
+    model_kwargs = model_kwargs or {}
+    with open(audio, "rb") as f:
+        audio_bytes = f.read()
+
+    async def call():
+        response = await _client("openai").audio.transcriptions.create(
+            file=(audio.rsplit("/", 1)[-1], audio_bytes), model=model, **model_kwargs
+        )
+        return response.model_dump(mode="json"), None
+
+    key = request_key("transcriptions", model, model_kwargs, audio_bytes)
+    return await _limited_call("openai", key, 0, call)
+
+
+@pxt.udf
+async def openai_vision(
+    prompt: str,
+    image: PIL.Image.Image,
+    *,
+    model: str,
+    model_kwargs: Optional[dict] = None,
+) -> str:
+    model_kwargs = model_kwargs or {}
+    media_type, data = encode_image(image)
+
+    async def call():
+        response = await _client("openai").chat.completions.create(
+            model=model,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": f"data:{media_type};base64,{data}"},
+                        },
+                    ],
+                }
+            ],
+            **model_kwargs,
+        )
+        usage = response.usage.total_tokens if response.usage else None
+        return response.choices[0].message.content, usage
+
+    key = request_key("vision", model, prompt, model_kwargs, data)
+    tokens = estimate_tokens(prompt, model_kwargs.get("max_tokens"))
+    return await _limited_call("openai", key, tokens, call)
+
+
+@pxt.udf
+async def anthropic_vision(
+    prompt: str,
+    image: PIL.Image.Image,
+    *,
+    model: str,
+    max_tokens: int = 1024,
+    model_kwargs: Optional[dict] = None,
+) -> str:
+    model_kwargs = model_kwargs or {}
+    media_type, data = encode_image(image)
+
+    async def call():
+        response = await _client("anthropic").messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": media_type,
+                                "data": data,
+                            },
+                        },
+                    ],
+                }
+            ],
+            **model_kwargs,
+        )
+        usage = response.usage.input_tokens + response.usage.output_tokens
+        return response.content[0].text, usage
+
+    key = request_key("vision", model, prompt, max_tokens, model_kwargs, data)
+    return await _limited_call(
+        "anthropic", key, estimate_tokens(prompt, max_tokens), call
+    )
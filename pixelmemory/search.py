@@ -0,0 +1,703 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+import PIL.Image
+import pixeltable as pxt
+
+from .ann import ExactIndex, IVFIndex, build_index, mmr, needs_training
+from .config import IndexedColumn, IndexParams
+from .embeddings import encode
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+_METADATA_TYPES = (
+    pxt.String,
+    pxt.Int,
+    pxt.Float,
+    pxt.Bool,
+    pxt.Timestamp,
+    pxt.Date,
+    pxt.Json,
+)
+
+TIME_COLUMNS = ("sentence_start_sec", "sentence_end_sec")
+FRAME_COLUMNS = ("pos_msec",)
+POS_COLUMN = "pos"
+TOKEN_COUNT_COLUMN = "token_count"
+ROW_ID_COLUMN = "pxm_row_id"
+
+
+@dataclass
+class VectorSet:
+    index: Union[ExactIndex, IVFIndex]
+    rows: List[Dict[str, Any]]
+    # Group id of each row's source (base table) row, for view-backed indexes.
+    sources: Optional[np.ndarray] = None
+
+
+class LRUCache:
+    """
+    Bounded LRU for in-process search state: loaded vector sets, and search
+    results keyed by (index, query hash, k, search options, tenant). The
+    tenant is always the last key element, so tenant-scoped writes can drop only
+    the entries they affect, and a memory with many tenants keeps at most
+    `max_entries` of them in RAM.
+
+    Each entry records the stamp it was computed under (`Memory._cache_stamp`)
+    and is only returned for that stamp, so writes made by other `Memory`
+    instances, other processes or directly on the table are never served from a
+    stale entry.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple, version: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if version is not None and entry[0] != version:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple, value: Any, version: Any = None) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant: Optional[str] = None) -> None:
+        with self._lock:
+            if tenant is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[-1] in (tenant, None)]:
+                del self._entries[key]
+
+
+
+def metadata_columns(memory_instance: "Memory") -> List[str]:
+    return [
+        col_name
+        for col_name, col_type in memory_instance.schema.items()
+        if col_type in _METADATA_TYPES
+    ]
+
+
+def is_view(memory_instance: "Memory", indexed: IndexedColumn) -> bool:
+    return indexed.table is not memory_instance.table and hasattr(
+        indexed.table, POS_COLUMN
+    )
+
+
+def result_columns(memory_instance: "Memory", indexed: IndexedColumn) -> Dict[str, Any]:
+    table = indexed.table
+    columns = {
+        col_name: getattr(table, col_name)
+        for col_name in metadata_columns(memory_instance)
+    }
+    columns[indexed.indexed_col] = getattr(table, indexed.indexed_col)
+    if is_view(memory_instance, indexed):
+        # The base row's id identifies the row a chunk, sentence or frame was split
+        # from, and `pos` is its place in that row.
+        columns[indexed.original_col] = getattr(table, indexed.original_col)
+        columns[ROW_ID_COLUMN] = getattr(table, ROW_ID_COLUMN)
+        columns[POS_COLUMN] = getattr(table, POS_COLUMN)
+    for col_name in TIME_COLUMNS + FRAME_COLUMNS + (TOKEN_COUNT_COLUMN,):
+        if hasattr(table, col_name):
+            columns[col_name] = getattr(table, col_name)
+    return columns
+
+
+def filter_expr(
+    table: pxt.Table,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+):
+    """
+    Pixeltable predicate for metadata equality filters and a time window. A row is in
+    the window when its sentence span overlaps [t0, t1]; Pixeltable's default B-tree
+    indexes on the offset columns keep this a range scan.
+    """
+    conditions = [getattr(table, col) == value for col, value in (where or {}).items()]
+    if time_range is not None:
+        if not hasattr(table, TIME_COLUMNS[0]):
+            raise ValueError("time_range is only supported on audio and video indexes.")
+        t0, t1 = time_range
+        conditions.append(getattr(table, TIME_COLUMNS[1]) >= t0)
+        conditions.append(getattr(table, TIME_COLUMNS[0]) <= t1)
+    if not conditions:
+        return None
+    expr = conditions[0]
+    for condition in conditions[1:]:
+        expr = expr & condition
+    return expr
+
+
+def tenant_expr(memory_instance: "Memory", table: pxt.Table, tenant: str):
+    if memory_instance.tenant_key is None:
+        raise ValueError("Memory was created without a `tenant_key`.")
+    return getattr(table, memory_instance.tenant_key) == tenant
+
+
+def row_matches(
+    row: Dict[str, Any],
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+) -> bool:
+    """In-process counterpart of `filter_expr` over cached result rows."""
+    if any(row.get(col) != value for col, value in (where or {}).items()):
+        return False
+    if time_range is not None:
+        if TIME_COLUMNS[0] not in row:
+            raise ValueError("time_range is only supported on audio and video indexes.")
+        t0, t1 = time_range
+        return row[TIME_COLUMNS[1]] >= t0 and row[TIME_COLUMNS[0]] <= t1
+    return True
+
+
+def embedding_expr(indexed: IndexedColumn):
+    if indexed.embedding_col is not None:
+        return getattr(indexed.table, indexed.embedding_col)
+    return getattr(indexed.table, indexed.indexed_col).embedding(idx=indexed.index_name)
+
+
+def resolve_index(
+    memory_instance: "Memory",
+    column: Optional[str] = None,
+    index_name: Optional[str] = None,
+    modality: str = "text",
+) -> IndexedColumn:
+    candidates = [
+        indexed
+        for indexed in memory_instance.resources.indexed_columns
+        if indexed.modality == modality
+        and (column is None or indexed.original_col == column)
+        and (index_name is None or indexed.index_name == index_name)
+    ]
+    if not candidates:
+        raise ValueError(
+            f"No {modality} index found for column={column!r}, index_name={index_name!r}."
+        )
+    if len(candidates) > 1 and column is None:
+        raise ValueError(
+            "Memory has several indexes; pass `column` (and `index_name`) to choose one: "
+            + ", ".join(
+                sorted({f"{c.original_col}.{c.index_name}" for c in candidates})
+            )
+        )
+    return candidates[0]
+
+
+def encodes_in_process(indexed: IndexedColumn, query: Any) -> bool:
+    """Whether `query_vector` can embed `query` without going through Pixeltable."""
+    if indexed.modality == "image" or not isinstance(query, str):
+        return True
+    return isinstance(indexed.embed_model, str)
+
+
+def query_vector(indexed: IndexedColumn, query: Any) -> np.ndarray:
+    if indexed.modality == "image" and isinstance(query, (str, PIL.Image.Image)):
+        from .local import clip_embed_images, clip_embed_texts
+
+        embed = clip_embed_texts if isinstance(query, str) else clip_embed_images
+        return embed([query], indexed.embed_model, **indexed.embed_kwargs)[0]
+    if isinstance(query, str):
+        return encode(indexed.embed_model, query)
+    return np.asarray(query, dtype=np.float32)
+
+
+def query_vectors(indexed: IndexedColumn, queries: List[Any]) -> np.ndarray:
+    """Embed several queries with one encoder call per input kind."""
+    vectors: List[Optional[np.ndarray]] = [None] * len(queries)
+    groups: Dict[str, List[int]] = {}
+    for i, query in enumerate(queries):
+        if isinstance(query, str):
+            groups.setdefault("text", []).append(i)
+        elif isinstance(query, PIL.Image.Image):
+            groups.setdefault("image", []).append(i)
+        else:
+            vectors[i] = np.asarray(query, dtype=np.float32)
+    for kind, positions in groups.items():
+        batch = [queries[i] for i in positions]
+        if indexed.modality == "image":
+            from .local import clip_embed_images, clip_embed_texts
+
+            embed = clip_embed_texts if kind == "text" else clip_embed_images
+            encoded = embed(batch, indexed.embed_model, **indexed.embed_kwargs)
+        else:
+            encoded = encode(indexed.embed_model, batch)
+        for i, vector in zip(positions, encoded):
+            vectors[i] = vector
+    return np.stack(vectors)
+
+
+def load_vectors(
+    memory_instance: "Memory",
+    indexed: IndexedColumn,
+    exact: bool = False,
+    tenant: Optional[str] = None,
+) -> VectorSet:
+    """
+    Fetch (and cache until the next write) an index's embeddings and row payloads,
+    optionally only those of one tenant.
+    """
+    kind = "exact" if exact or indexed.index_params.kind != "ivf" else "ivf"
+    key = (id(indexed), kind, tenant)
+    version = memory_instance._cache_stamp(tenant)
+    cached = memory_instance._vector_cache.get(key, version)
+    if cached is not None:
+        return cached
+
+    columns = result_columns(memory_instance, indexed)
+    query_obj = indexed.table
+    if tenant is not None:
+        query_obj = query_obj.where(tenant_expr(memory_instance, indexed.table, tenant))
+    rows = list(
+        query_obj.select(pxm_embedding=embedding_expr(indexed), **columns).collect()
+    )
+    if rows:
+        vectors = np.stack([row.pop("pxm_embedding") for row in rows])
+    else:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    sources = None
+    if is_view(memory_instance, indexed):
+        group_ids: Dict[Any, int] = {}
+        sources = np.array(
+            [
+                group_ids.setdefault(row[ROW_ID_COLUMN], len(group_ids))
+                for row in rows
+            ],
+            dtype=np.int64,
+        )
+
+    params = indexed.index_params
+    if kind == "exact":
+        index = ExactIndex(vectors, metric=params.metric)
+    else:
+        index = build_ivf(memory_instance, (id(indexed), tenant), vectors, params)
+    vector_set = VectorSet(index=index, rows=rows, sources=sources)
+    memory_instance._vector_cache.put(key, vector_set, version)
+    return vector_set
+
+
+def build_ivf(
+    memory_instance: "Memory", key: Tuple, vectors: np.ndarray, params: IndexParams
+) -> IVFIndex:
+    """
+    IVF index over `vectors`, reusing the centroids last trained for `key` until
+    the row count has drifted by `params.retrain_ratio`.
+    """
+    trained = memory_instance._ivf_centroids.get(key)
+    centroids = None
+    if trained is not None and not needs_training(
+        trained[1], len(vectors), params.retrain_ratio
+    ):
+        centroids = trained[0]
+    index = build_index(vectors, params, centroids=centroids)
+    if centroids is None and len(index):
+        memory_instance._ivf_centroids.put(key, (index.centroids, len(index)))
+    return index
+
+
+def search(
+    memory_instance: "Memory",
+    query: Any,
+    k: int = 10,
+    column: Optional[str] = None,
+    index_name: Optional[str] = None,
+    exact: bool = False,
+    nprobe: Optional[int] = None,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+    tenant: Optional[str] = None,
+    mmr_lambda: Optional[float] = None,
+    fetch_k: Optional[int] = None,
+    collapse_source: bool = False,
+    expand_neighbors: int = 0,
+    return_parent: bool = False,
+) -> List[Dict[str, Any]]:
+    indexed = resolve_index(memory_instance, column, index_name)
+    if mmr_lambda is not None or collapse_source:
+        rows = diverse_search(
+            memory_instance,
+            indexed,
+            query,
+            k,
+            1.0 if mmr_lambda is None else mmr_lambda,
+            fetch_k,
+            collapse_source,
+            where,
+            time_range,
+            tenant,
+        )
+    else:
+        rows = search_index(
+            memory_instance, indexed, query, k, exact, nprobe, where, time_range, tenant
+        )
+    if expand_neighbors or return_parent:
+        rows = expand_results(
+            memory_instance, indexed, rows, expand_neighbors, return_parent
+        )
+    return rows
+
+
+def chunk_order(table: pxt.Table) -> str:
+    # Sentence views restart `pos` for every audio chunk; their start time is global.
+    return TIME_COLUMNS[0] if hasattr(table, TIME_COLUMNS[0]) else POS_COLUMN
+
+
+def fetch_chunks(
+    indexed: IndexedColumn, row_ids: List[str]
+) -> Dict[str, List[Tuple[Any, str]]]:
+    """(order, text) of every chunk of the given base rows, in order, per row id."""
+    table = indexed.table
+    order = chunk_order(table)
+    row_id = getattr(table, ROW_ID_COLUMN)
+    chunks = (
+        table.where(row_id.isin(row_ids))
+        .select(
+            pxm_row_id=row_id,
+            pxm_order=getattr(table, order),
+            pxm_text=getattr(table, indexed.indexed_col),
+        )
+        .collect()
+    )
+    grouped: Dict[str, List[Tuple[Any, str]]] = {}
+    for chunk in chunks:
+        grouped.setdefault(chunk["pxm_row_id"], []).append(
+            (chunk["pxm_order"], chunk["pxm_text"])
+        )
+    for entries in grouped.values():
+        entries.sort(key=lambda entry: entry[0])
+    return grouped
+
+
+def expand_results(
+    memory_instance: "Memory",
+    indexed: IndexedColumn,
+    rows: List[Dict[str, Any]],
+    expand_neighbors: int = 0,
+    return_parent: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Add `context` (the hit with `expand_neighbors` chunks on each side, joined in
+    order) and/or `parent` (all of the base row's chunks joined) to chunk results.
+    Only the chunks of the hits' own base rows are fetched, in one query.
+    """
+    if not is_view(memory_instance, indexed) or indexed.modality != "text":
+        raise ValueError(
+            "expand_neighbors and return_parent need a chunked index "
+            "(a document, chunked text, audio or video column)."
+        )
+    if not rows:
+        return rows
+    chunks = fetch_chunks(indexed, list({row[ROW_ID_COLUMN] for row in rows}))
+    order = chunk_order(indexed.table)
+    is_document = memory_instance.schema.get(indexed.original_col) == pxt.Document
+    separator = "\n\n" if is_document else " "
+    for row in rows:
+        entries = chunks.get(row[ROW_ID_COLUMN], [])
+        texts = [text for _, text in entries]
+        positions = [value for value, _ in entries]
+        if row[order] not in positions:
+            continue
+        i = positions.index(row[order])
+        if expand_neighbors:
+            window = texts[max(0, i - expand_neighbors) : i + expand_neighbors + 1]
+            row["context"] = separator.join(window)
+        if return_parent:
+            row["parent"] = separator.join(texts)
+    return rows
+
+
+def query_hash(query: Any) -> str:
+    digest = hashlib.sha256()
+    if isinstance(query, str):
+        digest.update(b"text:" + query.encode("utf-8"))
+    elif isinstance(query, PIL.Image.Image):
+        digest.update(f"image:{query.mode}:{query.size}:".encode("utf-8"))
+        digest.update(query.tobytes())
+    else:
+        digest.update(b"vector:" + np.asarray(query, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def search_index(
+    memory_instance: "Memory",
+    indexed: IndexedColumn,
+    query: Any,
+    k: int = 10,
+    exact: bool = False,
+    nprobe: Optional[int] = None,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+    tenant: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    `_search_index` behind the Memory's result cache. Entries are only served
+    under the stamp they were computed at, so a hit is never stale, whoever
+    wrote to the table.
+    """
+    cache = memory_instance._result_cache
+    if cache is None:
+        return _search_index(
+            memory_instance, indexed, query, k, exact, nprobe, where, time_range, tenant
+        )
+    version = memory_instance._cache_stamp(tenant)
+    key = (
+        id(indexed),
+        query_hash(query),
+        k,
+        exact,
+        nprobe,
+        repr(sorted((where or {}).items())),
+        time_range,
+        tenant,
+    )
+    rows = cache.get(key, version)
+    if rows is None:
+        rows = _search_index(
+            memory_instance, indexed, query, k, exact, nprobe, where, time_range, tenant
+        )
+        cache.put(key, rows, version)
+    # Callers annotate result rows, so hand out copies.
+    return [dict(row) for row in rows]
+
+
+def _search_index(
+    memory_instance: "Memory",
+    indexed: IndexedColumn,
+    query: Any,
+    k: int = 10,
+    exact: bool = False,
+    nprobe: Optional[int] = None,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+    tenant: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    # A tenant's rows are a small slice of the shared index, so they are searched
+    # exactly from a per-tenant vector cache; a filtered HNSW scan can come back short.
+    use_hnsw = indexed.index_params.kind == "hnsw" and not exact
+    if tenant is not None and encodes_in_process(indexed, query):
+        use_hnsw = False
+        exact = True
+    if use_hnsw:
+        source = getattr(indexed.table, indexed.indexed_col)
+        sim = source.similarity(query, idx=indexed.index_name)
+        query_obj = indexed.table
+        predicate = filter_expr(indexed.table, where, time_range)
+        if tenant is not None:
+            condition = tenant_expr(memory_instance, indexed.table, tenant)
+            predicate = condition if predicate is None else predicate & condition
+        if predicate is not None:
+            query_obj = query_obj.where(predicate)
+        rows = (
+            query_obj.order_by(sim, asc=False)
+            .limit(k)
+            .select(**result_columns(memory_instance, indexed), similarity=sim)
+            .collect()
+        )
+        return [dict(row) for row in rows]
+
+    vector_set = load_vectors(memory_instance, indexed, exact=exact, tenant=tenant)
+    return rank(vector_set, query_vector(indexed, query), k, nprobe, where, time_range)[
+        0
+    ]
+
+
+def rank(
+    vector_set: VectorSet,
+    queries: np.ndarray,
+    k: int,
+    nprobe: Optional[int] = None,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Top-`k` rows of a cached vector set for each row of `queries`, in one scan."""
+    subset = filter_subset(vector_set, where, time_range)
+    ids, scores = vector_set.index.search(queries, k, subset=subset, nprobe=nprobe)
+    return [
+        [
+            {**vector_set.rows[i], "similarity": float(score)}
+            for i, score in zip(query_ids, query_scores)
+            if i >= 0
+        ]
+        for query_ids, query_scores in zip(ids, scores)
+    ]
+
+
+def filter_subset(
+    vector_set: VectorSet,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+) -> Optional[np.ndarray]:
+    if not where and time_range is None:
+        return None
+    return np.array(
+        [
+            i
+            for i, row in enumerate(vector_set.rows)
+            if row_matches(row, where, time_range)
+        ],
+        dtype=np.int64,
+    )
+
+
+def diverse_search(
+    memory_instance: "Memory",
+    indexed: IndexedColumn,
+    query: Any,
+    k: int = 10,
+    mmr_lambda: float = 0.5,
+    fetch_k: Optional[int] = None,
+    collapse_source: bool = False,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+    tenant: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Take the `fetch_k` nearest rows, then re-rank them with MMR so that overlapping
+    chunks of the same passage do not crowd out other results. `collapse_source`
+    keeps at most one result per base row.
+    """
+    if not encodes_in_process(indexed, query):
+        raise ValueError(
+            "Diverse search needs the query vectors in process; use a "
+            "sentence-transformers model id as `embed_model` or pass a vector."
+        )
+    vector_set = load_vectors(memory_instance, indexed, exact=True, tenant=tenant)
+    subset = filter_subset(vector_set, where, time_range)
+    ids, scores = vector_set.index.search(
+        query_vector(indexed, query), fetch_k or max(4 * k, 20), subset=subset
+    )
+    ids, scores = ids[0], scores[0]
+    groups = None
+    if collapse_source and vector_set.sources is not None:
+        groups = vector_set.sources[ids]
+    picked = mmr(
+        vector_set.index.vectors[ids], scores, k, lambda_mult=mmr_lambda, groups=groups
+    )
+    return [{**vector_set.rows[ids[i]], "similarity": float(scores[i])} for i in picked]
+
+
+def search_many(
+    memory_instance: "Memory",
+    queries: List[Any],
+    k: int = 10,
+    column: Optional[str] = None,
+    index_name: Optional[str] = None,
+    exact: bool = False,
+    nprobe: Optional[int] = None,
+    where: Optional[Dict[str, Any]] = None,
+    time_range: Optional[Tuple[float, float]] = None,
+    tenant: Optional[str] = None,
+) -> List[List[Dict[str, Any]]]:
+    indexed = resolve_index(memory_instance, column, index_name)
+    if not queries:
+        return []
+    # Pixeltable embedding functions only run inside a query plan, and an HNSW
+    # index is probed per query rather than exported into an in-process scan.
+    uses_hnsw = indexed.index_params.kind == "hnsw" and not exact and tenant is None
+    if uses_hnsw or not all(encodes_in_process(indexed, query) for query in queries):
+        return [
+            search_index(
+                memory_instance,
+                indexed,
+                query,
+                k,
+                exact,
+                nprobe,
+                where,
+                time_range,
+                tenant,
+            )
+            for query in queries
+        ]
+    vector_set = load_vectors(memory_instance, indexed, exact=exact, tenant=tenant)
+    return rank(
+        vector_set, query_vectors(indexed, queries), k, nprobe, where, time_range
+    )
+
+
+def search_images(
+    memory_instance: "Memory",
+    query: Any,
+    k: int = 10,
+    column: Optional[str] = None,
+    where: Optional[Dict[str, Any]] = None,
+    exact: bool = False,
+    nprobe: Optional[int] = None,
+    tenant: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    indexes = [
+        indexed
+        for indexed in memory_instance.resources.indexed_columns
+        if indexed.modality == "image"
+        and (column is None or indexed.original_col == column)
+    ]
+    if not indexes:
+        raise ValueError(
+            "Memory has no CLIP index; set `use_clip=True` on an Image or Video context."
+        )
+    # Scores from different CLIP models or metrics are not comparable.
+    spaces = {
+        (str(indexed.embed_model), indexed.index_params.metric) for indexed in indexes
+    }
+    if len(spaces) > 1:
+        raise ValueError(
+            "The CLIP indexes use different models or metrics; pass `column` to "
+            "choose one of: " + ", ".join(indexed.original_col for indexed in indexes)
+        )
+    results = []
+    for indexed in indexes:
+        for row in search_index(
+            memory_instance, indexed, query, k, exact, nprobe, where, None, tenant
+        ):
+            row["column"] = indexed.original_col
+            results.append(row)
+    results.sort(key=lambda row: row["similarity"], reverse=True)
+    return results[:k]
+
+
+def within(
+    memory_instance: "Memory",
+    column: str,
+    t0: float,
+    t1: float,
+    where: Optional[Dict[str, Any]] = None,
+    tenant: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    candidates = [
+        indexed
+        for indexed in memory_instance.resources.indexed_columns
+        if indexed.original_col == column and hasattr(indexed.table, TIME_COLUMNS[0])
+    ]
+    if not candidates:
+        raise ValueError(f"Column '{column}' has no time-aligned transcript index.")
+    indexed = candidates[0]
+    table = indexed.table
+    predicate = filter_expr(table, where, (t0, t1))
+    if tenant is not None:
+        predicate = predicate & tenant_expr(memory_instance, table, tenant)
+    rows = (
+        table.where(predicate)
+        .order_by(getattr(table, TIME_COLUMNS[0]))
+        .select(**result_columns(memory_instance, indexed))
+        .collect()
+    )
+    return [dict(row) for row in rows]
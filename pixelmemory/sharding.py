@@ -0,0 +1,183 @@
+import hashlib
+import itertools
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .context import Context
+
+# The shard owned by this worker process; set by `_init_shard`.
+_shard = None
+
+
+def _init_shard(home: str, payload: bytes) -> None:
+    global _shard
+    # Each shard is its own Pixeltable instance. The home must be set before the
+    # context is unpickled, since that is the first thing to touch Pixeltable.
+    os.makedirs(home, exist_ok=True)
+    os.environ["PIXELTABLE_HOME"] = home
+    from .memory import Memory
+
+    context, memory_kwargs = pickle.loads(payload)
+    _shard = Memory(context, **memory_kwargs)
+
+
+def _shard_insert(rows: List[Dict[str, Any]]) -> int:
+    _shard.insert(rows)
+    return len(rows)
+
+
+def _shard_search(method: str, query: Any, k: int, kwargs: Dict[str, Any]):
+    return getattr(_shard, method)(query, k=k, **kwargs)
+
+
+def _shard_delete(where: Optional[Dict[str, Any]]) -> int:
+    table = _shard.table
+    predicate = None
+    for col, value in (where or {}).items():
+        condition = getattr(table, col) == value
+        predicate = condition if predicate is None else predicate & condition
+    rows_before = table.count()
+    _shard.delete(where=predicate)
+    return rows_before - table.count()
+
+
+def _shard_count() -> int:
+    return _shard.table.count()
+
+
+def shard_for(key: Any, num_shards: int) -> int:
+    """Stable across processes and runs, unlike the built-in `hash`."""
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+class ShardedMemory:
+    """
+    Hash-partitions rows across `num_shards` local `Memory` instances, each running
+    in its own worker process with its own Pixeltable home under `root`. Inserts are
+    routed by `key_column`; searches scatter to every shard in parallel and the
+    per-shard top-k lists are merged.
+
+    The context and any `memory_kwargs` are pickled to the workers, so embedding
+    models must be given by id rather than as Pixeltable functions. Scripts that
+    create a `ShardedMemory` need an `if __name__ == "__main__":` guard, as the
+    workers are spawned.
+
+    Example:
+        memory = ShardedMemory(context, num_shards=4, key_column="user_id")
+        memory.insert([{"user_id": "u1", "text": "..."}])
+        memory.search("query", k=5)
+    """
+
+    def __init__(
+        self,
+        context: List[Context],
+        num_shards: int = 4,
+        key_column: Optional[str] = None,
+        root: Optional[str] = None,
+        namespace: str = "default_memory",
+        table_name: str = "memory",
+        **memory_kwargs,
+    ):
+        import multiprocessing
+
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1.")
+        self.num_shards = num_shards
+        self.key_column = key_column
+        self.root = root or os.path.join(
+            os.path.expanduser("~"), ".pixelmemory", "shards", namespace, table_name
+        )
+        try:
+            payload = pickle.dumps(
+                (
+                    context,
+                    {"namespace": namespace, "table_name": table_name, **memory_kwargs},
+                )
+            )
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            raise ValueError(
+                "ShardedMemory needs a picklable context; pass embedding models by id."
+            ) from e
+
+        # Spawned workers never inherit the parent's database connections or threads.
+        mp_context = multiprocessing.get_context("spawn")
+        self._pools = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp_context,
+                initializer=_init_shard,
+                initargs=(os.path.join(self.root, f"shard_{i}"), payload),
+            )
+            for i in range(num_shards)
+        ]
+        self._round_robin = itertools.count()
+        # Start every shard now so that setup errors surface here, not on first use.
+        self._gather([pool.submit(_shard_count) for pool in self._pools])
+
+    def _gather(self, futures: List[Any]) -> List[Any]:
+        return [future.result() for future in futures]
+
+    def _route(self, row: Dict[str, Any]) -> int:
+        if self.key_column is None:
+            return next(self._round_robin) % self.num_shards
+        return shard_for(row[self.key_column], self.num_shards)
+
+    def insert(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert rows, routed to their shards in parallel. Returns the number inserted."""
+        batches: Dict[int, List[Dict[str, Any]]] = {}
+        for row in rows:
+            batches.setdefault(self._route(row), []).append(row)
+        futures = [
+            self._pools[shard].submit(_shard_insert, batch)
+            for shard, batch in batches.items()
+        ]
+        return sum(self._gather(futures))
+
+    def _scatter(
+        self, method: str, query: Any, k: int, kwargs: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        where = kwargs.get("where") or {}
+        if self.key_column in where:
+            # The key pins the query to a single shard.
+            shards = [shard_for(where[self.key_column], self.num_shards)]
+        else:
+            shards = range(self.num_shards)
+        futures = {
+            shard: self._pools[shard].submit(_shard_search, method, query, k, kwargs)
+            for shard in shards
+        }
+        results = []
+        for shard, future in futures.items():
+            for row in future.result():
+                row["shard"] = shard
+                results.append(row)
+        results.sort(key=lambda row: row["similarity"], reverse=True)
+        return results[:k]
+
+    def search(self, query: Any, k: int = 10, **kwargs) -> List[Dict[str, Any]]:
+        """Top-`k` across all shards; accepts the keyword arguments of `Memory.search`."""
+        return self._scatter("search", query, k, kwargs)
+
+    def search_images(self, query: Any, k: int = 10, **kwargs) -> List[Dict[str, Any]]:
+        return self._scatter("search_images", query, k, kwargs)
+
+    def delete(self, where: Optional[Dict[str, Any]] = None) -> int:
+        """Delete rows matching the equality filters in `where` from every shard."""
+        futures = [pool.submit(_shard_delete, where) for pool in self._pools]
+        return sum(self._gather(futures))
+
+    def count(self) -> int:
+        return sum(self._gather([pool.submit(_shard_count) for pool in self._pools]))
+
+    def close(self) -> None:
+        for pool in self._pools:
+            pool.shutdown(wait=True)
+
+    def __enter__(self) -> "ShardedMemory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,303 @@
+import dataclasses
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union, TYPE_CHECKING
+
+import numpy as np
+
+from .ann import IVFIndex, build_index, pairwise_scores
+from .config import IndexedColumn, IndexParams
+from .embeddings import encode, normalize
+from .search import embedding_expr, metadata_columns
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def _write_strings(values: List[str], data_path: str, offsets_path: str) -> None:
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(data_path, "wb") as f:
+        for i, value in enumerate(values):
+            encoded = value.encode("utf-8")
+            f.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+    np.save(offsets_path, offsets)
+
+
+def _write_index(
+    memory_instance: "Memory",
+    indexed_col: IndexedColumn,
+    index_dir: str,
+) -> Dict[str, Any]:
+    table = indexed_col.table
+    source = getattr(table, indexed_col.indexed_col)
+    meta_cols = metadata_columns(memory_instance)
+
+    select_exprs = {"pxm_embedding": embedding_expr(indexed_col)}
+    if indexed_col.modality == "text":
+        select_exprs["pxm_text"] = source
+    for col_name in meta_cols:
+        select_exprs[col_name] = getattr(table, col_name)
+    rows = list(table.select(**select_exprs).collect())
+
+    os.makedirs(index_dir)
+    if rows:
+        embeddings = np.stack([row["pxm_embedding"] for row in rows]).astype(np.float32)
+        if indexed_col.index_params.metric == "cosine":
+            embeddings = normalize(embeddings)
+    else:
+        embeddings = np.zeros((0, 0), dtype=np.float32)
+    np.save(os.path.join(index_dir, "embeddings.npy"), embeddings)
+    if indexed_col.index_params.kind == "ivf" and len(embeddings):
+        # Train once here rather than in every replica that opens the snapshot.
+        ivf = build_index(embeddings, indexed_col.index_params)
+        np.save(os.path.join(index_dir, "ivf_centroids.npy"), ivf.centroids)
+        np.save(os.path.join(index_dir, "ivf_ids.npy"), np.concatenate(ivf.lists))
+        np.save(
+            os.path.join(index_dir, "ivf_offsets.npy"),
+            np.cumsum([0] + [len(ids) for ids in ivf.lists]),
+        )
+
+    _write_strings(
+        [row.get("pxm_text") or "" for row in rows],
+        os.path.join(index_dir, "text.bin"),
+        os.path.join(index_dir, "text_offsets.npy"),
+    )
+    _write_strings(
+        [
+            json.dumps({col_name: row[col_name] for col_name in meta_cols}, default=str)
+            for row in rows
+        ],
+        os.path.join(index_dir, "metadata.bin"),
+        os.path.join(index_dir, "metadata_offsets.npy"),
+    )
+
+    embed_model = indexed_col.embed_model
+    return {
+        "name": f"{indexed_col.original_col}.{indexed_col.indexed_col}.{indexed_col.index_name}",
+        "dir": os.path.basename(index_dir),
+        "original_col": indexed_col.original_col,
+        "indexed_col": indexed_col.indexed_col,
+        "index_name": indexed_col.index_name,
+        "modality": indexed_col.modality,
+        "index_params": dataclasses.asdict(indexed_col.index_params),
+        "embed_model": embed_model if isinstance(embed_model, str) else None,
+        "count": int(embeddings.shape[0]),
+        "dim": int(embeddings.shape[1]),
+    }
+
+
+def write_snapshot(memory_instance: "Memory", path: str) -> str:
+    target = os.path.abspath(path)
+    if os.path.exists(target):
+        raise FileExistsError(f"Snapshot path already exists: {target}")
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+
+    # Build the bundle next to its final location and rename it into place, so
+    # readers never observe a partially written snapshot.
+    staging_dir = tempfile.mkdtemp(prefix=".pxm-snapshot-", dir=parent)
+    try:
+        entries = [
+            _write_index(
+                memory_instance, indexed_col, os.path.join(staging_dir, f"index_{i}")
+            )
+            for i, indexed_col in enumerate(memory_instance.resources.indexed_columns)
+        ]
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "namespace": memory_instance.namespace,
+            "table_name": memory_instance.table_name,
+            "created_at": datetime.now().isoformat(),
+            "indexes": entries,
+        }
+        with open(os.path.join(staging_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        for root, _, files in os.walk(staging_dir):
+            for file_name in files:
+                os.chmod(os.path.join(root, file_name), 0o444)
+        os.rename(staging_dir, target)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    return target
+
+
+class _StringStore:
+    def __init__(self, data_path: str, offsets_path: str):
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        if os.path.getsize(data_path) > 0:
+            self.data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        else:
+            self.data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self.data[start:end]).decode("utf-8")
+
+
+class _SnapshotIndex:
+    def __init__(self, root: str, entry: Dict[str, Any]):
+        self.entry = entry
+        self.name: str = entry["name"]
+        index_dir = os.path.join(root, entry["dir"])
+        self.embeddings = np.load(
+            os.path.join(index_dir, "embeddings.npy"), mmap_mode="r"
+        )
+        self.text = _StringStore(
+            os.path.join(index_dir, "text.bin"),
+            os.path.join(index_dir, "text_offsets.npy"),
+        )
+        self.metadata = _StringStore(
+            os.path.join(index_dir, "metadata.bin"),
+            os.path.join(index_dir, "metadata_offsets.npy"),
+        )
+        self.index_params = IndexParams(**entry.get("index_params", {}))
+        self._ivf = None
+        centroids_path = os.path.join(index_dir, "ivf_centroids.npy")
+        if self.index_params.kind == "ivf" and os.path.exists(centroids_path):
+            ids = np.load(os.path.join(index_dir, "ivf_ids.npy"), mmap_mode="r")
+            offsets = np.load(os.path.join(index_dir, "ivf_offsets.npy"))
+            self._ivf = IVFIndex.from_lists(
+                self.embeddings,
+                np.load(centroids_path),
+                [ids[offsets[c] : offsets[c + 1]] for c in range(len(offsets) - 1)],
+                metric=self.index_params.metric,
+                nprobe=self.index_params.nprobe,
+            )
+
+    def top_k(
+        self, query_vector: np.ndarray, k: int, nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        n = self.embeddings.shape[0]
+        if n == 0 or k <= 0:
+            return []
+        if self.index_params.kind == "ivf":
+            # Snapshots written before IVF lists were bundled train on first use.
+            if self._ivf is None:
+                self._ivf = build_index(self.embeddings, self.index_params)
+            ids, scores = self._ivf.search(query_vector, k, nprobe=nprobe)
+            return [
+                self.row(int(i), float(score))
+                for i, score in zip(ids[0], scores[0])
+                if i >= 0
+            ]
+        scores = pairwise_scores(
+            query_vector[None, :], self.embeddings, self.index_params.metric
+        )[0]
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.row(int(i), float(scores[i])) for i in top]
+
+    def row(self, i: int, similarity: float) -> Dict[str, Any]:
+        result = {"index": self.name, "similarity": similarity}
+        if self.entry["modality"] == "text":
+            result["text"] = self.text[i]
+        result.update(json.loads(self.metadata[i]))
+        return result
+
+
+class ReadOnlyMemory:
+    """
+    Read-only view of a `Memory.snapshot()` bundle.
+
+    Embeddings, chunk text and metadata are memory-mapped rather than loaded, so
+    opening a snapshot is cheap and concurrent replicas share pages through the
+    OS page cache. No Pixeltable store is opened.
+
+    Example:
+        replica = ReadOnlyMemory("/srv/snapshots/kb-2024-06-01")
+        hits = replica.search("quarterly revenue guidance", k=5)
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with open(os.path.join(self.path, MANIFEST_FILE)) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format version: {self.manifest.get('format_version')}"
+            )
+        self._indexes: Dict[str, _SnapshotIndex] = {
+            entry["name"]: _SnapshotIndex(self.path, entry)
+            for entry in self.manifest["indexes"]
+        }
+
+    @property
+    def indexes(self) -> List[str]:
+        return list(self._indexes.keys())
+
+    def _query_vector(self, index: _SnapshotIndex, query: Union[str, np.ndarray]):
+        if isinstance(query, str):
+            if index.entry["modality"] != "text" or not index.entry["embed_model"]:
+                raise ValueError(
+                    f"Index '{index.name}' can only be searched with a query vector."
+                )
+            return encode(index.entry["embed_model"], query)
+        if index.index_params.metric == "cosine":
+            return normalize(query)
+        return np.asarray(query, dtype=np.float32)
+
+    def search(
+        self,
+        query: Union[str, np.ndarray],
+        k: int = 10,
+        index: Optional[str] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the `k` most similar rows across one or all snapshot indexes.
+
+        Args:
+            query: Query text, or a precomputed query embedding.
+            k: Number of results to return.
+            index: Name of a single index to search (see `indexes`). By default all
+                indexes that can answer the query are searched and merged, which
+                requires them to share the embedding model and metric.
+            nprobe: Number of IVF lists to scan for indexes built with `kind="ivf"`.
+        """
+        if index is not None:
+            if index not in self._indexes:
+                raise ValueError(f"Unknown snapshot index: {index}")
+            targets = [self._indexes[index]]
+        elif isinstance(query, str):
+            targets = [
+                idx
+                for idx in self._indexes.values()
+                if idx.entry["modality"] == "text" and idx.entry["embed_model"]
+            ]
+        else:
+            targets = [
+                idx
+                for idx in self._indexes.values()
+                if idx.entry["dim"] == np.shape(query)[-1]
+            ]
+
+        # Scores from different models or metrics are not comparable.
+        spaces = {
+            (t.entry["embed_model"] or t.name, t.index_params.metric) for t in targets
+        }
+        if len(spaces) > 1:
+            raise ValueError(
+                "The matching snapshot indexes use different embedding models or "
+                "metrics; pass `index` to choose one of: "
+                + ", ".join(t.name for t in targets)
+            )
+
+        results: List[Dict[str, Any]] = []
+        for target in targets:
+            results.extend(
+                target.top_k(self._query_vector(target, query), k, nprobe=nprobe)
+            )
+        results.sort(key=lambda row: row["similarity"], reverse=True)
+        return results[:k]
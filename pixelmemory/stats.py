@@ -0,0 +1,72 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+
+from .search import TIME_COLUMNS, TOKEN_COUNT_COLUMN
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+CHAR_COUNT_COLUMN = "char_count"
+
+
+def percentile(histogram: List[Tuple[float, int]], q: float) -> float:
+    """The `q`-th percentile (linearly interpolated) of sorted (value, count) pairs."""
+    counts = np.cumsum([n for _, n in histogram])
+    values = [value for value, _ in histogram]
+    position = q / 100.0 * (counts[-1] - 1)
+
+    def value_at(rank: int) -> float:
+        return float(values[int(np.searchsorted(counts, rank, side="right"))])
+
+    lo, hi = int(np.floor(position)), int(np.ceil(position))
+    return float(value_at(lo) + (position - lo) * (value_at(hi) - value_at(lo)))
+
+
+def distribution(query: Any, value: Any) -> Dict[str, float]:
+    """
+    Min, mean, p50, p95, max and total of `value` over `query`. Pixeltable computes
+    the aggregates and a count per distinct value for the percentiles, so no
+    chunk rows are read into Python.
+    """
+    from pixeltable.functions import count, max, mean, min, sum
+
+    query = query.where(value != None)
+    summary = query.select(
+        n=count(value), min=min(value), mean=mean(value), max=max(value), total=sum(value)
+    ).collect()[0]
+    if not summary["n"]:
+        return {}
+    histogram = sorted(
+        (row["value"], row["n"])
+        for row in query.group_by(value).select(value=value, n=count(value)).collect()
+    )
+    return {
+        "min": float(summary["min"]),
+        "mean": float(summary["mean"]),
+        "p50": percentile(histogram, 50),
+        "p95": percentile(histogram, 95),
+        "max": float(summary["max"]),
+        "total": float(summary["total"]),
+    }
+
+
+def memory_stats(memory_instance: "Memory") -> Dict[str, Any]:
+    rows = memory_instance.table.count()
+    stats: Dict[str, Any] = {"rows": rows, "columns": {}}
+    for chunk_view in memory_instance.resources.chunk_views:
+        view = chunk_view.table
+        num_chunks = view.count()
+        column_stats: Dict[str, Any] = {
+            "view": view.get_metadata()["path"],
+            "chunks": num_chunks,
+            "chunks_per_row": num_chunks / rows if rows else 0.0,
+        }
+        for col_name in (TOKEN_COUNT_COLUMN, CHAR_COUNT_COLUMN):
+            if hasattr(view, col_name):
+                column_stats[col_name] = distribution(view, getattr(view, col_name))
+        if all(hasattr(view, col_name) for col_name in TIME_COLUMNS):
+            start, end = (getattr(view, col_name) for col_name in TIME_COLUMNS)
+            column_stats["duration_sec"] = distribution(view, end - start)
+        stats["columns"][chunk_view.name] = column_stats
+    return stats
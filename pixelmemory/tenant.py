@@ -0,0 +1,70 @@
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .memory import Memory
+
+
+class TenantMemory:
+    """
+    One tenant's view of a partitioned `Memory`. Writes are stamped with the tenant
+    id and every read is filtered to it, so tenants share one table, one set of views
+    and one set of indexes instead of each paying for their own.
+    """
+
+    def __init__(self, memory: "Memory", tenant_id: str):
+        self.memory = memory
+        self.tenant_id = tenant_id
+
+    @property
+    def tenant_key(self) -> str:
+        return self.memory.tenant_key
+
+    def _predicate(self):
+        return getattr(self.memory.table, self.tenant_key) == self.tenant_id
+
+    def _stamp(self, rows: Any) -> Any:
+        if isinstance(rows, dict):
+            return {**rows, self.tenant_key: self.tenant_id}
+        return [{**row, self.tenant_key: self.tenant_id} for row in rows]
+
+    def insert(self, rows: Any = None, **kwargs) -> Any:
+        if rows is None:
+            # Single row passed as keyword arguments.
+            return self.memory._insert((), self._stamp(kwargs), tenant=self.tenant_id)
+        return self.memory._insert((self._stamp(rows),), kwargs, tenant=self.tenant_id)
+
+    def add(self, *rows: Any) -> None:
+        if not rows:
+            raise ValueError("At least one row must be provided.")
+        self.insert([asdict(row) for row in rows])
+
+    def delete(self, where: Any = None) -> Any:
+        predicate = self._predicate()
+        if where is not None:
+            predicate = predicate & where
+        return self.memory._delete((predicate,), {}, tenant=self.tenant_id)
+
+    def count(self) -> int:
+        return self.memory.table.where(self._predicate()).count()
+
+    def search(self, query: Any, k: int = 10, **kwargs) -> List[Dict[str, Any]]:
+        return self.memory.search(query, k=k, tenant=self.tenant_id, **kwargs)
+
+    def search_images(self, query: Any, k: int = 10, **kwargs) -> List[Dict[str, Any]]:
+        return self.memory.search_images(query, k=k, tenant=self.tenant_id, **kwargs)
+
+    def within(
+        self,
+        column: str,
+        t0: float,
+        t1: float,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        return self.memory.within(column, t0, t1, where=where, tenant=self.tenant_id)
+
+    def select(self, *args, **kwargs):
+        return self.memory.table.where(self._predicate()).select(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"TenantMemory({self.memory.table_name!r}, {self.tenant_id!r})"
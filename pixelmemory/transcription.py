@@ -0,0 +1,67 @@
+import dataclasses
+from typing import Any, Dict
+
+import pixeltable as pxt
+
+from .config import LocalInferenceParams, WhisperParams
+
+LOCAL_PREFIX = "local:"
+
+
+def is_local_model(model: str) -> bool:
+    return model.startswith(LOCAL_PREFIX)
+
+
+def get_transcription_function(model: str):
+    if is_local_model(model):
+        try:
+            import faster_whisper
+            from .local import local_transcriptions
+        except ImportError:
+            raise ImportError(
+                "Please install the faster-whisper package. pip install faster-whisper."
+            )
+        return local_transcriptions
+    try:
+        import openai
+    except ImportError:
+        raise ImportError("Please install the openai package. pip install openai.")
+    # Rate-limited whenever an "openai" limiter is configured in the process.
+    from .remote import openai_transcriptions
+
+    return openai_transcriptions
+
+
+def prepare_transcription_args(
+    model: str,
+    transcription_kwargs: WhisperParams,
+    local_params: LocalInferenceParams,
+    audio_col: pxt.Column,
+) -> Dict[str, Any]:
+    whisper_kwargs = {
+        k: v
+        for k, v in dataclasses.asdict(transcription_kwargs).items()
+        if v is not None
+    }
+
+    if is_local_model(model):
+        return {
+            "audio": audio_col,
+            "model": model[len(LOCAL_PREFIX) :],
+            "batch_size": local_params.batch_size,
+            "num_workers": local_params.num_workers,
+            "cpu_threads": local_params.cpu_threads,
+            "device": local_params.device,
+            "compute_type": local_params.compute_type,
+            **whisper_kwargs,
+        }
+
+    if model.startswith("whisper"):
+        # Segment timestamps let sentence chunks be mapped back onto the audio.
+        whisper_kwargs["response_format"] = "verbose_json"
+        whisper_kwargs["timestamp_granularities"] = ["segment"]
+
+    args = {"audio": audio_col, "model": model}
+    if whisper_kwargs:
+        args["model_kwargs"] = whisper_kwargs
+    return args
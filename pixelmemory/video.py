@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pixeltable as pxt
+from pixeltable.func import Batch
+
+from .cache import default_data_dir
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: Optional[int]) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            import multiprocessing
+
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned workers never inherit the parent's database connections or threads.
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_workers = max_workers
+        return _pool
+
+
+def _frame_times(
+    duration: Optional[float], fps: Optional[float], num_frames: Optional[int]
+) -> Optional[List[float]]:
+    """Target timestamps to sample, or None to keep every frame."""
+    if num_frames is not None:
+        if not duration:
+            return None
+        return list(np.linspace(0.0, duration, num_frames, endpoint=False))
+    if fps is not None and duration:
+        return list(np.arange(0.0, duration, 1.0 / fps))
+    return None
+
+
+def decode_one(
+    path: str,
+    out_dir: str,
+    fps: Optional[float],
+    num_frames: Optional[int],
+    sample_rate: int,
+    quality: int,
+) -> Dict[str, Any]:
+    """
+    Demux and decode `path` once, writing a mono wav of its audio track and a jpeg per
+    sampled frame into `out_dir`. Returns the manifest describing both.
+    """
+    import av
+
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+    os.makedirs(out_dir, exist_ok=True)
+
+    frames: List[Dict[str, Any]] = []
+    audio_path = None
+    with av.open(path) as container:
+        video_stream = container.streams.video[0] if container.streams.video else None
+        audio_stream = container.streams.audio[0] if container.streams.audio else None
+        streams = [s for s in (video_stream, audio_stream) if s is not None]
+
+        targets = None
+        if video_stream is not None:
+            video_stream.thread_type = "AUTO"
+            duration = (
+                float(video_stream.duration * video_stream.time_base)
+                if video_stream.duration
+                else (container.duration / 1e6 if container.duration else None)
+            )
+            targets = _frame_times(duration, fps, num_frames)
+        next_target = 0
+
+        wav = None
+        resampler = None
+        if audio_stream is not None:
+            audio_path = os.path.join(out_dir, "audio.wav")
+            wav = wave.open(audio_path, "wb")
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+
+        try:
+            frame_idx = 0
+            for packet in container.demux(*streams):
+                for frame in packet.decode():
+                    if packet.stream is audio_stream:
+                        for out in resampler.resample(frame):
+                            wav.writeframes(out.to_ndarray().tobytes())
+                        continue
+                    t = float(frame.time) if frame.time is not None else 0.0
+                    keep = targets is None
+                    while targets is not None and next_target < len(targets):
+                        if t + 1e-6 < targets[next_target]:
+                            break
+                        keep = True
+                        next_target += 1
+                    if keep:
+                        frame_path = os.path.join(out_dir, f"frame_{len(frames)}.jpg")
+                        frame.to_image().save(frame_path, quality=quality)
+                        frames.append(
+                            {
+                                "frame_idx": len(frames),
+                                "pos_msec": t * 1000.0,
+                                "pos_frame": frame_idx,
+                                "path": frame_path,
+                            }
+                        )
+                    frame_idx += 1
+            if resampler is not None:
+                for out in resampler.resample(None):
+                    wav.writeframes(out.to_ndarray().tobytes())
+        finally:
+            if wav is not None:
+                wav.close()
+
+    manifest = {"audio": audio_path, "frames": frames}
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+@pxt.udf(batch_size=32)
+def decode_video(
+    video: Batch[pxt.Video],
+    row_id: Batch[str],
+    *,
+    root: str,
+    fps: Optional[float] = None,
+    num_frames: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    sample_rate: int = 16000,
+    quality: int = 90,
+) -> Batch[pxt.Json]:
+    """
+    Single-pass audio and frame extraction, parallelized across the videos in a batch.
+
+    Each row's files go to `<root>/<row_id>`, so they can be removed with the row
+    (see `remove_decoded`); a retried decode of the same row reuses them.
+    """
+    futures = []
+    pool = _get_pool(max_workers)
+    for path, rid in zip(video, row_id):
+        if path is None:
+            futures.append(None)
+            continue
+        futures.append(
+            pool.submit(
+                decode_one,
+                path,
+                os.path.join(root, rid),
+                fps,
+                num_frames,
+                sample_rate,
+                quality,
+            )
+        )
+    return [f.result() if f is not None else None for f in futures]
+
+
+def decoded_root(namespace: str, table_name: str) -> str:
+    # Stored rows point at these files, so they live with the data, not the cache.
+    return os.path.join(
+        default_data_dir(), "decoded_video", f"{namespace}.{table_name}"
+    )
+
+
+def remove_decoded(root: str, row_ids: Iterable[str]) -> None:
+    """Delete the decoded audio and frames of rows that no longer exist."""
+    for rid in row_ids:
+        shutil.rmtree(os.path.join(root, rid), ignore_errors=True)
+
+
+@pxt.udf
+def decoded_audio(decoded: pxt.Json) -> Optional[pxt.Audio]:
+    return decoded.get("audio") if decoded else None
@@ -1,37 +1,74 @@
 import pixeltable as pxt
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from .config import LocalInferenceParams
+
+
+DEFAULT_VISION_MODELS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-haiku-20240307",
+    "local": "Salesforce/blip-image-captioning-base",
+}
+_CHAT_MODEL_PREFIXES = ("gpt-", "o1", "o3", "o4", "claude-", "gemini-")
+
+
+def resolve_vision_model(provider: str, model: Optional[str]) -> str:
+    if model is None:
+        if provider not in DEFAULT_VISION_MODELS:
+            raise ValueError(f"Unsupported vision provider: {provider}")
+        return DEFAULT_VISION_MODELS[provider]
+    if provider == "local" and model.startswith(_CHAT_MODEL_PREFIXES):
+        raise ValueError(
+            f"'{model}' is a hosted chat model; the local provider needs a Hugging Face "
+            f"image-to-text model such as '{DEFAULT_VISION_MODELS['local']}'."
+        )
+    return model
 
 
 def get_vision_function(provider: str):
+    # Remote calls go through `remote`, which applies the provider's rate limit
+    # whenever one is configured in the process, whichever context set it.
     if provider == "openai":
         try:
             import openai
-            from pixeltable.functions.openai import vision
         except ImportError:
             raise ImportError("Please install the openai package. pip install openai.")
-        return vision
+        from .remote import openai_vision
+
+        return openai_vision
     elif provider == "anthropic":
         try:
             import anthropic
-            from pixeltable.functions.anthropic import messages
         except ImportError:
             raise ImportError(
                 "Please install the anthropic package. pip install anthropic."
             )
-        return messages
+        from .remote import anthropic_vision
+
+        return anthropic_vision
+    elif provider == "local":
+        try:
+            import transformers
+            from .local import local_caption
+        except ImportError:
+            raise ImportError(
+                "Please install the transformers package. pip install transformers torch."
+            )
+        return local_caption
     else:
         raise ValueError(f"Unsupported vision provider: {provider}")
 
 
 def prepare_vision_args(
     provider: str,
-    model: str,
+    model: Optional[str],
     prompt: str,
     llm_kwargs: Dict[str, Any],
     col_name: str,
     target_obj: pxt.Table,
+    local_params: Optional[LocalInferenceParams] = None,
 ) -> dict:
     image_col = getattr(target_obj, col_name)
+    model = resolve_vision_model(provider, model)
 
     if provider == "openai":
         args = {"prompt": prompt, "image": image_col, "model": model}
@@ -40,24 +77,23 @@ def prepare_vision_args(
         return args
 
     elif provider == "anthropic":
+        args = {"prompt": prompt, "image": image_col, "model": model}
+        model_kwargs = dict(llm_kwargs)
+        if "max_tokens" in model_kwargs:
+            args["max_tokens"] = model_kwargs.pop("max_tokens")
+        if model_kwargs:
+            args["model_kwargs"] = model_kwargs
+        return args
+
+    elif provider == "local":
+        # Captioning models are not instruction-following, so the prompt is unused.
+        local_params = local_params or LocalInferenceParams()
         args = {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/jpeg",
-                                "data": image_col,
-                            },
-                        },
-                    ],
-                }
-            ],
+            "image": image_col,
             "model": model,
+            "batch_size": local_params.batch_size,
+            "num_threads": local_params.cpu_threads,
+            "device": local_params.device,
         }
         if llm_kwargs:
             args.update(llm_kwargs)
@@ -68,22 +104,16 @@ def prepare_vision_args(
 
 
 def create_vision_computed_column(
-    provider: str, col_name: str, vision_func, vision_args: dict, target_obj: pxt.Table
+    provider: str,
+    col_name: str,
+    vision_func,
+    vision_args: dict,
+    target_obj: pxt.Table,
 ) -> str:
     description_col_name = f"{col_name}_description"
-
-    if provider == "openai":
-        target_obj.add_computed_column(
-            **{description_col_name: vision_func(**vision_args)}, if_exists="ignore"
-        )
-    elif provider == "anthropic":
-        response_col = f"{col_name}_response"
-        target_obj.add_computed_column(
-            **{response_col: vision_func(**vision_args)}, if_exists="ignore"
-        )
-        target_obj.add_computed_column(
-            **{description_col_name: getattr(target_obj, response_col).content[0].text},
-            if_exists="ignore",
-        )
-
+    if provider not in ("openai", "anthropic", "local"):
+        raise ValueError(f"Unsupported vision provider: {provider}")
+    target_obj.add_computed_column(
+        **{description_col_name: vision_func(**vision_args)}, if_exists="ignore"
+    )
     return description_col_name
@@ -0,0 +1,69 @@
+"""
+Benchmark in-process IVF search against exact search.
+
+Reports recall@k and queries/sec for a sweep of `nprobe` values on synthetic
+clustered embeddings, which is the data needed to pick `IndexParams` for a memory.
+
+    python scripts/bench_ann.py --n 200000 --dim 384 --k 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from pixelmemory.ann import ExactIndex, IVFIndex, recall_at_k
+from pixelmemory.embeddings import normalize
+
+
+def make_data(n: int, dim: int, n_queries: int, n_topics: int, seed: int):
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim))
+    vectors = topics[rng.integers(n_topics, size=n)] + 0.5 * rng.normal(size=(n, dim))
+    queries = topics[rng.integers(n_topics, size=n_queries)] + 0.5 * rng.normal(
+        size=(n_queries, dim)
+    )
+    return normalize(vectors), normalize(queries)
+
+
+def timed_search(index, queries: np.ndarray, k: int, **kwargs):
+    start = time.perf_counter()
+    ids, _ = index.search(queries, k, **kwargs)
+    elapsed = time.perf_counter() - start
+    return ids, len(queries) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--topics", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors, queries = make_data(args.n, args.dim, args.queries, args.topics, args.seed)
+
+    exact = ExactIndex(vectors)
+    exact_ids, exact_qps = timed_search(exact, queries, args.k)
+
+    start = time.perf_counter()
+    ivf = IVFIndex(vectors, nlist=args.nlist)
+    build_sec = time.perf_counter() - start
+
+    print(f"n={args.n} dim={args.dim} k={args.k} nlist={ivf.nlist}")
+    print(f"IVF build: {build_sec:.2f}s")
+    print(f"{'index':<16}{'recall@k':>10}{'qps':>12}")
+    print(f"{'exact':<16}{1.0:>10.3f}{exact_qps:>12.1f}")
+    nprobe = 1
+    while nprobe <= ivf.nlist:
+        ids, qps = timed_search(ivf, queries, args.k, nprobe=nprobe)
+        recall = recall_at_k(ids, exact_ids)
+        print(f"{f'ivf nprobe={nprobe}':<16}{recall:>10.3f}{qps:>12.1f}")
+        nprobe *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark CLIP image embedding throughput on CPU.
+
+Reports frames/sec for each backend and batch size, which is the data needed to
+pick `ClipParams` for video frame indexing. Frames come from `--video` (sampled
+at `--fps`) or are synthetic.
+
+    python scripts/bench_clip.py --video talk.mp4 --threads 8 --batch-sizes 8 32 64
+"""
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+import PIL.Image
+
+from pixelmemory.local import clip_embed_images
+
+
+def load_frames(video: str, fps: float, limit: int) -> List[PIL.Image.Image]:
+    import av
+
+    frames: List[PIL.Image.Image] = []
+    next_t = 0.0
+    with av.open(video) as container:
+        for frame in container.decode(video=0):
+            if frame.time is not None and frame.time + 1e-6 < next_t:
+                continue
+            frames.append(frame.to_image())
+            next_t += 1.0 / fps
+            if len(frames) >= limit:
+                break
+    return frames
+
+
+def synthetic_frames(n: int, size: int, seed: int) -> List[PIL.Image.Image]:
+    rng = np.random.default_rng(seed)
+    return [
+        PIL.Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+        for _ in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="openai/clip-vit-base-patch32")
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--fps", type=float, default=1.0)
+    parser.add_argument("--frames", type=int, default=256)
+    parser.add_argument("--size", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch_int8"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.video:
+        frames = load_frames(args.video, args.fps, args.frames)
+    else:
+        frames = synthetic_frames(args.frames, args.size, args.seed)
+
+    print(
+        f"model={args.model} frames={len(frames)} threads={args.threads or 'default'}"
+    )
+    print(f"{'backend':<14}{'batch':>8}{'frames/s':>12}")
+    for backend in args.backends:
+        # Warm up: load (and quantize) the model outside the timed region.
+        clip_embed_images(frames[:1], args.model, 1, args.threads, backend)
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            clip_embed_images(frames, args.model, batch_size, args.threads, backend)
+            fps = len(frames) / (time.perf_counter() - start)
+            print(f"{backend:<14}{batch_size:>8}{fps:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
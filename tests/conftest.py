@@ -0,0 +1,69 @@
+import hashlib
+import re
+
+import numpy as np
+import pixeltable as pxt
+import pytest
+
+NAMESPACE = "pixelmemory_tests"
+
+
+@pxt.udf
+def word_embed(text: str) -> pxt.Array[(16,), pxt.Float]:
+    """Bag of hashed words; enough to index text without downloading a model."""
+    vector = np.zeros(16, dtype=np.float32)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 16] += 1
+    return vector
+
+
+@pytest.fixture
+def make_memory(request):
+    """Build a Memory in a throwaway table named after the test."""
+    from pixelmemory import Memory
+
+    table_name = re.sub(r"\W", "_", request.node.name)
+    # Tables created next to the memory's own, e.g. the consolidation archive.
+    pxt.create_dir(NAMESPACE, if_exists="ignore")
+    pxt.drop_table(f"{NAMESPACE}.{table_name}_archive", if_not_exists="ignore")
+
+    def make(context, **kwargs):
+        kwargs.setdefault("if_exists", "replace_force")
+        return Memory(context, namespace=NAMESPACE, table_name=table_name, **kwargs)
+
+    return make
+
+
+class _HashedWords:
+    """Stands in for a sentence-transformers model, with `word_embed`'s vectors."""
+
+    def get_sentence_embedding_dimension(self):
+        return 16
+
+    def encode(self, texts, **kwargs):
+        return np.stack([word_embed.py_fn(text) for text in texts])
+
+
+@pytest.fixture
+def hashed_model(monkeypatch, tmp_path):
+    """
+    Id of a model that features needing a sentence-transformers id (dedup, text
+    queries on exact/IVF indexes, snapshots) can use without a download.
+    """
+    from pixelmemory import cache, embeddings
+    from pixelmemory.functions import cached_sentence_embedding
+    from pixelmemory.memory import Memory
+
+    model_id = "hashed-words"
+    monkeypatch.setitem(embeddings._models, model_id, _HashedWords())
+    monkeypatch.setenv("PIXELMEMORY_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "_caches", {})
+    get_embed_model = Memory._get_embed_model
+
+    def embed_model(self, override_model=None):
+        if override_model == model_id:
+            return cached_sentence_embedding.using(model_id=model_id)
+        return get_embed_model(self, override_model)
+
+    monkeypatch.setattr(Memory, "_get_embed_model", embed_model)
+    return model_id
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+
+from pixelmemory.ann import (
+    ExactIndex,
+    IVFIndex,
+    assign,
+    build_index,
+    kmeans,
+    mmr,
+    needs_training,
+    recall_at_k,
+    top_k,
+)
+from pixelmemory.config import IndexParams
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(500, 16)).astype(np.float32)
+
+
+def brute_force(queries, vectors, k, metric):
+    if metric == "cosine":
+        queries = queries / np.linalg.norm(queries, axis=-1, keepdims=True)
+        vectors = vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+        scores = queries @ vectors.T
+    else:
+        scores = -((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(-1)
+    return np.argsort(-scores, axis=-1, kind="stable")[:, :k]
+
+
+def test_top_k_orders_best_first():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7]])
+    assert top_k(scores, 3).tolist() == [[1, 3, 2]]
+    assert top_k(scores, 10).shape == (1, 4)
+    assert top_k(scores, 0).shape == (1, 0)
+
+
+@pytest.mark.parametrize("metric", ["cosine", "l2"])
+def test_exact_index_matches_brute_force(vectors, metric):
+    queries = vectors[:5] + 0.01
+    ids, scores = ExactIndex(vectors, metric=metric).search(queries, 10)
+    assert ids.tolist() == brute_force(queries, vectors, 10, metric).tolist()
+    assert np.all(np.diff(scores, axis=-1) <= 0)
+
+
+def test_exact_index_subset(vectors):
+    subset = np.arange(100, 200)
+    ids, _ = ExactIndex(vectors).search(vectors[:3], 5, subset=subset)
+    assert np.isin(ids, subset).all()
+    assert ids[0, 0] == brute_force(vectors[:1], vectors[subset], 1, "cosine")[0, 0] + 100
+
+    ids, scores = ExactIndex(vectors).search(vectors[:3], 5, subset=np.zeros(0, int))
+    assert ids.shape == scores.shape == (3, 0)
+
+
+def test_exact_index_empty():
+    ids, scores = ExactIndex(np.zeros((0, 4))).search(np.ones(4), 3)
+    assert ids.shape == scores.shape == (1, 0)
+
+
+def test_kmeans_and_assign(vectors):
+    centroids, assignments = kmeans(vectors, 8)
+    assert centroids.shape == (8, 16)
+    assert assignments.min() >= 0 and assignments.max() < 8
+    assert assign(centroids, centroids).tolist() == list(range(8))
+    nearest = assign(vectors, centroids)
+    assert assign(vectors, centroids, block_size=7).tolist() == nearest.tolist()
+
+
+@pytest.mark.parametrize("metric", ["cosine", "l2"])
+def test_ivf_full_probe_is_exact(vectors, metric):
+    index = IVFIndex(vectors, metric=metric, nlist=10)
+    queries = vectors[:20]
+    ivf_ids, _ = index.search(queries, 10, nprobe=10)
+    exact_ids, _ = ExactIndex(vectors, metric=metric).search(queries, 10)
+    assert recall_at_k(ivf_ids, exact_ids) == 1.0
+
+
+def test_ivf_partial_probe_recall(vectors):
+    index = IVFIndex(vectors, nlist=20, nprobe=5)
+    exact_ids, _ = ExactIndex(vectors).search(vectors[:50], 10)
+    ivf_ids, _ = index.search(vectors[:50], 10)
+    # Each query is itself in the index, so its own bucket is always probed.
+    assert (ivf_ids[:, 0] == np.arange(50)).all()
+    assert recall_at_k(ivf_ids, exact_ids) > 0.5
+
+
+def test_ivf_reuses_centroids(vectors):
+    trained = IVFIndex(vectors[:300], nlist=10)
+    grown = IVFIndex(vectors, nlist=10, centroids=trained.centroids)
+    assert grown.centroids is trained.centroids
+    assert sum(len(ids) for ids in grown.lists) == len(vectors)
+    for c, ids in enumerate(trained.lists):
+        assert np.isin(ids, grown.lists[c]).all()
+
+    ids, _ = grown.search(vectors[400:410], 1, nprobe=10)
+    assert ids[:, 0].tolist() == list(range(400, 410))
+
+
+def test_ivf_from_lists_matches_trained(vectors):
+    trained = IVFIndex(vectors, nlist=10, nprobe=3)
+    restored = IVFIndex.from_lists(
+        trained.vectors, trained.centroids, trained.lists, nprobe=3
+    )
+    assert restored.vectors is trained.vectors
+    expected, _ = trained.search(vectors[:20], 5)
+    assert restored.search(vectors[:20], 5)[0].tolist() == expected.tolist()
+
+
+def test_ivf_empty():
+    index = IVFIndex(np.zeros((0, 4), dtype=np.float32))
+    ids, scores = index.search(np.ones(4), 3)
+    assert ids.shape == scores.shape == (1, 0)
+
+
+def test_build_index(vectors):
+    assert type(build_index(vectors, IndexParams(kind="exact"))) is ExactIndex
+    index = build_index(vectors, IndexParams(kind="ivf", nlist=4, nprobe=2))
+    assert isinstance(index, IVFIndex)
+    assert (index.nlist, index.nprobe) == (4, 2)
+
+
+def test_needs_training():
+    assert needs_training(0, 10, 2.0)
+    assert not needs_training(100, 150, 2.0)
+    assert needs_training(100, 201, 2.0)
+    assert needs_training(100, 49, 2.0)
+
+
+def test_mmr_lambda_one_is_relevance_order():
+    candidates = np.eye(4, dtype=np.float32)
+    relevance = np.array([0.2, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert mmr(candidates, relevance, 3, lambda_mult=1.0).tolist() == [1, 3, 2]
+
+
+def test_mmr_skips_near_duplicates():
+    candidates = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]], dtype=np.float32)
+    relevance = np.array([1.0, 0.95, 0.6], dtype=np.float32)
+    assert mmr(candidates, relevance, 2, lambda_mult=0.5).tolist() == [0, 2]
+
+
+def test_mmr_groups():
+    candidates = np.eye(4, dtype=np.float32)
+    relevance = np.array([1.0, 0.9, 0.8, 0.7], dtype=np.float32)
+    groups = np.array([0, 0, 1, 1])
+    assert mmr(candidates, relevance, 4, lambda_mult=1.0, groups=groups).tolist() == [0, 2]
+
+
+def test_mmr_empty():
+    assert mmr(np.zeros((0, 3)), np.zeros(0), 5).shape == (0,)
@@ -0,0 +1,84 @@
+import sqlite3
+
+import numpy as np
+
+from pixelmemory.cache import ChunkCache, EmbeddingCache
+
+
+def vectors(keys):
+    return {key: np.full(4, i, dtype=np.float32) for i, key in enumerate(keys)}
+
+
+def test_embedding_cache_round_trip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+    cache.put_many("m", vectors(["a", "b"]))
+    found = cache.get_many("m", ["a", "b", "c"])
+    assert sorted(found) == ["a", "b"]
+    assert found["b"].tolist() == [1.0] * 4
+    assert cache.get_many("other", ["a"]) == {}
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_entries=10)
+    cache.put_many("m", vectors([f"k{i}" for i in range(10)]))
+    # Reading k0 makes it recent, so k1 is the oldest entry now.
+    assert "k0" in cache.get_many("m", ["k0"])
+    cache.put_many("m", vectors(["new"]))
+    found = cache.get_many("m", [f"k{i}" for i in range(10)] + ["new"])
+    assert len(found) == 9
+    assert "k0" in found and "new" in found and "k1" not in found
+
+
+def test_embedding_cache_upgrades_old_files(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE embeddings (model TEXT NOT NULL, hash TEXT NOT NULL, "
+        "vector BLOB NOT NULL, PRIMARY KEY (model, hash))"
+    )
+    conn.execute(
+        "INSERT INTO embeddings VALUES ('m', 'a', ?)",
+        (np.ones(4, dtype=np.float32).tobytes(),),
+    )
+    conn.commit()
+    conn.close()
+
+    cache = EmbeddingCache(path)
+    assert cache.get_many("m", ["a"])["a"].tolist() == [1.0] * 4
+    cache.put_many("m", vectors(["b"]))
+
+
+def test_chunk_cache_evicts_least_recently_used(tmp_path):
+    cache = ChunkCache(str(tmp_path / "chunks.db"), max_entries=10)
+    for i in range(10):
+        cache.put(f"k{i}", [{"text": f"chunk {i}"}])
+    # Reading k0 makes it recent, so k1 is the oldest entry now.
+    assert cache.get("k0") == [{"text": "chunk 0"}]
+    cache.put("new", [{"text": "new"}])
+    kept = [key for key in [f"k{i}" for i in range(10)] + ["new"] if cache.get(key)]
+    assert len(kept) == 9
+    assert "k0" in kept and "new" in kept and "k1" not in kept
+
+
+def test_chunk_cache_upgrades_old_files(tmp_path):
+    path = str(tmp_path / "chunks.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE chunks (key TEXT PRIMARY KEY, chunks TEXT NOT NULL)")
+    conn.execute("INSERT INTO chunks VALUES ('a', '[{\"text\": \"old\"}]')")
+    conn.commit()
+    conn.close()
+
+    cache = ChunkCache(path)
+    assert cache.get("a") == [{"text": "old"}]
+    cache.put("b", [])
+    assert cache.get("b") == []
+
+
+def test_decoded_video_is_kept_out_of_the_cache(tmp_path, monkeypatch):
+    from pixelmemory.video import decoded_root
+
+    monkeypatch.setenv("PIXELMEMORY_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("PIXELMEMORY_DATA_DIR", str(tmp_path / "data"))
+    assert decoded_root("ns", "memory") == str(
+        tmp_path / "data" / "decoded_video" / "ns.memory"
+    )
@@ -0,0 +1,58 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from pixelmemory import iterators
+from pixelmemory.iterators import SentenceSplitter, TranscriptSentenceSplitter
+from pixelmemory.stats import percentile
+
+
+@pytest.mark.parametrize("q", [0, 50, 95, 100])
+def test_percentile_matches_numpy(q):
+    values = np.random.default_rng(0).integers(0, 20, size=37)
+    histogram = sorted(Counter(values.tolist()).items())
+    assert percentile(histogram, q) == pytest.approx(np.percentile(values, q))
+
+
+def test_repeated_sentences_get_their_own_offsets(monkeypatch):
+    spacy = pytest.importorskip("spacy")
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    monkeypatch.setattr(iterators, "_spacy_nlp", lambda: nlp)
+
+    text = "See you. Then we left. See you. Bye."
+    chunks = list(SentenceSplitter(text))
+    assert [chunk["text"] for chunk in chunks] == [
+        "See you.",
+        "Then we left.",
+        "See you.",
+        "Bye.",
+    ]
+    for chunk in chunks:
+        offset = chunk["char_offset"]
+        assert text[offset : offset + len(chunk["text"])] == chunk["text"]
+    assert chunks[2]["char_offset"] == 23
+
+
+def test_transcript_sentences_use_spacy_spans(monkeypatch):
+    spacy = pytest.importorskip("spacy")
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    monkeypatch.setattr(iterators, "_spacy_nlp", lambda: nlp)
+
+    transcription = {
+        "segments": [
+            {"start": 0.0, "end": 4.0, "text": "Dr. Smith paid 3.50 dollars."},
+            {"start": 4.0, "end": 6.0, "text": "Then he left."},
+        ]
+    }
+    sentences = list(TranscriptSentenceSplitter(transcription, start_sec=10.0))
+    assert [s["text"] for s in sentences] == [
+        "Dr. Smith paid 3.50 dollars.",
+        "Then he left.",
+    ]
+    assert sentences[0]["sentence_start_sec"] == pytest.approx(10.0)
+    assert sentences[0]["sentence_end_sec"] == pytest.approx(14.0)
+    assert sentences[1]["sentence_start_sec"] == pytest.approx(14.0)
+    assert sentences[1]["sentence_end_sec"] == pytest.approx(16.0)
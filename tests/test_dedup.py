@@ -0,0 +1,61 @@
+import pytest
+
+from pixelmemory.config import DedupParams
+from pixelmemory.context import Text
+from pixelmemory.dedup import duplicate_of_column
+
+
+@pytest.fixture
+def memory(make_memory, hashed_model):
+    def make(action):
+        return make_memory(
+            [
+                Text(
+                    id="note",
+                    embed_model=hashed_model,
+                    dedup=DedupParams(threshold=0.99, action=action),
+                ),
+                Text(id="source", embed=False),
+            ]
+        )
+
+    return make
+
+
+def rows(memory, *columns):
+    table = memory.table
+    selected = table.select(*(getattr(table, col) for col in columns)).collect()
+    return sorted(tuple(row[col] for col in columns) for row in selected)
+
+
+def test_skip_drops_duplicates_in_and_across_batches(memory):
+    memory = memory("skip")
+    memory.insert(
+        [
+            {"note": "red apples", "source": "a"},
+            {"note": "Red apples", "source": "b"},
+            {"note": "blue boats", "source": "c"},
+        ]
+    )
+    memory.insert([{"note": "red apples", "source": "d"}])
+    assert rows(memory, "note", "source") == [
+        ("blue boats", "c"),
+        ("red apples", "a"),
+    ]
+
+
+def test_merge_updates_the_existing_row(memory):
+    memory = memory("merge")
+    memory.insert([{"note": "red apples", "source": "a"}])
+    memory.insert([{"note": "red apples", "source": "b"}])
+    assert rows(memory, "note", "source") == [("red apples", "b")]
+
+
+def test_link_points_at_the_original(memory):
+    memory = memory("link")
+    memory.insert([{"note": "red apples", "source": "a"}])
+    memory.insert([{"note": "red apples", "source": "b"}])
+    assert rows(memory, "source", duplicate_of_column("note")) == [
+        ("a", None),
+        ("b", "red apples"),
+    ]
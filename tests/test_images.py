@@ -0,0 +1,44 @@
+import base64
+import io
+
+import PIL.Image
+import pixeltable as pxt
+import pytest
+
+from pixelmemory.functions import encode_image, preprocess_image
+
+from .conftest import NAMESPACE
+
+
+@pytest.fixture
+def images(tmp_path):
+    pxt.create_dir(NAMESPACE, if_exists="ignore")
+    table = pxt.create_table(
+        f"{NAMESPACE}.preprocessed_images", {"img": pxt.Image}, if_exists="replace_force"
+    )
+    path = tmp_path / "source.png"
+    PIL.Image.effect_noise((64, 32), 60).convert("RGB").save(path)
+    return table, str(path)
+
+
+@pytest.mark.parametrize("fmt", ["PNG", "JPEG", "WEBP"])
+def test_stored_preprocessed_image_keeps_format_and_quality(images, fmt):
+    table, source = images
+    table.add_computed_column(
+        small=preprocess_image(table.img, max_edge=16, format=fmt, quality=30)
+    )
+    table.insert([{"img": source}])
+    row = table.select(table.small, path=table.small.localpath).collect()[0]
+
+    with open(row["path"], "rb") as f:
+        stored = f.read()
+    expected = io.BytesIO()
+    with PIL.Image.open(source) as image:
+        image.thumbnail((16, 16), PIL.Image.Resampling.LANCZOS)
+        image.save(expected, format=fmt, quality=30)
+    assert stored == expected.getvalue()
+    assert row["small"].format == fmt and row["small"].size == (16, 8)
+    # Providers receive the stored bytes, not a second encoding.
+    media_type, data = encode_image(row["small"])
+    assert media_type == f"image/{fmt.lower()}"
+    assert base64.b64decode(data) == stored
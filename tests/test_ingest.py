@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+from pixelmemory.config import IngestParams
+from pixelmemory.context import Text
+from pixelmemory.ingest import DONE, FAILED, IngestStore
+
+from .conftest import word_embed
+
+
+@pytest.fixture
+def failing(make_memory, tmp_path, monkeypatch):
+    """A memory whose inserts fail for rows in `bad`, with ingest queued in tmp_path."""
+    bad = {"bad"}
+    memory = make_memory(
+        [Text(id="note", embed_model=word_embed)],
+        ingest=IngestParams(
+            path=str(tmp_path / "ingest.db"), max_retries=0, retry_backoff_sec=0.01
+        ),
+    )
+    insert = memory.insert
+
+    def flaky_insert(rows, *args, **kwargs):
+        if any(row["note"] in bad for row in rows):
+            raise RuntimeError("cannot index")
+        return insert(rows, *args, **kwargs)
+
+    monkeypatch.setattr(memory, "insert", flaky_insert)
+    yield memory, bad
+    memory.close()
+
+
+def notes(memory):
+    return sorted(row["note"] for row in memory.table.select(memory.table.note).collect())
+
+
+def test_failed_row_is_reported_and_retried_on_its_own(failing):
+    memory, bad = failing
+    job_id = memory.add(*(memory.Entry(note=n) for n in ["red", "bad", "blue"]))
+    assert memory.wait_until_indexed([job_id], timeout=30)
+
+    status = memory.ingest_status(job_id)
+    assert status.status == FAILED
+    assert [row.status for row in status.rows] == [DONE, FAILED, DONE]
+    assert "RuntimeError: cannot index" in status.rows[1].error
+    assert status.error.startswith("1 of 3 rows failed")
+    assert notes(memory) == ["blue", "red"]
+
+    bad.clear()
+    assert memory.retry_ingest(job_id) == 1
+    assert memory.wait_until_indexed([job_id], timeout=30)
+    status = memory.ingest_status(job_id)
+    assert status.status == DONE
+    assert [row.status for row in status.rows] == [DONE] * 3
+    # Rows indexed on the first attempt are not inserted again.
+    assert notes(memory) == ["bad", "blue", "red"]
+
+
+def test_close_stops_the_workers(make_memory, tmp_path):
+    with make_memory(
+        [Text(id="note", embed_model=word_embed)],
+        ingest=IngestParams(path=str(tmp_path / "ingest.db")),
+    ) as memory:
+        job_id = memory.add(memory.Entry(note="red"))
+        assert memory.wait_until_indexed([job_id], timeout=30)
+    assert not any(thread.is_alive() for thread in memory.ingest_queue._threads)
+
+
+def test_lease_is_reclaimed_only_after_it_expires(tmp_path):
+    store = IngestStore(str(tmp_path / "ingest.db"))
+    job_id = store.append([{"note": "red"}])
+    assert store.claim("a", lease_sec=0.2)[0] == job_id
+    assert store.claim("b", lease_sec=0.2) is None
+    time.sleep(0.3)
+    # Worker "a" died without renewing; "b" takes the job over.
+    assert store.claim("b", lease_sec=0.2) == (job_id, [{"note": "red"}], 0)
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    store = IngestStore(str(tmp_path / "ingest.db"))
+    job_id = store.append([{"note": "red"}])
+    store.claim("a", lease_sec=0.5)
+    for _ in range(3):
+        time.sleep(0.2)
+        store.heartbeat([job_id], "a", lease_sec=0.5)
+        # Another owner's heartbeat does not extend a lease it does not hold.
+        store.heartbeat([job_id], "b", lease_sec=60)
+    assert store.claim("b", lease_sec=0.5) is None
+    time.sleep(0.6)
+    assert store.claim("b", lease_sec=0.5)[0] == job_id
+
+
+def test_failed_job_is_retried_with_backoff(make_memory, tmp_path, monkeypatch):
+    memory = make_memory(
+        [Text(id="note", embed_model=word_embed)],
+        ingest=IngestParams(
+            path=str(tmp_path / "ingest.db"), max_retries=2, retry_backoff_sec=0.2
+        ),
+    )
+    insert, calls = memory.insert, []
+
+    def flaky_insert(rows, *args, **kwargs):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RuntimeError("temporarily unavailable")
+        return insert(rows, *args, **kwargs)
+
+    monkeypatch.setattr(memory, "insert", flaky_insert)
+    with memory:
+        job_id = memory.add(memory.Entry(note="red"))
+        assert memory.wait_until_indexed([job_id], timeout=30)
+    status = memory.ingest_status(job_id)
+    assert (status.status, status.attempts) == (DONE, 1)
+    assert calls[1] - calls[0] >= 0.2
+    assert notes(memory) == ["red"]
+
+
+def test_retries_run_out(make_memory, tmp_path, monkeypatch):
+    memory = make_memory(
+        [Text(id="note", embed_model=word_embed)],
+        ingest=IngestParams(
+            path=str(tmp_path / "ingest.db"), max_retries=2, retry_backoff_sec=0.01
+        ),
+    )
+
+    def broken_insert(rows, *args, **kwargs):
+        raise RuntimeError("cannot index")
+
+    monkeypatch.setattr(memory, "insert", broken_insert)
+    with memory:
+        job_id = memory.add(memory.Entry(note="red"))
+        assert memory.wait_until_indexed([job_id], timeout=30)
+    status = memory.ingest_status(job_id)
+    assert (status.status, status.attempts) == (FAILED, 3)
+    assert status.rows[0].status == FAILED
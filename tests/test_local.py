@@ -0,0 +1,67 @@
+import sys
+import types
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from pixelmemory import local
+
+
+@pytest.fixture
+def thread_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(torch, "set_num_threads", calls.append)
+    monkeypatch.setattr(local, "_models", {})
+    monkeypatch.setattr(local, "_torch_threads", None)
+    return calls
+
+
+def test_caption_threads_are_set_once_per_process(thread_calls, monkeypatch):
+    fake = types.ModuleType("transformers")
+    fake.pipeline = lambda *args, **kwargs: object()
+    monkeypatch.setitem(sys.modules, "transformers", fake)
+    for _ in range(3):
+        local._caption_pipeline("captioner", "cpu", 2)
+    local._caption_pipeline("other-captioner", "cpu", 4)
+    assert thread_calls == [2]
+
+
+class _FakeClip:
+    @classmethod
+    def from_pretrained(cls, model_id):
+        return cls()
+
+    def eval(self):
+        return self
+
+    def get_image_features(self, pixel_values):
+        return torch.ones(len(pixel_values), 4)
+
+    def get_text_features(self, input_ids):
+        return torch.ones(len(input_ids), 4)
+
+
+class _FakeProcessor:
+    @classmethod
+    def from_pretrained(cls, model_id):
+        return cls()
+
+    def __call__(self, images=None, text=None, **kwargs):
+        if images is not None:
+            return {"pixel_values": torch.zeros(len(images), 1)}
+        return {"input_ids": torch.zeros(len(text), 1)}
+
+
+def test_clip_threads_are_set_at_model_load(thread_calls, monkeypatch):
+    import PIL.Image
+
+    fake = types.ModuleType("transformers")
+    fake.CLIPModel, fake.CLIPProcessor = _FakeClip, _FakeProcessor
+    monkeypatch.setitem(sys.modules, "transformers", fake)
+    images = [PIL.Image.new("RGB", (4, 4))] * 5
+    for i in range(3):
+        assert len(local.clip_embed_images(images, "clip", 2, num_threads=3)) == 5
+        assert len(local.clip_embed_texts([f"query {i}"], "clip", num_threads=3)) == 1
+    assert thread_calls == [3]
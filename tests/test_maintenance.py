@@ -0,0 +1,70 @@
+import pixeltable as pxt
+
+from pixelmemory.config import ConsolidationParams, RetentionPolicy
+from pixelmemory.context import Text
+
+from .conftest import NAMESPACE
+
+
+def notes(make_memory, **kwargs):
+    return make_memory(
+        [Text(id="note", embed=False), Text(id="user", embed=False)],
+        created_at_column="created_at",
+        **kwargs,
+    )
+
+
+def test_max_rows_per_key_keeps_rows_with_tied_timestamps(make_memory):
+    memory = notes(make_memory)
+    # One insert stamps every row with the same time.
+    memory.insert([{"note": f"n{i}", "user": "a"} for i in range(10)])
+    memory.insert([{"note": f"m{i}", "user": "b"} for i in range(3)])
+
+    report = memory.apply_retention(
+        RetentionPolicy(max_rows_per_key=5, key_column="user", batch_size=2)
+    )
+    assert report.rows_deleted == 5
+    assert report.batches == 3
+    table = memory.table
+    assert table.where(table.user == "a").count() == 5
+    assert table.where(table.user == "b").count() == 3
+
+
+def test_ttl_deletes_only_expired_rows(make_memory):
+    memory = notes(make_memory)
+    memory.insert([{"note": f"n{i}", "user": "a"} for i in range(4)])
+    assert memory.apply_retention(RetentionPolicy(ttl_sec=3600)).rows_deleted == 0
+    assert memory.apply_retention(RetentionPolicy(ttl_sec=0)).rows_deleted == 4
+    assert memory.table.count() == 0
+
+
+def test_consolidation_keeps_max_hot_rows_with_tied_timestamps(make_memory):
+    memory = notes(make_memory)
+    memory.insert([{"note": f"Note {i}. More.", "user": "a"} for i in range(10)])
+
+    report = memory.consolidate(
+        ConsolidationParams(
+            text_column="note", min_age_sec=3600, max_hot_rows=4, group_by="user"
+        )
+    )
+    assert (report.summary_rows, report.archived_rows) == (1, 6)
+    table = memory.table
+    assert table.where(table.consolidation_key == None).count() == 4
+    summary = table.where(table.consolidation_key != None).select(table.note).collect()
+    assert summary[0]["note"].startswith("Note ")
+    archive = pxt.get_table(f"{NAMESPACE}.{memory.table_name}_archive")
+    assert archive.count() == 6
+
+
+def test_consolidation_skips_small_groups(make_memory):
+    memory = notes(make_memory)
+    memory.insert([{"note": "only one", "user": "a"}])
+    memory.insert([{"note": f"n{i}", "user": "b"} for i in range(3)])
+
+    report = memory.consolidate(
+        ConsolidationParams(text_column="note", min_age_sec=0, group_by="user")
+    )
+    assert (report.summary_rows, report.archived_rows) == (1, 3)
+    table = memory.table
+    assert table.where(table.user == "a").count() == 1
+    assert table.where(table.user == "b").count() == 1
@@ -0,0 +1,42 @@
+from pixelmemory.config import IndexParams
+from pixelmemory.context import Text
+
+
+def words(text):
+    return len(text.split())
+
+
+def test_build_context_packs_within_budget(make_memory, hashed_model):
+    memory = make_memory(
+        [
+            Text(
+                id="note",
+                embed_model=hashed_model,
+                index_params=IndexParams(kind="exact"),
+            )
+        ]
+    )
+    memory.insert(
+        [
+            {"note": "red apples"},
+            {"note": "Red  apples"},
+            {"note": "red apples and red cherries in a bowl on the table"},
+            {"note": "green apples"},
+            {"note": "blue boats"},
+        ]
+    )
+    order = [row["note"] for row in memory.search("red apples", k=5)]
+
+    packed = memory.build_context(
+        "red apples", token_budget=6, tokenizer=words, separator=" | "
+    )
+    texts = packed.text.split(" | ")
+    # The duplicate is dropped and the long chunk does not fit; the separator
+    # counts against the budget, so "blue boats" does not fit either.
+    assert [" ".join(text.lower().split()) for text in texts] == [
+        "red apples",
+        "green apples",
+    ]
+    assert packed.tokens == 5
+    assert [row["note"] for row in packed.rows] == texts
+    assert texts == sorted(texts, key=order.index)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import PIL.Image
+import pytest
+
+pytest.importorskip("openai")
+
+from pixelmemory import ratelimit
+from pixelmemory.config import RateLimitParams
+from pixelmemory.remote import openai_vision
+from pixelmemory.vision import get_vision_function, resolve_vision_model
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    delay_sec = 0.2
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((time.monotonic(), body))
+        time.sleep(self.delay_sec)
+        if self.server.failures:
+            status = self.server.failures.pop(0)
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps(
+            {
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "a red square"},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 10,
+                    "completion_tokens": 5,
+                    "total_tokens": 15,
+                },
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+    srv.requests = []
+    srv.failures = []
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{srv.server_port}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    # Limiters are process-wide; each test starts without any.
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+    monkeypatch.setattr(ratelimit, "_coalescers", {})
+    yield srv
+    srv.shutdown()
+
+
+def images(n):
+    return [PIL.Image.new("RGB", (8, 8), (i, 0, 0)) for i in range(n)]
+
+
+def describe_all(batch):
+    async def run():
+        calls = [
+            openai_vision.py_fn("describe", image, model="gpt-4o-mini")
+            for image in batch
+        ]
+        return await asyncio.gather(*calls)
+
+    return asyncio.run(run())
+
+
+def test_openai_is_routed_through_remote():
+    assert get_vision_function("openai") is openai_vision
+
+
+def test_vision_model_defaults_per_provider():
+    assert resolve_vision_model("openai", None) == "gpt-4o-mini"
+    assert resolve_vision_model("local", None).startswith("Salesforce/blip")
+    assert resolve_vision_model("local", "my/captioner") == "my/captioner"
+    with pytest.raises(ValueError):
+        resolve_vision_model("local", "gpt-4o-mini")
+
+
+def test_unlimited_calls_go_straight_through(server):
+    assert describe_all(images(3)) == ["a red square"] * 3
+    assert len(server.requests) == 3
+    content = server.requests[0][1]["messages"][0]["content"]
+    assert content[1]["image_url"]["url"].startswith("data:image/")
+
+
+def test_limiter_configured_later_applies(server):
+    # A limiter configured after the UDF was picked (e.g. by another context)
+    # still applies: the wrapper looks it up on every call.
+    ratelimit.configure_limiter("openai", RateLimitParams(requests_per_min=60))
+    ratelimit._limiters["openai"].requests.available = 1.0
+    start = time.monotonic()
+    describe_all(images(2))
+    assert len(server.requests) == 2
+    # The second request waited about a second for the bucket to refill.
+    assert time.monotonic() - start >= 0.9
+
+
+def test_identical_requests_are_coalesced(server):
+    ratelimit.configure_limiter("openai", RateLimitParams(requests_per_min=6000))
+    same = images(1) * 4
+    assert describe_all(same) == ["a red square"] * 4
+    assert len(server.requests) == 1
+
+
+def test_throttled_and_failed_requests_are_retried(server):
+    server.failures = [429, 503]
+    assert describe_all(images(1)) == ["a red square"]
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(server):
+    import openai
+
+    server.failures = [400]
+    with pytest.raises(openai.BadRequestError):
+        describe_all(images(1))
+    assert len(server.requests) == 1
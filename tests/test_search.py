@@ -0,0 +1,75 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pixeltable as pxt
+import pytest
+
+from pixelmemory import search as search_module
+from pixelmemory.config import IndexedColumn
+from pixelmemory.context import Text
+
+from .conftest import word_embed
+
+
+def clip_index(column, model):
+    return IndexedColumn(
+        original_col=column,
+        indexed_col="image",
+        index_name=f"{column}_clip",
+        embed_model=model,
+        modality="image",
+    )
+
+
+def test_search_images_refuses_to_merge_clip_models(monkeypatch):
+    memory = SimpleNamespace(
+        resources=SimpleNamespace(
+            indexed_columns=[
+                clip_index("photos", "openai/clip-vit-base-patch32"),
+                clip_index("scans", "openai/clip-vit-large-patch14"),
+            ]
+        )
+    )
+    searched = []
+    monkeypatch.setattr(
+        search_module,
+        "search_index",
+        lambda memory_instance, indexed, *args: searched.append(indexed) or [],
+    )
+
+    with pytest.raises(ValueError, match="photos, scans"):
+        search_module.search_images(memory, "a cat")
+    assert searched == []
+
+    search_module.search_images(memory, "a cat", column="scans")
+    assert [indexed.original_col for indexed in searched] == ["scans"]
+
+
+def test_concurrent_index_setup_serializes_ddl(make_memory, monkeypatch):
+    active, overlaps = [0], []
+    lock = threading.Lock()
+    table_cls = pxt.catalog.InsertableTable
+    original = table_cls.add_embedding_index
+
+    def add_embedding_index(self, *args, **kwargs):
+        with lock:
+            active[0] += 1
+            overlaps.append(active[0])
+        time.sleep(0.05)
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    monkeypatch.setattr(table_cls, "add_embedding_index", add_embedding_index)
+    columns = ["title", "body", "tags"]
+    memory = make_memory(
+        [Text(id=col, embed_model=word_embed) for col in columns],
+        max_index_workers=3,
+    )
+    assert len(overlaps) == 3 and max(overlaps) == 1
+    assert [indexed.original_col for indexed in memory.resources.indexed_columns] == (
+        columns
+    )
@@ -0,0 +1,34 @@
+from collections import Counter
+
+import pytest
+
+from pixelmemory import ShardedMemory
+from pixelmemory.context import Text
+from pixelmemory.sharding import shard_for
+
+from .conftest import word_embed
+
+
+def test_shard_for_is_stable_and_spreads_keys():
+    # Fixed values: routing must not change between processes or releases.
+    assert [shard_for(key, 4) for key in ["alice", "bob", "carol", "dave", 42]] == [
+        1,
+        0,
+        1,
+        3,
+        2,
+    ]
+    counts = Counter(shard_for(f"user-{i}", 4) for i in range(4000))
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert min(counts.values()) > 800
+
+
+def test_sharded_memory_validates_its_arguments(tmp_path):
+    context = [Text(id="note", embed_model="all-mpnet-base-v2")]
+    with pytest.raises(ValueError, match="num_shards"):
+        ShardedMemory(context, num_shards=0, root=str(tmp_path))
+    # Pixeltable functions cannot be sent to the shard processes.
+    with pytest.raises(ValueError, match="picklable"):
+        ShardedMemory(
+            [Text(id="note", embed_model=word_embed)], num_shards=1, root=str(tmp_path)
+        )
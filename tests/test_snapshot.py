@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from pixelmemory import ReadOnlyMemory
+from pixelmemory.config import IndexParams
+from pixelmemory.context import Text
+
+NOTES = [
+    "red apples and green pears",
+    "blue boats on the sea",
+    "red boats in the harbour",
+    "green fields in spring",
+    "apples fall in autumn",
+    "the sea is calm today",
+]
+
+
+@pytest.fixture
+def memory(make_memory, hashed_model):
+    def make(kind):
+        memory = make_memory(
+            [
+                Text(
+                    id="note",
+                    embed_model=hashed_model,
+                    index_params=IndexParams(kind=kind, nlist=2),
+                )
+            ]
+        )
+        memory.insert([{"note": note} for note in NOTES])
+        return memory
+
+    return make
+
+
+@pytest.mark.parametrize("kind", ["exact", "ivf"])
+def test_snapshot_answers_like_the_live_memory(memory, tmp_path, kind):
+    memory = memory(kind)
+    path = memory.snapshot(str(tmp_path / "snapshot"))
+    replica = ReadOnlyMemory(path)
+
+    for query in ["red apples", "boats on the sea"]:
+        live = memory.search(query, k=4, nprobe=2)
+        snapshot = replica.search(query, k=4, nprobe=2)
+        assert [row["note"] for row in snapshot] == [row["note"] for row in live]
+        assert [row["text"] for row in snapshot] == [row["note"] for row in live]
+        assert [row["similarity"] for row in snapshot] == pytest.approx(
+            [row["similarity"] for row in live], abs=1e-5
+        )
+
+
+def test_snapshot_is_immutable(memory, tmp_path):
+    memory = memory("exact")
+    path = memory.snapshot(str(tmp_path / "snapshot"))
+    with pytest.raises(FileExistsError):
+        memory.snapshot(path)
+    # Later writes do not reach the snapshot.
+    memory.insert([{"note": "red apples"}])
+    assert len(ReadOnlyMemory(path).search("red apples", k=10)) == len(NOTES)
+    assert os.stat(os.path.join(path, "manifest.json")).st_mode & 0o222 == 0
@@ -0,0 +1,95 @@
+import pytest
+
+from pixelmemory import search as search_module
+from pixelmemory.context import Text
+
+from .conftest import word_embed
+
+
+@pytest.fixture
+def memory(make_memory):
+    memory = make_memory(
+        [Text(id="note", embed_model=word_embed)],
+        tenant_key="user",
+    )
+    memory.tenant("a").insert([{"note": "red apples"}, {"note": "green pears"}])
+    memory.tenant("b").insert([{"note": "blue boats"}])
+    return memory
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    calls = []
+    original = search_module._search_index
+
+    def counting(memory_instance, indexed, query, *args):
+        calls.append(args[-1])
+        return original(memory_instance, indexed, query, *args)
+
+    monkeypatch.setattr(search_module, "_search_index", counting)
+    return calls
+
+
+def notes(rows):
+    return [row["note"] for row in rows]
+
+
+def test_tenant_search_is_filtered(memory):
+    assert sorted(notes(memory.tenant("a").search("red apples", k=5))) == [
+        "green pears",
+        "red apples",
+    ]
+    assert notes(memory.tenant("b").search("red apples", k=5)) == ["blue boats"]
+
+
+def test_tenant_write_invalidates_only_that_tenant(memory, searches):
+    a, b = memory.tenant("a"), memory.tenant("b")
+    a.search("red apples", k=5)
+    b.search("blue boats", k=5)
+    assert searches == ["a", "b"]
+
+    a.insert([{"note": "red cherries"}])
+    assert "red cherries" in notes(a.search("red apples", k=5))
+    b.search("blue boats", k=5)
+    # Tenant b's cached result survived tenant a's write.
+    assert searches == ["a", "b", "a"]
+
+
+def test_result_computed_before_a_write_is_not_served(memory):
+    # A reader that computed its result before a write and stores it afterwards
+    # must not have the entry served as current.
+    stamp = memory._cache_stamp("a")
+    other_stamp = memory._cache_stamp("b")
+    memory.tenant("a").insert([{"note": "red cherries"}])
+    memory._result_cache.put(("key", "a"), ["stale"], stamp)
+    assert memory._result_cache.get(("key", "a"), memory._cache_stamp("a")) is None
+    assert memory._cache_stamp("b") == other_stamp
+    # Unpartitioned results cover every tenant.
+    assert memory._cache_stamp(None) != stamp
+
+
+def test_writes_outside_the_memory_invalidate_every_tenant(memory, searches):
+    b = memory.tenant("b")
+    b.search("blue boats", k=5)
+    memory.table.insert([{"note": "blue whales", "user": "b"}])
+    assert "blue whales" in notes(b.search("blue boats", k=5))
+    assert searches == ["b", "b"]
+
+
+def test_vector_cache_follows_tenant_writes(memory):
+    from pixelmemory.search import load_vectors, resolve_index
+
+    indexed = resolve_index(memory, column="note")
+    vectors_a = load_vectors(memory, indexed, tenant="a")
+    vectors_b = load_vectors(memory, indexed, tenant="b")
+    assert load_vectors(memory, indexed, tenant="a") is vectors_a
+
+    stamp = memory._cache_stamp("a")
+    memory.tenant("a").insert([{"note": "red cherries"}])
+    # A vector set loaded before the write and stored after it is refused.
+    memory._vector_cache.put(("stale", "a"), vectors_a, stamp)
+    assert memory._vector_cache.get(("stale", "a"), memory._cache_stamp("a")) is None
+
+    reloaded = load_vectors(memory, indexed, tenant="a")
+    assert len(reloaded.rows) == len(vectors_a.rows) + 1
+    assert load_vectors(memory, indexed, tenant="b") is vectors_b
@@ -0,0 +1,28 @@
+import numpy as np
+
+from pixelmemory.config import VADParams
+from pixelmemory.iterators import speech_chunks
+
+# 30 ms frames: 100 frames are 3 seconds.
+PARAMS = VADParams(max_chunk_sec=30.0, speech_pad_sec=0.0)
+
+
+def levels(*segments):
+    return np.concatenate([np.full(n, level, dtype=np.float64) for n, level in segments])
+
+
+def test_quiet_recording_is_split_on_its_own_noise_floor():
+    # Speech at -50 dBFS never crosses an absolute -40 dBFS threshold.
+    audio = levels((100, -80), (100, -50), (200, -80), (100, -50), (100, -80))
+    assert speech_chunks(audio, PARAMS) == [(100, 200), (400, 500)]
+
+
+def test_loud_noise_floor_is_not_speech():
+    audio = levels((100, -30), (100, -10), (200, -30), (100, -10), (100, -30))
+    assert speech_chunks(audio, PARAMS) == [(100, 200), (400, 500)]
+
+
+def test_no_speech_falls_back_to_fixed_windows():
+    audio = levels((2500, -90))
+    assert speech_chunks(audio, PARAMS) == [(0, 1000), (1000, 2000), (2000, 2500)]
+    assert speech_chunks(np.zeros(0), PARAMS) == []